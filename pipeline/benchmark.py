@@ -0,0 +1,301 @@
+"""
+Offline Pipeline Benchmark
+
+Runs the real pipeline against local stand-ins for the Figma nodes API,
+IBM IAM and watsonx chat (pipeline/servers/), with configurable latency and
+a recorded Figma fixture, so timings are repeatable and need no network.
+
+Scenarios:
+  single  - run_pipeline_async() --iterations times, non-interactively
+            (the component is published and accepted without a browser)
+  batch   - run_batch() over --components frames at each --concurrency
+
+Every step's trace span feeds per-stage p50/p95/p99; the batch sweep adds
+wall time and throughput (components/s) per concurrency. Metrics are named
+like single.pipeline.run.p95, single.granite.request.p50,
+batch.c4.throughput or batch.c4.batch.item.p95.
+
+Thresholds (JSON, default pipeline/benchmark-thresholds.json):
+  {"max": {"single.pipeline.run.p95": 2.5}, "min": {"batch.c4.throughput": 2.0}}
+The run exits with status 1 when any threshold is exceeded.
+
+Everything is written to a temporary workspace (components, routes, caches);
+the repository's generated-app and caches are not touched.
+
+Usage:
+  python pipeline/benchmark.py [--iterations 5] [--concurrency 1,4,8] [--components 8]
+                               [--figma-latency 0.15] [--iam-latency 0.2] [--granite-latency 1.0]
+                               [--warm] [--stream] [--compiler] [--dedupe] [--thresholds FILE] [--output report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent / 'servers'))
+
+import generate_pipeline as pipeline
+from generate_pipeline import BATCH_NODE_TYPES, Config, TRACER, Colors, slugify_component_name
+import figma_stub_server
+import granite_stub_server
+
+DEFAULT_THRESHOLDS = Path(__file__).parent / 'benchmark-thresholds.json'
+FILE_KEY = 'benchmarkFile'
+PERCENTILES = (50, 95, 99)
+
+# ============================================================================
+# Statistics
+# ============================================================================
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0-100)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def stage_metrics(spans, prefix: str) -> Dict[str, float]:
+    """p50/p95/p99/max seconds and count per span name"""
+    durations: Dict[str, List[float]] = {}
+    for span in spans:
+        durations.setdefault(span.name, []).append(span.duration)
+
+    metrics = {}
+    for name, values in durations.items():
+        for q in PERCENTILES:
+            metrics[f'{prefix}.{name}.p{q}'] = percentile(values, q)
+        metrics[f'{prefix}.{name}.max'] = max(values)
+        metrics[f'{prefix}.{name}.count'] = len(values)
+    return metrics
+
+# ============================================================================
+# Environment
+# ============================================================================
+def start_stubs(args: argparse.Namespace):
+    """Start the Figma and IBM stand-ins and point Config at them"""
+    response_text = Path(args.response_file).read_text(encoding='utf-8') if args.response_file else None
+    figma = figma_stub_server.start_stub_server(0, args.fixture, args.figma_latency)
+    granite = granite_stub_server.start_stub_server(0, response_text, args.chunk_delay,
+                                                    args.granite_latency, args.iam_latency)
+
+    granite_base = f'http://127.0.0.1:{granite.server_port}'
+    Config.FIGMA_API_BASE = f'http://127.0.0.1:{figma.server_port}'
+    Config.IBM_IAM_ENDPOINT = f'{granite_base}/identity/token'
+    Config.IBM_ENDPOINT = f'{granite_base}/ml/v1/text/chat?version=2023-05-29'
+    Config.IBM_STREAM_ENDPOINT = f'{granite_base}/ml/v1/text/chat_stream?version=2023-05-29'
+    Config.FIGMA_TOKEN = 'benchmark-figma-token'
+    Config.IBM_API_KEY = 'benchmark-api-key'
+    return figma, granite
+
+def use_workspace(workspace: Path, run_name: str):
+    """Point every output and cache path of the pipeline into the workspace
+
+    Caches get their own folder per run_name, so a new name starts cold.
+    """
+    app_dir = workspace / 'app'
+    caches = workspace / 'caches' / run_name
+    Config.COMPONENT_DIR = app_dir / 'components'
+    Config.ROUTES_PATH = app_dir / 'app.routes.ts'
+    Config.PREVIEW_DIR = workspace / 'preview'
+    Config.FIGMA_CACHE_DIR = caches / 'figma-exports'
+    Config.LLM_CACHE_DIR = caches / 'llm'
+    Config.CACHE_DIR = caches
+    Config.BRAND_CATALOG_CACHE = caches / 'brand-catalog.json'
+    Config.IAM_TOKEN_CACHE = caches / 'iam-token.json'
+    Config.AUDIT_CACHE = caches / 'audit-cache.json'
+    pipeline.reset_shared_state()
+
+def create_workspace() -> Path:
+    workspace = Path(tempfile.mkdtemp(prefix='pipeline-benchmark-'))
+    (workspace / 'app' / 'components').mkdir(parents=True)
+    shutil.copyfile(Config.ROUTES_PATH, workspace / 'app' / 'app.routes.ts')
+    return workspace
+
+def batch_items(count: int) -> List[Dict]:
+    """count manifest entries cycling over the fixture's top-level frames"""
+    frames = [child for root in figma_stub_server.FigmaStubState.roots
+              for child in root.get('children', []) if child.get('type') in BATCH_NODE_TYPES]
+    frames = frames or figma_stub_server.FigmaStubState.roots
+    return [{
+        'node_id': frames[i % len(frames)]['id'].replace(':', '-'),
+        'component_name': f'{slugify_component_name(frames[i % len(frames)]["name"])}-{i + 1}'
+    } for i in range(count)]
+
+# ============================================================================
+# Scenarios
+# ============================================================================
+def run_single(args: argparse.Namespace, workspace: Path) -> Dict[str, float]:
+    node_id = args.node or figma_stub_server.FigmaStubState.roots[0]['id'].replace(':', '-')
+    TRACER.clear()
+    for iteration in range(args.iterations):
+        use_workspace(workspace, 'warm' if args.warm else f'single-{iteration}')
+        asyncio.run(pipeline.run_pipeline_async(FILE_KEY, node_id, 'benchmark-page', review=lambda name: 'A'))
+    return stage_metrics(TRACER.clear(), 'single')
+
+def run_batch_sweep(args: argparse.Namespace, workspace: Path) -> Dict[str, float]:
+    items = batch_items(args.components)
+    metrics = {}
+    for concurrency in args.concurrency:
+        use_workspace(workspace, 'warm' if args.warm else f'batch-{concurrency}')
+        TRACER.clear()
+        started = time.perf_counter()
+        results = pipeline.run_batch(FILE_KEY, [dict(item) for item in items], concurrency, review=False)
+        wall = time.perf_counter() - started
+
+        errors = [result['error'] for result in results if result['error']]
+        if errors:
+            raise Exception(f'Batch at concurrency {concurrency} failed: {errors[0]}')
+        prefix = f'batch.c{concurrency}'
+        metrics.update(stage_metrics(TRACER.clear(), prefix))
+        metrics[f'{prefix}.wall'] = wall
+        metrics[f'{prefix}.throughput'] = len(items) / wall
+    return metrics
+
+# ============================================================================
+# Report and Thresholds
+# ============================================================================
+def print_stage_table(metrics: Dict[str, float], prefix: str, title: str):
+    names = sorted({key[len(prefix) + 1:].rsplit('.', 1)[0] for key in metrics
+                    if key.startswith(prefix + '.') and key.endswith('.count')},
+                   key=lambda name: -metrics[f'{prefix}.{name}.p50'])
+    print(f'\n{Colors.BOLD}{title}{Colors.END}')
+    print(f'{"stage":<24}{"count":>6}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"max ms":>10}')
+    for name in names:
+        key = f'{prefix}.{name}'
+        print(f'{name:<24}{int(metrics[key + ".count"]):>6}' + ''.join(
+            f'{metrics[f"{key}.{stat}"] * 1000:>10.1f}' for stat in ('p50', 'p95', 'p99', 'max')))
+
+def print_report(metrics: Dict[str, float], concurrencies: List[int]):
+    print(f'\n{Colors.CYAN}{"=" * 50}\n  BENCHMARK RESULTS\n{"=" * 50}{Colors.END}')
+    if any(key.startswith('single.') for key in metrics):
+        print_stage_table(metrics, 'single', 'Single component (run_pipeline)')
+
+    if concurrencies:
+        print(f'\n{Colors.BOLD}Batch (run_batch){Colors.END}')
+        print(f'{"concurrency":<14}{"wall s":>10}{"comp/s":>10}{"item p50 ms":>14}{"item p95 ms":>14}')
+        for concurrency in concurrencies:
+            prefix = f'batch.c{concurrency}'
+            print(f'{concurrency:<14}{metrics[prefix + ".wall"]:>10.2f}{metrics[prefix + ".throughput"]:>10.2f}'
+                  f'{metrics[prefix + ".batch.item.p50"] * 1000:>14.1f}'
+                  f'{metrics[prefix + ".batch.item.p95"] * 1000:>14.1f}')
+
+def load_thresholds(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    thresholds = {'max': {}, 'min': {}}
+    path = args.thresholds or (DEFAULT_THRESHOLDS if DEFAULT_THRESHOLDS.exists() else None)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        thresholds['max'].update(data.get('max', {}))
+        thresholds['min'].update(data.get('min', {}))
+    for kind in ('max', 'min'):
+        for entry in getattr(args, kind) or []:
+            metric, _, value = entry.partition('=')
+            thresholds[kind][metric] = float(value)
+    return thresholds
+
+def check_thresholds(metrics: Dict[str, float], thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    """Messages for every threshold that was exceeded
+
+    Metrics the run did not produce are skipped, so one thresholds file
+    covers partial runs (e.g. --concurrency 1).
+    """
+    failures = []
+    for metric, limit in thresholds['max'].items():
+        if metric in metrics and metrics[metric] > limit:
+            failures.append(f'{metric} = {metrics[metric]:.3f} > {limit}')
+    for metric, limit in thresholds['min'].items():
+        if metric in metrics and metrics[metric] < limit:
+            failures.append(f'{metric} = {metrics[metric]:.3f} < {limit}')
+    return failures
+
+# ============================================================================
+# CLI
+# ============================================================================
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='benchmark.py', description='Offline pipeline benchmark')
+    parser.add_argument('--iterations', type=int, default=5, help='Single-component runs')
+    parser.add_argument('--concurrency', default='1,4,8', help='Comma-separated batch concurrencies ("" skips)')
+    parser.add_argument('--components', type=int, default=8, help='Components per batch run')
+    parser.add_argument('--node', help='Node for the single scenario (default: the fixture root)')
+    parser.add_argument('--figma-latency', type=float, default=0.15, help='Seconds per Figma response')
+    parser.add_argument('--iam-latency', type=float, default=0.2, help='Seconds per IAM token response')
+    parser.add_argument('--granite-latency', type=float, default=1.0, help='Seconds before a chat response')
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help='Seconds between streamed chunks')
+    parser.add_argument('--fixture', type=Path, default=figma_stub_server.DEFAULT_FIXTURE,
+                        help='Recorded Figma /nodes response or figma-exports/ cache entry')
+    parser.add_argument('--response-file', help='Markdown returned by the chat stub')
+    parser.add_argument('--warm', action='store_true', help='Share caches across iterations instead of cold runs')
+    parser.add_argument('--stream', action='store_true', help='Use the streaming chat endpoint')
+    parser.add_argument('--compiler', action='store_true',
+                        help='Let the local compiler handle simple nodes (default: every node goes to Granite)')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='Generate repeated subtrees as shared components (default: inline)')
+    parser.add_argument('--thresholds', type=Path, help=f'Thresholds JSON (default {DEFAULT_THRESHOLDS.name})')
+    parser.add_argument('--max', action='append', metavar='METRIC=SECONDS', help='Extra upper bound')
+    parser.add_argument('--min', action='append', metavar='METRIC=VALUE', help='Extra lower bound')
+    parser.add_argument('--output', type=Path, help='Write metrics and failures as JSON')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary workspace')
+    parser.add_argument('--verbose', action='store_true', help='Show the pipeline log')
+    args = parser.parse_args(argv)
+    args.concurrency = [int(value) for value in args.concurrency.split(',') if value.strip()]
+    return args
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    Config.QUIET = not args.verbose
+    Config.PREFETCH = False  # nothing is reviewed, a background candidate would only add load
+    Config.STREAM = args.stream
+    Config.COMPILER = args.compiler  # the fixture compiles completely, which would leave Granite unmeasured
+    Config.DEDUPE = args.dedupe  # shared components are generated once, so later iterations would measure less
+    Config.FIGMA_OFFLINE = Config.GRANITE_OFFLINE = False
+    TRACER.enable()
+
+    figma, granite = start_stubs(args)
+    workspace = create_workspace()
+    print(f'Workspace: {workspace}')
+    try:
+        metrics = {}
+        if args.iterations > 0:
+            metrics.update(run_single(args, workspace))
+        metrics.update(run_batch_sweep(args, workspace))
+    finally:
+        figma.shutdown()
+        granite.shutdown()
+        pipeline.reset_shared_state()
+        if not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    print_report(metrics, args.concurrency)
+    failures = check_thresholds(metrics, load_thresholds(args))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps({
+            'settings': {
+                'iterations': args.iterations, 'concurrency': args.concurrency, 'components': args.components,
+                'figma_latency': args.figma_latency, 'iam_latency': args.iam_latency,
+                'granite_latency': args.granite_latency, 'warm': args.warm, 'stream': args.stream,
+                'compiler': args.compiler, 'dedupe': args.dedupe
+            },
+            'metrics': metrics,
+            'failures': failures
+        }, indent=2), encoding='utf-8')
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f'{Colors.RED}❌ Regression: {failure}{Colors.END}')
+        return 1
+    print(f'{Colors.GREEN}✅ All thresholds met{Colors.END}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
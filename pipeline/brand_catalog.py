@@ -0,0 +1,162 @@
+"""
+UPS Brand CSS Catalog
+
+Parses ups-brand.scss with a small SCSS tokenizer (comments, strings and
+nested blocks aware) instead of scraping every ".word" in the file, which
+also matched decimals such as rgba(0, 0, 0, 0.1). The compiled catalog is
+persisted as JSON keyed by the source file's mtime, size and hash, so
+later runs and workers load it without reparsing.
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from publisher import atomic_write
+
+CLASS_PATTERN = re.compile(r'\.(-?[_a-zA-Z][_a-zA-Z0-9-]*)')
+CATALOG_FORMAT = 1
+
+@dataclass(frozen=True)
+class BrandCatalog:
+    """Approved classes, CSS/SCSS variables and the prebuilt prompt fragment"""
+    classes: frozenset
+    variables: Dict[str, str] = field(default_factory=dict)
+    prompt_fragment: str = ''
+    source_hash: str = ''
+
+    @classmethod
+    def from_scss(cls, scss: str, source_hash: str = '') -> 'BrandCatalog':
+        classes = set()
+        variables = {}
+        for kind, text in tokenize_scss(scss):
+            if kind == 'selector':
+                classes.update(CLASS_PATTERN.findall(_strip_strings(text)))
+            elif kind == 'declaration' and ':' in text:
+                name, value = text.split(':', 1)
+                name = name.strip()
+                if name.startswith('--') or name.startswith('$'):
+                    variables[name] = value.strip()
+        return cls.build(classes, variables, source_hash)
+
+    @classmethod
+    def build(cls, classes, variables: Dict[str, str], source_hash: str = '') -> 'BrandCatalog':
+        ordered = sorted(classes)
+        # Sorted so identical brand CSS always yields an identical prompt (and cache key)
+        return cls(frozenset(ordered), dict(variables), ', '.join(ordered), source_hash)
+
+    def to_json(self) -> Dict:
+        return {
+            'classes': sorted(self.classes),
+            'variables': self.variables,
+            'source_hash': self.source_hash
+        }
+
+# ============================================================================
+# SCSS Tokenizer
+# ============================================================================
+def tokenize_scss(text: str) -> Iterator[Tuple[str, str]]:
+    """Yield ('selector', prelude), ('at-rule', prelude) and ('declaration', text)
+
+    Handles /* */ and // comments, quoted strings and parentheses (so the
+    // in url(http://...) is not a comment). Block nesting is tracked but
+    not reported; declarations are yielded at any depth.
+    """
+    buffer = []
+    paren_depth = 0
+    interpolation_depth = 0
+    i = 0
+    length = len(text)
+
+    while i < length:
+        char = text[i]
+
+        if char == '/' and i + 1 < length and text[i + 1] == '*':
+            end = text.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if char == '/' and i + 1 < length and text[i + 1] == '/' and paren_depth == 0:
+            end = text.find('\n', i + 2)
+            i = length if end == -1 else end + 1
+            continue
+
+        if char in ('"', "'"):
+            end = i + 1
+            while end < length and text[end] != char:
+                end += 2 if text[end] == '\\' else 1
+            buffer.append(text[i:end + 1])
+            i = end + 1
+            continue
+
+        # SCSS interpolation #{...} stays part of the surrounding text
+        if char == '{' and buffer and buffer[-1] == '#':
+            interpolation_depth += 1
+        elif char == '}' and interpolation_depth:
+            interpolation_depth -= 1
+            buffer.append(char)
+            i += 1
+            continue
+
+        if char == '(':
+            paren_depth += 1
+        elif char == ')':
+            paren_depth = max(0, paren_depth - 1)
+
+        if paren_depth == 0 and not interpolation_depth and char in '{};':
+            chunk = ''.join(buffer).strip()
+            buffer = []
+            if char == '{':
+                yield ('at-rule' if chunk.startswith('@') else 'selector', chunk)
+            elif chunk:
+                yield ('at-rule' if chunk.startswith('@') else 'declaration', chunk)
+        else:
+            buffer.append(char)
+        i += 1
+
+def _strip_strings(text: str) -> str:
+    return re.sub(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'', '""', text)
+
+# ============================================================================
+# Persistent Cache
+# ============================================================================
+def load_brand_catalog(scss_path: Path, cache_path: Optional[Path] = None) -> BrandCatalog:
+    """Load the catalog for scss_path, reusing the compiled cache when valid
+
+    The cache is trusted as-is when mtime and size match; otherwise the file
+    is hashed and only reparsed if its content actually changed.
+    """
+    stat = os.stat(scss_path)
+    cached = _read_cache(cache_path)
+
+    if cached and cached.get('mtime_ns') == stat.st_mtime_ns and cached.get('size') == stat.st_size:
+        return BrandCatalog.build(cached['classes'], cached['variables'], cached['source_hash'])
+
+    scss = Path(scss_path).read_text(encoding='utf-8')
+    source_hash = hashlib.sha256(scss.encode('utf-8')).hexdigest()
+
+    if cached and cached.get('source_hash') == source_hash:
+        catalog = BrandCatalog.build(cached['classes'], cached['variables'], source_hash)
+    else:
+        catalog = BrandCatalog.from_scss(scss, source_hash)
+
+    if cache_path:
+        _write_cache(cache_path, catalog, stat)
+    return catalog
+
+def _read_cache(cache_path: Optional[Path]) -> Optional[Dict]:
+    if not cache_path:
+        return None
+    try:
+        cached = json.loads(Path(cache_path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return cached if cached.get('format') == CATALOG_FORMAT else None
+
+def _write_cache(cache_path: Path, catalog: BrandCatalog, stat: os.stat_result):
+    data = catalog.to_json()
+    data.update({'format': CATALOG_FORMAT, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})
+    atomic_write(cache_path, json.dumps(data, indent=1))
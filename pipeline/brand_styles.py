@@ -0,0 +1,185 @@
+"""
+Figma Properties to UPS Brand Classes
+
+Maps the visual properties of a Figma node (auto-layout, padding, corner
+radius, solid fills, strokes, shadows) onto the approved brand classes. Whatever has no
+approved class is returned as inline CSS declarations, which templates
+bind with [style]="'...'" as the prompt asks Granite to do.
+
+Only classes present in the brand catalog are ever emitted, so the output
+always passes validate_css_strict().
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+GAP_CLASSES = {8: 'gap-2', 16: 'gap-4', 32: 'gap-8'}
+RADIUS_CLASSES = {4: 'rounded', 8: 'rounded-lg'}
+MAIN_AXIS_CLASSES = {'CENTER': 'justify-center', 'SPACE_BETWEEN': 'justify-between'}
+CROSS_AXIS_CLASSES = {'CENTER': 'items-center', 'MIN': 'items-start'}
+
+class StyleBuilder:
+    """Collects classes and fallback declarations for one element"""
+
+    def __init__(self, approved: frozenset):
+        self.approved = approved
+        self.classes: List[str] = []
+        self.declarations: List[str] = []
+
+    def add(self, class_name: Optional[str], declaration: str):
+        """Use class_name when it is approved, otherwise the inline declaration"""
+        if class_name and class_name in self.approved:
+            if class_name not in self.classes:
+                self.classes.append(class_name)
+        elif declaration:
+            self.declarations.append(declaration)
+
+    def attributes(self) -> str:
+        """' class="..." [style]="'...'"' (empty when there is nothing to apply)"""
+        parts = []
+        if self.classes:
+            parts.append(f'class="{" ".join(self.classes)}"')
+        if self.declarations:
+            parts.append(f'[style]="\'{"; ".join(self.declarations)}\'"')
+        return (' ' + ' '.join(parts)) if parts else ''
+
+def px(value: float) -> str:
+    rounded = round(value)
+    return f'{rounded}px' if abs(value - rounded) < 0.05 else f'{value:.1f}px'
+
+def hex_color(color: Dict) -> str:
+    r, g, b = (int(round(color.get(channel, 0) * 255)) for channel in 'rgb')
+    return f'#{r:02X}{g:02X}{b:02X}'
+
+def solid_fill(paints: Optional[List[Dict]]) -> Optional[Tuple[str, float]]:
+    """(hex, alpha) of the first visible solid paint"""
+    for paint in paints or []:
+        if paint.get('visible') is False or paint.get('type') != 'SOLID':
+            continue
+        color = paint.get('color', {})
+        return hex_color(color), color.get('a', 1.0) * paint.get('opacity', 1.0)
+    return None
+
+def color_classes(approved: frozenset, variables: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """{'text': {'#FFC400': 'text-ups-gold', ...}, 'bg': {...}} from the catalog
+
+    A class resolves through the custom property of the same name, or the
+    one it abbreviates (text-ups-brown -> --ups-brown-digital).
+    """
+    values = {name[2:]: value.split('/*')[0].strip().upper()
+              for name, value in variables.items() if name.startswith('--')}
+    colors: Dict[str, Dict[str, str]] = {'text': {}, 'bg': {}}
+    for class_name in sorted(approved):
+        prefix, _, name = class_name.partition('-')
+        if prefix not in colors:
+            continue
+        value = values.get(name) or next((value for variable, value in sorted(values.items())
+                                          if variable.startswith(name + '-')), None)
+        if value and value.startswith('#'):
+            colors[prefix].setdefault(value, class_name)
+    return colors
+
+def add_fill(style: StyleBuilder, paints: Optional[List[Dict]], colors: Dict[str, Dict[str, str]],
+             prefix: str = 'bg', prop: str = 'background'):
+    fill = solid_fill(paints)
+    if fill is None:
+        return
+    hex_value, alpha = fill
+    if alpha < 0.995:
+        r, g, b = (int(hex_value[i:i + 2], 16) for i in (1, 3, 5))
+        style.add(None, f'{prop}: rgba({r}, {g}, {b}, {alpha:.2f})')
+        return
+    style.add(colors.get(prefix, {}).get(hex_value), f'{prop}: {hex_value}')
+
+def add_stroke(style: StyleBuilder, node: Dict):
+    stroke = solid_fill(node.get('strokes'))
+    if stroke and node.get('strokeWeight'):
+        style.add(None, f'border: {px(node["strokeWeight"])} solid {stroke[0]}')
+
+def add_layout(style: StyleBuilder, node: Dict):
+    """Auto-layout direction, alignment, gap and padding"""
+    mode = node.get('layoutMode')
+    if mode not in ('HORIZONTAL', 'VERTICAL'):
+        return
+    style.add('flex', 'display: flex')
+    if mode == 'VERTICAL':
+        style.add('flex-col', 'flex-direction: column')
+    if node.get('layoutWrap') == 'WRAP':
+        style.add(None, 'flex-wrap: wrap')
+
+    main = node.get('primaryAxisAlignItems', 'MIN')
+    if main != 'MIN':
+        css_value = {'MAX': 'flex-end', 'CENTER': 'center', 'SPACE_BETWEEN': 'space-between'}.get(main)
+        if css_value:
+            style.add(MAIN_AXIS_CLASSES.get(main), f'justify-content: {css_value}')
+    cross = node.get('counterAxisAlignItems', 'MIN')
+    css_value = {'MIN': 'flex-start', 'MAX': 'flex-end', 'CENTER': 'center', 'BASELINE': 'baseline'}.get(cross)
+    if css_value:
+        style.add(CROSS_AXIS_CLASSES.get(cross), f'align-items: {css_value}')
+
+    gap = round(node.get('itemSpacing') or 0)
+    if gap:
+        style.add(GAP_CLASSES.get(gap), f'gap: {gap}px')
+
+    top, right, bottom, left = (round(node.get(f'padding{side}') or 0)
+                                for side in ('Top', 'Right', 'Bottom', 'Left'))
+    if top == right == bottom == left == 16:
+        style.add('p-4', 'padding: 16px')
+    elif left == right == 16:
+        style.add('px-4', 'padding-left: 16px; padding-right: 16px')
+        if top or bottom:
+            style.add(None, f'padding-top: {top}px; padding-bottom: {bottom}px')
+    elif top == bottom == 16:
+        style.add('py-4', 'padding-top: 16px; padding-bottom: 16px')
+        if left or right:
+            style.add(None, f'padding-left: {left}px; padding-right: {right}px')
+    elif top == right == bottom == left:
+        if top:
+            style.add(None, f'padding: {top}px')
+    elif top == bottom and left == right:
+        style.add(None, f'padding: {top}px {right}px')
+    else:
+        style.add(None, f'padding: {top}px {right}px {bottom}px {left}px')
+
+def add_shape(style: StyleBuilder, node: Dict):
+    radius = node.get('cornerRadius')
+    if radius:
+        box = node.get('absoluteBoundingBox') or {}
+        if radius >= min(box.get('width', 0), box.get('height', 0)) / 2 > 0:
+            style.add('rounded-full', 'border-radius: 9999px')
+        else:
+            style.add(RADIUS_CLASSES.get(round(radius)), f'border-radius: {px(radius)}')
+    if node.get('opacity', 1) < 1:
+        style.add(None, f'opacity: {round(node["opacity"], 2)}')
+    if node.get('clipsContent'):
+        style.add('overflow-hidden', 'overflow: hidden')
+    shadows = [effect for effect in node.get('effects') or []
+               if effect.get('type') == 'DROP_SHADOW' and effect.get('visible', True)]
+    if shadows:
+        style.add('shadow', '')
+
+def container_style(node: Dict, approved: frozenset, colors: Dict[str, Dict[str, str]],
+                    size: bool = True) -> StyleBuilder:
+    """Classes and declarations for a frame-like node rendered as a <div>"""
+    style = StyleBuilder(approved)
+    add_layout(style, node)
+    if node.get('layoutMode') not in ('HORIZONTAL', 'VERTICAL') and node.get('children'):
+        style.add('relative', 'position: relative')
+    add_fill(style, node.get('fills'), colors)
+    add_stroke(style, node)
+    add_shape(style, node)
+
+    box = node.get('absoluteBoundingBox')
+    if size and box:
+        style.add(None, f'width: {px(box.get("width", 0))}')
+        if node.get('layoutMode') not in ('HORIZONTAL', 'VERTICAL'):
+            style.add(None, f'height: {px(box.get("height", 0))}')
+    return style
+
+def position_style(node: Dict, parent: Dict, style: StyleBuilder):
+    """Absolute placement inside a parent without auto-layout"""
+    box = node.get('absoluteBoundingBox')
+    parent_box = parent.get('absoluteBoundingBox')
+    if not box or not parent_box:
+        return
+    style.add('absolute', 'position: absolute')
+    style.add(None, f'left: {px(box["x"] - parent_box["x"])}; top: {px(box["y"] - parent_box["y"])}')
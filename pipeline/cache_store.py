@@ -0,0 +1,170 @@
+"""
+Size-Bounded On-Disk JSON Cache
+
+Shared storage layer for the pipeline caches. Each entry is one JSON file
+in the cache directory; a small index file tracks sizes and last access
+times so the least recently used entries are evicted once the directory
+grows past its byte budget.
+
+Reads only touch the in-memory index; access times are written with the
+next put, or at most every SAVE_INTERVAL seconds. Every write merges the
+index file first, so processes sharing the directory (batch, job server,
+benchmark) keep each other's entries.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from publisher import atomic_write
+
+class DiskCache:
+    """JSON files in one directory with LRU eviction by total size"""
+
+    INDEX_NAME = '.cache-index.json'
+    SAVE_INTERVAL = 30.0  # seconds access-time updates may wait for the next write
+
+    def __init__(self, root: Path, max_bytes: int = 200 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict]] = None
+        self._removed: set = set()  # keys dropped since the last write, not to be merged back
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------------
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None"""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            path = self.root / entry['file'] if entry else None
+
+            if not entry or not path.exists():
+                if entry:
+                    del index[key]
+                    self._removed.add(key)
+                    self._dirty = True
+                self.misses += 1
+                return None
+
+            entry['atime'] = time.time()
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= self.SAVE_INTERVAL:
+                self._save_index()
+
+        try:
+            value = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            # Unreadable or corrupt: drop it so eviction stops counting it
+            with self._lock:
+                self.misses += 1
+                if self._load_index().get(key, {}).get('file') == entry['file']:
+                    del self._index[key]
+                    self._removed.add(key)
+                    self._dirty = True
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, filename: str, meta: Optional[Dict] = None):
+        """Store value under key in root/filename, then evict down to max_bytes"""
+        data = json.dumps(value, separators=(',', ':'))
+        atomic_write(self.root / filename, data)
+
+        with self._lock:
+            index = self._load_index()
+            self._merge_index_file()
+            self._removed.discard(key)
+            index[key] = {
+                'file': filename,
+                'size': len(data.encode('utf-8')),
+                'atime': time.time(),
+                'meta': meta or {}
+            }
+            self._evict(keep=key)
+            self._write_index()
+
+    def flush(self):
+        """Write access times recorded since the last write"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def entries(self) -> Dict[str, Dict]:
+        """Snapshot of the index (key -> file, size, atime, meta)"""
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._load_index().items()}
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry['size'] for entry in self._load_index().values())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    # ------------------------------------------------------------------------
+    # Index internals (caller holds the lock)
+    # ------------------------------------------------------------------------
+    def _load_index(self) -> Dict[str, Dict]:
+        if self._index is None:
+            self._index = self._read_index_file()
+        return self._index
+
+    def _read_index_file(self) -> Dict[str, Dict]:
+        try:
+            return json.loads((self.root / self.INDEX_NAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def _merge_index_file(self):
+        """Take entries other processes added or used more recently from the index file"""
+        index = self._load_index()
+        for key, entry in self._read_index_file().items():
+            if key in self._removed:
+                continue
+            mine = index.get(key)
+            if mine is None or entry.get('atime', 0) > mine.get('atime', 0):
+                index[key] = entry
+
+    def _save_index(self):
+        self._merge_index_file()
+        self._write_index()
+
+    def _write_index(self):
+        atomic_write(self.root / self.INDEX_NAME, json.dumps(self._index, indent=1))
+        self._removed.clear()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def _evict(self, keep: str):
+        index = self._index
+        total = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['atime']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = index.pop(key)
+            self._removed.add(key)
+            total -= entry['size']
+            self.evictions += 1
+            try:
+                (self.root / entry['file']).unlink()
+            except OSError:
+                pass
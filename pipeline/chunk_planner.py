@@ -0,0 +1,242 @@
+"""
+Chunk Planner for Oversized Frames
+
+A page-sized frame compacts to far more tokens than the prompt budget, so a
+single prompt either loses the deepest nodes or makes Granite write the
+whole page in one long completion. The planner splits such a frame into
+child chunks that each fit the budget:
+
+  - a node whose compact design fits the budget is a leaf chunk, generated
+    by Granite as its own component from a small prompt
+  - a larger node becomes a composite: every visible child is planned the
+    same way, and runs of consecutive small children are grouped into one
+    chunk so that a long list does not turn into dozens of tiny prompts
+  - composites never go to Granite; compose_component() writes them from
+    the node's layout, with a template that references the children by
+    selector
+
+Leaves are generated in parallel, so a page takes about as long as its
+largest chunk instead of growing with its size. Child components live in
+the parent component's folder (parts/<name>/), so publishing, cleanup and
+garbage collection treat them as part of the parent.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from brand_styles import StyleBuilder, container_style, position_style
+from figma_compact import compact_figma_node, estimate_tokens
+from route_registry import component_class_name
+
+PARTS_DIR = 'parts'
+UNLIMITED_TOKENS = 10 ** 9
+GROUP_SHARE = 0.5  # consecutive children are grouped up to this share of the budget
+
+SELECTOR = re.compile(r'''(selector\s*:\s*)(['"])[^'"]*\2''')
+CLASS_DECLARATION = re.compile(r'\bexport\s+class\s+(\w+)')
+TEMPLATE_URL = re.compile(r'''(templateUrl\s*:\s*)(['"])[^'"]*\2''')
+STYLE_URL = re.compile(r'''(styleUrls?\s*:\s*\[?\s*)(['"])[^'"]*\2''')
+LAYOUT_KEYS = ('layoutMode', 'itemSpacing', 'primaryAxisAlignItems', 'counterAxisAlignItems', 'layoutWrap')
+
+@dataclass
+class Chunk:
+    """One component of a plan; leaves are generated, composites are composed
+
+    files is set for chunks compiled locally (fast_compiler); their
+    children are the subtrees the compiler left for Granite. shared lists
+    the shared components the plan's templates use (root chunk only, see
+    component_dedupe).
+    """
+    name: str
+    node: Dict
+    tokens: int
+    children: List['Chunk'] = field(default_factory=list)
+    files: Optional[Dict[str, str]] = None
+    shared: List = field(default_factory=list)
+
+    @property
+    def is_leaf(self) -> bool:
+        return not self.children
+
+    @property
+    def needs_generation(self) -> bool:
+        return self.is_leaf and self.files is None
+
+    def descendants(self) -> Iterator['Chunk']:
+        """Every chunk below this one, children before their parents"""
+        for child in self.children:
+            yield from child.descendants()
+            yield child
+
+    def leaves(self) -> List['Chunk']:
+        if self.is_leaf:
+            return [self]
+        return [chunk for chunk in self.descendants() if chunk.is_leaf]
+
+    def composites(self) -> List['Chunk']:
+        """Composite chunks, children first (the order they can be composed in)"""
+        if self.is_leaf:
+            return []
+        return [chunk for chunk in self.descendants() if not chunk.is_leaf] + [self]
+
+    def all_chunks(self) -> List['Chunk']:
+        """This chunk and every chunk below it, children first"""
+        return [*self.descendants(), self]
+
+def subtree_tokens(node: Dict) -> int:
+    """Prompt tokens of a node's complete compact design"""
+    return estimate_tokens(compact_figma_node(node, UNLIMITED_TOKENS).text)
+
+def part_name(prefix: str, layer_name: str, seen_names: set) -> str:
+    """'<prefix>-<layer-slug>', with -2, -3... appended to names already used in the plan"""
+    slug = re.sub(r'[^a-z0-9]+', '-', layer_name.lower()).strip('-') or 'part'
+    base_name = f'{prefix}-{slug}'
+    name = base_name
+    suffix = 2
+    while name in seen_names:
+        name = f'{base_name}-{suffix}'
+        suffix += 1
+    seen_names.add(name)
+    return name
+
+def group_node(parent: Dict, members: List[Dict], index: int) -> Dict:
+    """Synthetic frame holding a run of consecutive children, laid out like their parent"""
+    node = {
+        'id': f'{parent.get("id", "")}/group-{index}',
+        'name': f'{parent.get("name", "Group")} {index}',
+        'type': 'FRAME',
+        'children': members
+    }
+    for key in LAYOUT_KEYS:
+        if key in parent:
+            node[key] = parent[key]
+
+    boxes = [member['absoluteBoundingBox'] for member in members if member.get('absoluteBoundingBox')]
+    if boxes:
+        left = min(box['x'] for box in boxes)
+        top = min(box['y'] for box in boxes)
+        node['absoluteBoundingBox'] = {
+            'x': left, 'y': top,
+            'width': max(box['x'] + box['width'] for box in boxes) - left,
+            'height': max(box['y'] + box['height'] for box in boxes) - top
+        }
+    return node
+
+def plan_chunks(node: Dict, component_name: str, token_budget: int) -> Chunk:
+    """Split node until every leaf chunk's design fits token_budget
+
+    A plan without children means the node fits and is generated as usual.
+    """
+    return _plan(node, component_name, token_budget, component_name, {component_name}, subtree_tokens(node))
+
+def _plan(node: Dict, name: str, token_budget: int, prefix: str, seen_names: set, tokens: int) -> Chunk:
+    chunk = Chunk(name, node, tokens)
+    children = [child for child in node.get('children') or [] if child.get('visible') is not False]
+    if tokens <= token_budget or not children:
+        return chunk
+
+    group_limit = token_budget * GROUP_SHARE
+    runs: List[List] = []
+    for child in children:
+        child_tokens = subtree_tokens(child)
+        run = runs[-1] if runs else None
+        if (run is not None and child_tokens <= group_limit
+                and sum(tokens for _, tokens in run) + child_tokens <= group_limit):
+            run.append((child, child_tokens))
+        else:
+            runs.append([(child, child_tokens)])
+
+    groups = 0
+    for run in runs:
+        if len(run) == 1:
+            child, child_tokens = run[0]
+            child_name = part_name(prefix, child.get('name') or child.get('id', ''), seen_names)
+            chunk.children.append(_plan(child, child_name, token_budget, prefix, seen_names, child_tokens))
+        else:
+            groups += 1
+            group = group_node(node, [child for child, _ in run], groups)
+            chunk.children.append(Chunk(part_name(prefix, group['name'], seen_names), group,
+                                        sum(child_tokens for _, child_tokens in run)))
+    return chunk
+
+# ============================================================================
+# Composition
+# ============================================================================
+def selector_for(component_name: str) -> str:
+    return f'app-{component_name}'
+
+def normalize_part(typescript: str, component_name: str) -> str:
+    """Give a generated part the selector, class name and file names the parent imports
+
+    Granite names components loosely (and a replayed generation may carry
+    another part's names), so parts are renamed after generation.
+    """
+    typescript = SELECTOR.sub(lambda m: f'{m.group(1)}{m.group(2)}{selector_for(component_name)}{m.group(2)}',
+                              typescript, count=1)
+    typescript = TEMPLATE_URL.sub(lambda m: f'{m.group(1)}{m.group(2)}./{component_name}.component.html{m.group(2)}',
+                                  typescript, count=1)
+    typescript = STYLE_URL.sub(lambda m: f'{m.group(1)}{m.group(2)}./{component_name}.component.scss{m.group(2)}',
+                               typescript, count=1)
+    match = CLASS_DECLARATION.search(typescript)
+    if match:
+        typescript = re.sub(rf'\b{match.group(1)}\b', component_class_name(component_name), typescript)
+    return typescript
+
+def compose_component(chunk: Chunk, approved: frozenset, colors: Dict[str, Dict[str, str]],
+                      parts_path: Optional[str] = None) -> Dict[str, str]:
+    """TypeScript, HTML and SCSS for a composite chunk
+
+    parts_path is where the children's folders are relative to this
+    component: './parts/' for the planned frame, '../' for composites that
+    are parts themselves.
+    """
+    parts_path = parts_path or f'./{PARTS_DIR}/'
+    node = chunk.node
+    auto_layout = node.get('layoutMode') in ('HORIZONTAL', 'VERTICAL')
+
+    html = [f'<div{container_style(node, approved, colors).attributes()}>']
+    for child in chunk.children:
+        host = StyleBuilder(approved)
+        if not auto_layout:
+            position_style(child.node, node, host)
+        selector = selector_for(child.name)
+        html.append(f'  <{selector}{host.attributes()}></{selector}>')
+    html.append('</div>')
+
+    return {
+        'typescript': component_typescript(chunk.name, [child.name for child in chunk.children], parts_path),
+        'html': '\n'.join(html),
+        'scss': f'/* Composed from {len(chunk.children)} parts of "{node.get("name", chunk.name)}" */'
+    }
+
+def component_typescript(component_name: str, part_names: List[str], parts_path: str) -> str:
+    """Standalone component class without members that imports its parts"""
+    class_names = [component_class_name(name) for name in part_names]
+    imports = [f"import {{ {class_name} }} from '{parts_path}{name}/{name}.component';"
+               for class_name, name in zip(class_names, part_names)]
+    return '\n'.join([
+        "import { Component } from '@angular/core';",
+        "import { CommonModule } from '@angular/common';",
+        *imports,
+        '',
+        '@Component({',
+        f"  selector: '{selector_for(component_name)}',",
+        '  standalone: true,',
+        f"  imports: [{', '.join(['CommonModule', *class_names])}],",
+        f"  templateUrl: './{component_name}.component.html',",
+        f"  styleUrls: ['./{component_name}.component.scss']",
+        '})',
+        f'export class {component_class_name(component_name)} {{}}'
+    ])
+
+def describe_plan(chunk: Chunk, indent: str = '') -> List[str]:
+    """One line per chunk, e.g. for logging a plan"""
+    if chunk.files is not None:
+        kind = f'compiled, {len(chunk.children)} parts for Granite' if chunk.children else 'compiled'
+    else:
+        kind = 'generate' if chunk.is_leaf else f'compose {len(chunk.children)}'
+    lines = [f'{indent}{chunk.name} (~{chunk.tokens} tokens, {kind})']
+    for child in chunk.children:
+        lines.extend(describe_plan(child, indent + '  '))
+    return lines
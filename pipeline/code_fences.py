@@ -0,0 +1,57 @@
+"""
+Incremental Markdown Code Fence Parser
+
+Splits ```typescript / ```html / ```scss blocks out of LLM output while it
+is still streaming. Each block is reported as soon as its closing fence
+arrives, so downstream steps can start before the completion has finished.
+"""
+
+from typing import List, Tuple
+
+FENCE = '```'
+
+class CodeFenceParser:
+    """Feed text chunks, receive (language, content) for every closed block
+
+    Matches the semantics of parse_generated_code: an opening fence is
+    ``` + language + newline, the block ends at the next ``` and its content
+    is stripped.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._language = None  # set while inside a block
+        self._scan_from = 0  # buffer offset already searched for a closing fence
+        self.blocks: List[Tuple[str, str]] = []
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Consume a chunk and return the blocks it completed"""
+        self._buffer += text
+        completed = []
+
+        while True:
+            if self._language is None:
+                start = self._buffer.find(FENCE)
+                if start == -1:
+                    # Keep a possible partial fence at the end of the buffer
+                    self._buffer = self._buffer[-(len(FENCE) - 1):]
+                    break
+                line_end = self._buffer.find('\n', start)
+                if line_end == -1:
+                    self._buffer = self._buffer[start:]
+                    break
+                self._language = self._buffer[start + len(FENCE):line_end].strip()
+                self._buffer = self._buffer[line_end + 1:]
+            else:
+                end = self._buffer.find(FENCE, self._scan_from)
+                if end == -1:
+                    self._scan_from = max(0, len(self._buffer) - (len(FENCE) - 1))
+                    break
+                self._scan_from = 0
+                block = (self._language, self._buffer[:end].strip())
+                completed.append(block)
+                self.blocks.append(block)
+                self._language = None
+                self._buffer = self._buffer[end + len(FENCE):]
+
+        return completed
@@ -0,0 +1,330 @@
+"""
+Shared Components for Repeated Figma Subtrees
+
+Pages repeat the same subtrees many times: instances of one component
+(buttons, cards, tracking rows) and copies of a frame. Generating them
+inline describes every copy to Granite and writes its markup again in every
+page. Instead, each distinct subtree becomes one shared component:
+
+  - subtrees are identified by a structural hash over everything that
+    affects rendering except their text (and names, ids and positions), so
+    instances of one componentId with different labels are the same
+    component
+  - the text of the copies becomes @Input()s of the shared component (named
+    after the text layers, defaults from the first copy); each copy is
+    replaced in the design by a small stub whose element passes its own text
+  - shared components are generated once into components/shared/<name>/ and
+    kept in a registry under their hash (pipeline/.cache/shared-components),
+    so later pages and runs that contain the same subtree reuse them, even
+    when it occurs only once there
+
+Delete a registry file to have its shared component generated again.
+"""
+
+import copy
+import hashlib
+import html
+import json
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from chunk_planner import selector_for
+from publisher import atomic_write
+from route_registry import component_class_name
+from template_bindings import index_class_members
+
+SHARED_DIR = 'shared'
+SHARED_PATH = f'../{SHARED_DIR}/'  # from a component's folder
+PART_SHARED_PATH = f'../../../{SHARED_DIR}/'  # from a part's folder (<component>/parts/<part>/)
+MIN_COPIES = 2
+MIN_NODES = 2  # a single node is cheaper inline than as a component
+CANDIDATE_TYPES = {'INSTANCE', 'FRAME', 'COMPONENT', 'GROUP'}
+
+# Keys that identify a node or place it, rather than describe how it renders
+IGNORED_KEYS = {
+    'id', 'name', 'children', 'characters', 'absoluteBoundingBox', 'absoluteRenderBounds',
+    'relativeTransform', 'characterStyleOverrides', 'styleOverrideTable', 'lineTypes', 'lineIndentations',
+    'componentProperties', 'overrides', 'exposedInstances', 'transitionNodeID', 'interactions',
+    'reactions', 'pluginData', 'sharedPluginData', 'exportSettings', 'boundVariables',
+    'layoutPositioning', 'layoutGrow', 'layoutAlign', 'constraints'
+}
+# Keys a stub keeps so the parent can still place it
+PLACEMENT_KEYS = ('id', 'name', 'type', 'visible', 'absoluteBoundingBox', 'layoutPositioning', 'layoutGrow',
+                  'layoutAlign', 'layoutSizingHorizontal', 'layoutSizingVertical', 'constraints')
+
+SHARED_IMPORT = re.compile(r'''from\s+['"](?:\.\./)+''' + SHARED_DIR + r'''/([a-z0-9-]+)/''')
+ELEMENT = re.compile(r'<app-([a-z0-9-]+)[\s>]')
+CORE_IMPORT = re.compile(r'''import\s*\{([^}]*)\}\s*from\s*['"]@angular/core['"]''')
+IMPORTS_ARRAY = re.compile(r'(\bimports\s*:\s*\[)([^\]]*)\]')
+STANDALONE = re.compile(r'(\bstandalone\s*:\s*true\s*,?)')
+
+@dataclass
+class SharedComponent:
+    """One distinct repeated subtree of a design"""
+    key: str  # structural hash
+    name: str
+    node: Dict  # the first copy, with every text replaced by its input's interpolation
+    inputs: Dict[str, str]  # input name -> default text, in document order
+    copies: int
+
+# ============================================================================
+# Structural Hashing
+# ============================================================================
+def visible_children(node: Dict) -> List[Dict]:
+    return [child for child in node.get('children') or [] if child.get('visible') is not False]
+
+def _size(node: Dict) -> Optional[List[int]]:
+    """Rounded width/height where they are fixed; text and hugging axes follow the content"""
+    box = node.get('absoluteBoundingBox')
+    if not box or node.get('type') == 'TEXT':
+        return None
+    mode = node.get('layoutMode')
+    if mode not in ('HORIZONTAL', 'VERTICAL'):
+        return [round(box.get('width', 0)), round(box.get('height', 0))]
+    size = []
+    for axis, dimension in (('HORIZONTAL', 'width'), ('VERTICAL', 'height')):
+        sizing = node.get(f'layoutSizing{axis.capitalize()}')
+        if sizing is None:
+            sizing_key = 'primaryAxisSizingMode' if mode == axis else 'counterAxisSizingMode'
+            sizing = 'FIXED' if node.get(sizing_key) == 'FIXED' else 'HUG'
+        size.append(round(box.get(dimension, 0)) if sizing == 'FIXED' else None)
+    return size
+
+def structure_hashes(root: Dict) -> Dict[int, Tuple[str, int]]:
+    """(hash, node count) of every visible subtree, keyed by id() of its node"""
+    hashes: Dict[int, Tuple[str, int]] = {}
+
+    def visit(node: Dict) -> Tuple[str, int]:
+        children = [visit(child) for child in visible_children(node)]
+        own = {key: value for key, value in node.items() if key not in IGNORED_KEYS}
+        signature = json.dumps([own, _size(node), [child_hash for child_hash, _ in children]],
+                               sort_keys=True, separators=(',', ':'), default=str)
+        result = (hashlib.sha256(signature.encode('utf-8')).hexdigest()[:16],
+                  1 + sum(count for _, count in children))
+        hashes[id(node)] = result
+        return result
+
+    visit(root)
+    return hashes
+
+# ============================================================================
+# Text Inputs
+# ============================================================================
+def text_nodes(node: Dict) -> List[Dict]:
+    """Visible TEXT nodes in document order"""
+    if node.get('type') == 'TEXT':
+        return [node]
+    return [text for child in visible_children(node) for text in text_nodes(child)]
+
+def input_names(texts: List[Dict]) -> List[str]:
+    """camelCase names from the text layers ('Tracking Number' -> trackingNumber), unique"""
+    names = []
+    for text in texts:
+        words = re.findall(r'[A-Za-z0-9]+', text.get('name') or '')
+        base = (words[0].lower() + ''.join(word.capitalize() for word in words[1:])) if words else 'text'
+        if not base[0].isalpha():
+            base = 'text' + base
+        name = base
+        suffix = 2
+        while name in names:
+            name = f'{base}{suffix}'
+            suffix += 1
+        names.append(name)
+    return names
+
+def template_node(node: Dict, names: List[str]) -> Dict:
+    """Copy of node whose texts are the interpolations of their inputs"""
+    template = copy.deepcopy(node)
+    for text, name in zip(text_nodes(template), names):
+        text['characters'] = f'{{{{ {name} }}}}'
+    return template
+
+def shared_element(name: str, inputs: Dict[str, str], attributes: str = '') -> str:
+    """The shared component's element, passing inputs as static attributes"""
+    selector = selector_for(name)
+    values = ''.join(f' {key}="{escape_attribute(value)}"' for key, value in inputs.items())
+    return f'<{selector}{values}{attributes}></{selector}>'
+
+def escape_attribute(value: str) -> str:
+    """Attribute value safe for an Angular template ({{ would start an interpolation)"""
+    escaped = html.escape(value, quote=True).replace('{', '&#123;').replace('}', '&#125;')
+    return escaped.replace('\n', '&#10;')
+
+def is_shared_use(node: Dict) -> bool:
+    return 'sharedComponent' in node
+
+def use_node(node: Dict, name: str, inputs: Dict[str, str]) -> Dict:
+    """Stub replacing one copy: its placement plus the element that renders it"""
+    stub = {key: node[key] for key in PLACEMENT_KEYS if key in node}
+    stub['sharedComponent'] = name
+    stub['sharedInputs'] = inputs
+    stub['sharedElement'] = shared_element(name, inputs)
+    return stub
+
+# ============================================================================
+# Registry
+# ============================================================================
+class SharedRegistry:
+    """Generated shared components by structural hash, one JSON file each
+
+    Entries hold the name, input names and defaults, the files and the
+    brand catalog hash they were validated against. lock(key) serializes
+    generating one component across threads (batch workers).
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, Dict] = {}
+        self._names: Dict[str, str] = {}  # name -> key, including names reserved in this process
+        if self.directory.exists():
+            for path in sorted(self.directory.glob('*.json')):
+                try:
+                    entry = json.loads(path.read_text(encoding='utf-8'))
+                except (OSError, ValueError):
+                    continue
+                self._entries[path.stem] = entry
+                self._names.setdefault(entry.get('name', ''), path.stem)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def by_name(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            key = self._names.get(name)
+            return self._entries.get(key) if key else None
+
+    def lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def reserve(self, key: str, layer_name: str) -> str:
+        """The name of key's component: its registered one, or a new unique slug of layer_name"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                return entry['name']
+            for name, owner in self._names.items():
+                if owner == key:
+                    return name
+            # 'Result Row 1' and 'Result Row 2' are copies of one 'result-row'
+            slug = re.sub(r'[^a-z0-9]+', '-', re.sub(r'\s*\d+$', '', layer_name).lower()).strip('-') or 'shared'
+            name = slug
+            suffix = 2
+            while name in self._names:
+                name = f'{slug}-{suffix}'
+                suffix += 1
+            self._names[name] = key
+            return name
+
+    def store(self, key: str, entry: Dict):
+        atomic_write(self.directory / f'{key}.json', json.dumps(entry, indent=2))
+        with self._lock:
+            self._entries[key] = entry
+            self._names[entry['name']] = key
+
+# ============================================================================
+# Extraction
+# ============================================================================
+def extract_shared(root: Dict, registry: SharedRegistry,
+                   min_copies: int = MIN_COPIES) -> Tuple[Dict, List[SharedComponent]]:
+    """Replace repeated subtrees of root with stubs; returns (design, shared components)
+
+    A subtree is shared when it occurs min_copies times in this design or
+    is already in the registry. Only the outermost repeats are replaced;
+    the root itself never is. The design is a copy, root is not modified.
+    """
+    hashes = structure_hashes(root)
+    counts = Counter(hashes[id(node)][0] for node in _candidates(root) if hashes[id(node)][1] >= MIN_NODES)
+    shared: Dict[str, SharedComponent] = {}
+
+    def replace(node: Dict) -> Dict:
+        children = []
+        for child in node.get('children') or []:
+            key, size = hashes.get(id(child), ('', 0))
+            if (child.get('visible') is not False and child.get('type') in CANDIDATE_TYPES and size >= MIN_NODES
+                    and (counts[key] >= min_copies or registry.get(key) is not None)):
+                children.append(_use(child, key))
+            else:
+                children.append(replace(child) if child.get('children') else child)
+        return {**node, 'children': children} if 'children' in node else node
+
+    def _use(node: Dict, key: str) -> Dict:
+        texts = [text.get('characters') or '' for text in text_nodes(node)]
+        component = shared.get(key)
+        if component is None:
+            entry = registry.get(key)
+            names = entry['inputs'] if entry else input_names(text_nodes(node))
+            defaults = entry['defaults'] if entry else texts
+            component = SharedComponent(key, registry.reserve(key, node.get('name') or ''),
+                                        template_node(node, names), dict(zip(names, defaults)), 0)
+            shared[key] = component
+        component.copies += 1
+        inputs = {name: text for (name, default), text in zip(component.inputs.items(), texts) if text != default}
+        return use_node(node, component.name, inputs)
+
+    return replace(root), list(shared.values())
+
+def _candidates(root: Dict):
+    for child in visible_children(root):
+        if child.get('type') in CANDIDATE_TYPES:
+            yield child
+        yield from _candidates(child)
+
+# ============================================================================
+# Files
+# ============================================================================
+def bind_inputs(files: Dict[str, str], inputs: Dict[str, str]) -> Tuple[Dict[str, str], List[str]]:
+    """Declare inputs as @Input()s with their defaults; returns (files, inputs the template never reads)
+
+    Compiled templates carry the interpolations escaped like any text; they
+    are turned back into bindings here.
+    """
+    template = files['html']
+    typescript = files['typescript']
+    for name in inputs:
+        template = template.replace(f'&#123;&#123; {name} &#125;&#125;', f'{{{{ {name} }}}}')
+        # Granite may declare the interpolated names itself
+        typescript = re.sub(rf'^[ \t]*(?:@Input\(\)\s*)?{name}\s*[?!]?\s*(?::[^=;\n]*)?(?:=[^;\n]*)?;[ \t]*\n',
+                            '', typescript, flags=re.MULTILINE)
+    unbound = [name for name in inputs if not re.search(rf'\{{\{{\s*{name}\s*\}}\}}', template)]
+
+    class_index = index_class_members(typescript)
+    if inputs and class_index is not None:
+        declarations = ''.join(f'\n  @Input() {name} = {json.dumps(value)};' for name, value in inputs.items())
+        typescript = typescript[:class_index.body_start] + declarations + '\n' + typescript[class_index.body_start:]
+        match = CORE_IMPORT.search(typescript)
+        if match and 'Input' not in [name.strip() for name in match.group(1).split(',')]:
+            names = ', '.join([name.strip() for name in match.group(1).split(',') if name.strip()] + ['Input'])
+            typescript = typescript[:match.start(1)] + f' {names} ' + typescript[match.end(1):]
+    return {**files, 'html': template, 'typescript': typescript}, unbound
+
+def import_shared(typescript: str, template: str, shared_names: Set[str], shared_path: str = SHARED_PATH) -> str:
+    """Import the shared components whose elements the template uses"""
+    used = [name for name in dict.fromkeys(ELEMENT.findall(template)) if name in shared_names]
+    missing = [name for name in used if f'{SHARED_DIR}/{name}/' not in typescript]
+    if not missing:
+        return typescript
+    class_names = [component_class_name(name) for name in missing]
+    statements = ''.join(f"import {{ {class_name} }} from '{shared_path}{name}/{name}.component';\n"
+                         for class_name, name in zip(class_names, missing))
+    decorator = typescript.find('@Component')
+    insert_at = typescript.rfind('\n', 0, decorator) + 1 if decorator > 0 else 0
+    typescript = typescript[:insert_at].rstrip('\n') + '\n' + statements + '\n' + typescript[insert_at:].lstrip('\n')
+    if IMPORTS_ARRAY.search(typescript):
+        return IMPORTS_ARRAY.sub(lambda m: m.group(1) + ', '.join(filter(None, [m.group(2).strip(), *class_names])) + ']',
+                                 typescript, count=1)
+    if STANDALONE.search(typescript):
+        return STANDALONE.sub(lambda m: m.group(1).rstrip(',') + f',\n  imports: [{", ".join(class_names)}],',
+                              typescript, count=1)
+    return typescript
+
+def shared_imports(typescript: str) -> List[str]:
+    """Names of the shared components a component file imports"""
+    return SHARED_IMPORT.findall(typescript)
@@ -0,0 +1,106 @@
+"""
+Figma Design Diffs and Snapshots for Incremental Regeneration
+
+Watch mode keeps a snapshot of every component it generates: the node
+document it was generated from and a design hash per generated part. When
+the Figma file changes:
+
+  - diff_designs() compares the new document with the snapshot node by node
+    (by id), so unchanged components are skipped and changes are reported
+    as added, removed and changed layers
+  - design_hash() of each planned part is compared with the snapshot; parts
+    whose design is unchanged keep the files already published, and only
+    the changed ones go back through generation
+
+Hashes are taken over the compact design (figma_compact), i.e. exactly what
+a prompt would contain, with positions relative to the parent: moving a
+whole frame does not change the parts inside it.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from chunk_planner import UNLIMITED_TOKENS
+from figma_compact import compact_figma_node
+from publisher import atomic_write
+
+SNAPSHOT_VERSION = 1
+
+class DesignDiff(NamedTuple):
+    """Layers as (id, name) pairs"""
+    added: List[Tuple[str, str]]
+    removed: List[Tuple[str, str]]
+    changed: List[Tuple[str, str]]
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def summary(self, limit: int = 5) -> str:
+        """'2 changed (Status, Label), 1 added (Result Row 4)'"""
+        parts = []
+        for kind, layers in (('changed', self.changed), ('added', self.added), ('removed', self.removed)):
+            if layers:
+                names = [name or layer_id for layer_id, name in layers[:limit]]
+                more = f', +{len(layers) - limit}' if len(layers) > limit else ''
+                parts.append(f'{len(layers)} {kind} ({", ".join(names)}{more})')
+        return ', '.join(parts) or 'no changes'
+
+def design_hash(node: Dict) -> str:
+    """Hash of a node's complete compact design"""
+    text = compact_figma_node(node, UNLIMITED_TOKENS).text
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def _layer_signatures(node: Dict, parent_box: Optional[Dict] = None,
+                      signatures: Optional[Dict[str, Tuple[str, str]]] = None) -> Dict[str, Tuple[str, str]]:
+    """id -> (signature of the node's own properties, name) for a whole tree"""
+    if signatures is None:
+        signatures = {}
+    own = {key: value for key, value in node.items() if key not in ('children', 'absoluteBoundingBox')}
+    own['children'] = [child.get('id') for child in node.get('children') or []]
+    box = node.get('absoluteBoundingBox')
+    if box:
+        origin = parent_box or box
+        own['box'] = [round(box.get('x', 0) - origin.get('x', 0)), round(box.get('y', 0) - origin.get('y', 0)),
+                      round(box.get('width', 0)), round(box.get('height', 0))]
+    signatures[node.get('id', '')] = (json.dumps(own, sort_keys=True, default=str), node.get('name', ''))
+    for child in node.get('children') or []:
+        _layer_signatures(child, box, signatures)
+    return signatures
+
+def diff_designs(old: Dict, new: Dict) -> DesignDiff:
+    """Layers added, removed and changed between two versions of a node"""
+    before = _layer_signatures(old)
+    after = _layer_signatures(new)
+    return DesignDiff(
+        added=[(layer_id, after[layer_id][1]) for layer_id in after if layer_id not in before],
+        removed=[(layer_id, before[layer_id][1]) for layer_id in before if layer_id not in after],
+        changed=[(layer_id, after[layer_id][1]) for layer_id in after
+                 if layer_id in before and before[layer_id][0] != after[layer_id][0]]
+    )
+
+class SnapshotStore:
+    """One JSON snapshot per component: {file_key, node_id, version, document, parts}
+
+    parts maps each part generated by Granite (and the component itself
+    when it was one prompt) to the design_hash it was generated from.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def path(self, component_name: str) -> Path:
+        return self.directory / f'{component_name}.json'
+
+    def load(self, component_name: str) -> Optional[Dict]:
+        try:
+            snapshot = json.loads(self.path(component_name).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return snapshot if snapshot.get('snapshot_version') == SNAPSHOT_VERSION else None
+
+    def save(self, component_name: str, snapshot: Dict):
+        atomic_write(self.path(component_name),
+                     json.dumps({**snapshot, 'snapshot_version': SNAPSHOT_VERSION}, separators=(',', ':')))
@@ -0,0 +1,271 @@
+"""
+Angular Dev Server Supervisor
+
+Starts `npm start` (or PIPELINE_DEV_SERVER_CMD) on any OS and keeps it
+running across regenerations, batch runs and pipeline invocations. The
+server's output goes to a log file that a reader thread follows, so
+readiness and every incremental rebuild are detected from the Angular CLI
+messages the moment they are printed:
+  webpack builder:  "Compiled successfully." / "Failed to compile."
+  esbuild builder:  "Application bundle generation complete." / "...failed."
+
+The pid and log offset are kept in a small state file; a later run attaches
+to the same process (and its log) instead of cold-starting another one.
+
+Usage:
+  python pipeline/dev_server.py status|start|stop
+"""
+
+import json
+import os
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import List, Optional, Union
+
+from publisher import atomic_write
+
+BUILD_OK = re.compile(r'compiled successfully|application bundle generation complete', re.IGNORECASE)
+BUILD_FAILED = re.compile(r'failed to compile|application bundle generation failed', re.IGNORECASE)
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+def split_command(command: Union[str, List[str]]) -> List[str]:
+    """Split a command line and resolve the executable (npm is npm.cmd on Windows)"""
+    args = shlex.split(command, posix=os.name != 'nt') if isinstance(command, str) else list(command)
+    resolved = shutil.which(args[0])
+    if resolved:
+        args[0] = resolved
+    return args
+
+def pid_alive(pid: int) -> bool:
+    if not pid:
+        return False
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def url_responds(url: str, timeout: float = 2) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+class DevServer:
+    """One supervised dev server process
+
+    build_count counts builds finished while this object was watching; take
+    it before changing files and pass it to wait_for_build() to wait for the
+    rebuild those changes trigger.
+    """
+
+    def __init__(self, command: Union[str, List[str]], cwd: Path, url: str,
+                 state_path: Path, log_path: Path):
+        self.command = command
+        self.cwd = Path(cwd)
+        self.url = url
+        self.state_path = Path(state_path)
+        self.log_path = Path(log_path)
+        self.pid: Optional[int] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.external = False  # a server we did not start (no log to follow)
+        self.started = False  # True when this object cold-started the process
+        self.condition = threading.Condition()
+        self.build_count = 0
+        self.last_status: Optional[str] = None  # 'ok' or 'failed'
+        self.last_line = ''
+        self._reader: Optional[threading.Thread] = None
+        self._stop_reading = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def running(self) -> bool:
+        if self.external:
+            return url_responds(self.url)
+        if self.process is not None:
+            return self.process.poll() is None
+        return pid_alive(self.pid)
+
+    def start(self, timeout: float = 120) -> bool:
+        """Attach to or start the server and wait until its first build is served"""
+        if self.pid and self.running():
+            return True
+        if self._attach():
+            return True
+        if url_responds(self.url):
+            # Started by hand: usable, but rebuilds cannot be observed
+            self.external = True
+            return True
+
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        log_file = open(self.log_path, 'wb')
+        kwargs = {}
+        if os.name == 'nt':
+            kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+        else:
+            kwargs['start_new_session'] = True  # survives the pipeline and can be stopped as a group
+        self.process = subprocess.Popen(
+            split_command(self.command), cwd=self.cwd, stdin=subprocess.DEVNULL,
+            stdout=log_file, stderr=subprocess.STDOUT, **kwargs
+        )
+        log_file.close()
+        self.pid = self.process.pid
+        self.started = True
+        self._write_state()
+        self._follow(0)
+        return self.wait_ready(timeout)
+
+    def wait_ready(self, timeout: float = 120) -> bool:
+        """Wait for the first successful build, then for the URL to answer"""
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.last_status != 'ok':
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.running():
+                    return False
+                self.condition.wait(min(remaining, 1.0))
+        # The bundle is ready a moment before the HTTP listener on some builders
+        while time.time() < deadline:
+            if url_responds(self.url, timeout=1):
+                return True
+            time.sleep(0.1)
+        return False
+
+    def wait_for_build(self, since: int, timeout: float = 60) -> Optional[str]:
+        """Status ('ok'/'failed') of the first build finished after build_count == since, None on timeout"""
+        if self.external:
+            return None
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.build_count <= since:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.running():
+                    return None
+                self.condition.wait(min(remaining, 1.0))
+            return self.last_status
+
+    def stop(self):
+        """Stop the server and its child processes (ng serve runs under npm)"""
+        self._stop_reading.set()
+        pid = self.pid or self._read_state().get('pid')
+        if pid and pid_alive(pid):
+            if os.name == 'nt':
+                subprocess.run(['taskkill', '/PID', str(pid), '/T', '/F'], capture_output=True)
+            else:
+                try:
+                    os.killpg(pid, signal.SIGTERM)
+                except (ProcessLookupError, PermissionError):
+                    os.kill(pid, signal.SIGTERM)
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        try:
+            self.state_path.unlink()
+        except OSError:
+            pass
+        self.pid = None
+        self.process = None
+
+    # ------------------------------------------------------------------
+    # State and log following
+    # ------------------------------------------------------------------
+    def _read_state(self) -> dict:
+        try:
+            return json.loads(self.state_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self):
+        atomic_write(self.state_path, json.dumps({
+            'pid': self.pid, 'url': self.url, 'log': str(self.log_path), 'started_at': time.time()
+        }))
+
+    def _attach(self) -> bool:
+        """Reuse a server started by an earlier run"""
+        state = self._read_state()
+        pid = state.get('pid')
+        if not pid or not pid_alive(pid) or state.get('url') != self.url or not url_responds(self.url):
+            return False
+        self.pid = pid
+        offset = self.log_path.stat().st_size if self.log_path.exists() else 0
+        self._follow(offset)
+        return True
+
+    def _follow(self, offset: int):
+        self._stop_reading.clear()
+        self._reader = threading.Thread(target=self._read_log, args=(offset,), daemon=True)
+        self._reader.start()
+
+    def _read_log(self, offset: int):
+        """Follow the log file and turn build messages into build events"""
+        pending = b''
+        with open(self.log_path, 'rb') as f:
+            f.seek(offset)
+            while not self._stop_reading.is_set():
+                chunk = f.read(65536)
+                if not chunk:
+                    if not self.running():
+                        with self.condition:
+                            self.condition.notify_all()
+                        return
+                    time.sleep(0.05)
+                    continue
+                pending += chunk
+                *lines, pending = pending.split(b'\n')
+                for line in lines:
+                    self._handle_line(ANSI_ESCAPE.sub('', line.decode('utf-8', 'replace')).strip())
+
+    def _handle_line(self, line: str):
+        if not line:
+            return
+        status = 'failed' if BUILD_FAILED.search(line) else 'ok' if BUILD_OK.search(line) else None
+        with self.condition:
+            self.last_line = line
+            if status:
+                self.build_count += 1
+                self.last_status = status
+                self.condition.notify_all()
+
+if __name__ == '__main__':
+    base_dir = Path(__file__).parent.parent
+    server = DevServer(
+        os.getenv('PIPELINE_DEV_SERVER_CMD', 'npm start'),
+        cwd=base_dir / 'generated-app',
+        url=os.getenv('PIPELINE_DEV_SERVER_URL', 'http://localhost:4200'),
+        state_path=base_dir / 'pipeline' / '.cache' / 'dev-server.json',
+        log_path=base_dir / 'pipeline' / '.cache' / 'dev-server.log'
+    )
+    action = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if action == 'start':
+        print('ready' if server.start() else f'failed, see {server.log_path}')
+    elif action == 'stop':
+        server.stop()
+        print('stopped')
+    else:
+        state = server._read_state()
+        alive = pid_alive(state.get('pid')) and url_responds(server.url)
+        print(f'running (pid {state["pid"]}, log {state["log"]})' if alive else 'not running')
@@ -0,0 +1,278 @@
+"""
+Rule-Based Fast Path: Figma to Angular Without the LLM
+
+Most frames are text, rectangles and auto-layout stacks, which map onto
+markup deterministically. This compiler writes the same three files as a
+Granite completion (parse_generated_code) for those nodes in milliseconds:
+
+  TEXT                          <p>/<h1-3>/<span> with font weight, color and
+                                alignment classes, size and line height inline
+  FRAME, GROUP, COMPONENT,      <div> with flex/gap/padding/background classes;
+  SECTION                       children without auto-layout are positioned
+                                absolutely, as in Figma
+  RECTANGLE and other shapes    sized <div> with fill, stroke, radius
+                                (vectors become boxes: the prompt has no paths)
+  INSTANCE of a known component <button>, <a> or <input> (KNOWN_COMPONENTS)
+  Stub of a shared component    its element, passing the copy's texts
+                                (see component_dedupe.py)
+
+Anything else (instances of other components, unknown node types) is left
+as a hole: the template gets the selector of a part component, and the
+subtree is generated by Granite as that part (see chunk_planner.py).
+Classes come from brand_styles, so compiled templates always pass the
+brand CSS validation.
+"""
+
+import html
+from typing import Dict, List, NamedTuple, Optional
+
+from brand_styles import (StyleBuilder, add_fill, add_shape, add_stroke, container_style,
+                          position_style, px, solid_fill)
+from chunk_planner import component_typescript, part_name, selector_for
+from component_dedupe import is_shared_use, shared_element
+
+CONTAINER_TYPES = {'FRAME', 'GROUP', 'COMPONENT', 'COMPONENT_SET', 'SECTION'}
+SHAPE_TYPES = {'RECTANGLE', 'ELLIPSE', 'VECTOR', 'LINE', 'STAR', 'REGULAR_POLYGON', 'BOOLEAN_OPERATION'}
+AUTO_LAYOUT = ('HORIZONTAL', 'VERTICAL')
+
+# First segment of a component name (lowercase) -> element
+KNOWN_COMPONENTS = {'button': 'button', 'link': 'a', 'input': 'input', 'text field': 'input'}
+
+FONT_WEIGHTS = {300: 'font-roboto-light', 400: 'font-roboto-regular', 500: 'font-roboto-medium',
+                700: 'font-roboto-bold', 900: 'font-roboto-black'}
+HEADING_SIZES = ((32, 'h1'), (24, 'h2'), (20, 'h3'))
+TEXT_ALIGN = {'CENTER': ('text-center', 'text-align: center'), 'RIGHT': (None, 'text-align: right'),
+              'JUSTIFIED': (None, 'text-align: justify')}
+TEXT_CASE = {'UPPER': 'uppercase', 'LOWER': 'lowercase', 'TITLE': 'capitalize'}
+
+class Hole(NamedTuple):
+    """A subtree the compiler cannot write, generated by Granite as a part"""
+    name: str
+    node: Dict
+
+class CompiledComponent(NamedTuple):
+    files: Dict[str, str]
+    holes: List[Hole]
+    nodes_compiled: int
+
+def known_element(node: Dict) -> Optional[str]:
+    """Element for an INSTANCE of a known component, None for any other node"""
+    if node.get('type') != 'INSTANCE':
+        return None
+    family = (node.get('name') or '').split('/')[0].strip().lower()
+    return KNOWN_COMPONENTS.get(family)
+
+def can_compile(node: Dict) -> bool:
+    node_type = node.get('type')
+    return (node_type in CONTAINER_TYPES or node_type in SHAPE_TYPES or node_type == 'TEXT'
+            or is_shared_use(node) or known_element(node) is not None)
+
+def escape_text(text: str) -> str:
+    """Text content safe for an Angular template ({, } and @ are template syntax)"""
+    escaped = html.escape(text, quote=False)
+    escaped = escaped.replace('{', '&#123;').replace('}', '&#125;').replace('@', '&#64;')
+    return escaped.replace('\n', '<br>')
+
+def first_text(node: Dict) -> str:
+    if node.get('type') == 'TEXT':
+        return node.get('characters') or ''
+    for child in node.get('children') or []:
+        text = first_text(child)
+        if text:
+            return text
+    return ''
+
+def visible_children(node: Dict) -> List[Dict]:
+    return [child for child in node.get('children') or [] if child.get('visible') is not False]
+
+class FastCompiler:
+    """Compiles one node into a component; unsupported subtrees become holes
+
+    prefix and seen_names name the holes' part components (as in a chunk
+    plan), parts_path is where their folders are relative to this component.
+    """
+
+    def __init__(self, approved: frozenset, colors: Dict[str, Dict[str, str]], prefix: str,
+                 seen_names: set, parts_path: str = './parts/'):
+        self.approved = approved
+        self.colors = colors
+        self.prefix = prefix
+        self.seen_names = seen_names
+        self.parts_path = parts_path
+        self.holes: List[Hole] = []
+        self.nodes_compiled = 0
+
+    def compile(self, node: Dict, component_name: str) -> Optional[CompiledComponent]:
+        """The component's files, or None when the node itself is not supported"""
+        if not can_compile(node):
+            return None
+        lines = self.element(node, None, 0, inline=False)
+        files = {
+            'typescript': component_typescript(component_name, [hole.name for hole in self.holes], self.parts_path),
+            'html': '\n'.join(lines),
+            'scss': f'/* Compiled from "{node.get("name", component_name)}" without the LLM */'
+        }
+        return CompiledComponent(files, self.holes, self.nodes_compiled)
+
+    # ------------------------------------------------------------------
+    # Elements
+    # ------------------------------------------------------------------
+    def element(self, node: Dict, parent: Optional[Dict], depth: int, inline: bool) -> List[str]:
+        indent = '  ' * depth
+        if not can_compile(node):
+            return [indent + self.hole(node, parent)]
+
+        self.nodes_compiled += 1
+        if is_shared_use(node):
+            host = StyleBuilder(self.approved)
+            self.place(host, node, parent)
+            return [indent + shared_element(node['sharedComponent'], node['sharedInputs'], host.attributes())]
+        node_type = node.get('type')
+        if node_type == 'TEXT':
+            return [indent + self.text(node, parent, inline)]
+        if node_type in SHAPE_TYPES:
+            style = StyleBuilder(self.approved)
+            add_fill(style, node.get('fills'), self.colors)
+            add_stroke(style, node)
+            if node_type == 'ELLIPSE':
+                style.add('rounded-full', 'border-radius: 9999px')
+            add_shape(style, node)
+            self.size(style, node, parent)
+            label = ' role="img" aria-label="{}"'.format(html.escape(node.get('name', ''))) \
+                if any(paint.get('type') == 'IMAGE' for paint in node.get('fills') or []) else ''
+            return [f'{indent}<div{style.attributes()}{label}></div>']
+
+        tag = known_element(node) or ('span' if inline else 'div')
+        style = container_style(node, self.approved, self.colors, size=False)
+        if tag != 'div' and tag != 'span':
+            self.control_style(style, node, tag)
+        self.size(style, node, parent)
+        children = visible_children(node)
+        if any(child.get('layoutPositioning') == 'ABSOLUTE' for child in children):
+            style.add('relative', 'position: relative')
+
+        if tag == 'input':
+            self.nodes_compiled += sum(1 for _ in children)
+            placeholder = html.escape(first_text(node), quote=True)
+            return [f'{indent}<input type="text" placeholder="{placeholder}"{style.attributes()}>']
+
+        attributes = ' type="button"' if tag == 'button' else ' href="#"' if tag == 'a' else ''
+        lines = [f'{indent}<{tag}{attributes}{style.attributes()}>']
+        child_inline = inline or tag in ('button', 'a')
+        for child in children:
+            lines.extend(self.element(child, node, depth + 1, child_inline))
+        lines.append(f'{indent}</{tag}>')
+        return lines
+
+    def control_style(self, style: StyleBuilder, node: Dict, tag: str):
+        """Reset browser defaults of buttons and links the brand reset does not cover"""
+        style.add('cursor-pointer', 'cursor: pointer')
+        if not node.get('strokes'):
+            style.add(None, 'border: none')
+        if solid_fill(node.get('fills')) is None and tag == 'button':
+            style.add(None, 'background: none')
+        if tag == 'a':
+            style.add(None, 'text-decoration: none')
+
+    def text(self, node: Dict, parent: Optional[Dict], inline: bool) -> str:
+        text_style = node.get('style') or {}
+        font_size = text_style.get('fontSize') or 16
+        tag = 'span' if inline else next((tag for size, tag in HEADING_SIZES if font_size >= size), 'p')
+
+        style = StyleBuilder(self.approved)
+        family = text_style.get('fontFamily')
+        if family and family != 'Roboto':
+            style.add(None, f"font-family: {family}, sans-serif")
+        weight = text_style.get('fontWeight')
+        if weight:
+            nearest = min(FONT_WEIGHTS, key=lambda value: abs(value - weight))
+            style.add(FONT_WEIGHTS[nearest] if abs(nearest - weight) <= 50 else None, f'font-weight: {weight}')
+        add_fill(style, node.get('fills'), self.colors, prefix='text', prop='color')
+        style.add(None, f'font-size: {px(font_size)}')
+        if text_style.get('lineHeightPx'):
+            style.add(None, f'line-height: {px(text_style["lineHeightPx"])}')
+        if text_style.get('letterSpacing'):
+            style.add(None, f'letter-spacing: {px(text_style["letterSpacing"])}')
+        align = TEXT_ALIGN.get(text_style.get('textAlignHorizontal'))
+        if align:
+            style.add(*align)
+        if text_style.get('textCase') in TEXT_CASE:
+            style.add(None, f'text-transform: {TEXT_CASE[text_style["textCase"]]}')
+        if text_style.get('textDecoration') in ('UNDERLINE', 'STRIKETHROUGH'):
+            decoration = 'underline' if text_style['textDecoration'] == 'UNDERLINE' else 'line-through'
+            style.add(None, f'text-decoration: {decoration}')
+        if node.get('opacity', 1) < 1:
+            style.add(None, f'opacity: {round(node["opacity"], 2)}')
+        self.size(style, node, parent)
+        return f'<{tag}{style.attributes()}>{escape_text(node.get("characters") or "")}</{tag}>'
+
+    def hole(self, node: Dict, parent: Optional[Dict]) -> str:
+        name = part_name(self.prefix, node.get('name') or node.get('id', ''), self.seen_names)
+        self.holes.append(Hole(name, node))
+        host = StyleBuilder(self.approved)
+        self.place(host, node, parent)
+        selector = selector_for(name)
+        return f'<{selector}{host.attributes()}></{selector}>'
+
+    # ------------------------------------------------------------------
+    # Sizing and placement
+    # ------------------------------------------------------------------
+    def place(self, style: StyleBuilder, node: Dict, parent: Optional[Dict]):
+        """Absolute position inside a parent without auto-layout (or an absolute child)"""
+        if parent is not None and (parent.get('layoutMode') not in AUTO_LAYOUT
+                                   or node.get('layoutPositioning') == 'ABSOLUTE'):
+            position_style(node, parent, style)
+
+    def size(self, style: StyleBuilder, node: Dict, parent: Optional[Dict]):
+        """Width and height from Figma's sizing modes (FIXED, HUG, FILL)"""
+        self.place(style, node, parent)
+        box = node.get('absoluteBoundingBox') or {}
+        parent_mode = parent.get('layoutMode') if parent is not None else None
+        in_flow = parent_mode in AUTO_LAYOUT and node.get('layoutPositioning') != 'ABSOLUTE'
+
+        for axis, dimension in (('HORIZONTAL', 'width'), ('VERTICAL', 'height')):
+            sizing = node.get(f'layoutSizing{axis.capitalize()}') or self.inferred_sizing(node, parent, axis)
+            if sizing == 'FIXED' and dimension in box:
+                style.add(None, f'{dimension}: {px(box[dimension])}')
+            elif sizing == 'FILL':
+                if in_flow and parent_mode == axis:
+                    style.add(None, 'flex: 1 1 0')
+                elif in_flow:
+                    style.add(None, 'align-self: stretch')
+                else:
+                    style.add('w-full' if dimension == 'width' else 'h-full', f'{dimension}: 100%')
+
+    def inferred_sizing(self, node: Dict, parent: Optional[Dict], axis: str) -> str:
+        """Sizing mode for files without layoutSizing* (older API responses)"""
+        parent_mode = parent.get('layoutMode') if parent is not None else None
+        if parent_mode in AUTO_LAYOUT and node.get('layoutPositioning') != 'ABSOLUTE':
+            if parent_mode == axis and node.get('layoutGrow') == 1:
+                return 'FILL'
+            if parent_mode != axis and node.get('layoutAlign') == 'STRETCH':
+                return 'FILL'
+
+        node_type = node.get('type')
+        if node_type in SHAPE_TYPES:
+            return 'FIXED'
+        if node_type == 'TEXT':
+            resize = (node.get('style') or {}).get('textAutoResize', 'WIDTH_AND_HEIGHT')
+            if resize == 'NONE' or (resize == 'HEIGHT' and axis == 'HORIZONTAL'):
+                return 'FIXED'
+            return 'HUG'
+
+        mode = node.get('layoutMode')
+        if mode not in AUTO_LAYOUT:
+            return 'FIXED'  # a frame without auto-layout has the size it was drawn with
+        if parent is None and axis == 'HORIZONTAL':
+            return 'FIXED'  # the page width
+        sizing_key = 'primaryAxisSizingMode' if mode == axis else 'counterAxisSizingMode'
+        return 'FIXED' if node.get(sizing_key) == 'FIXED' else 'HUG'
+
+def compile_component(node: Dict, component_name: str, approved: frozenset,
+                      colors: Dict[str, Dict[str, str]], prefix: Optional[str] = None,
+                      seen_names: Optional[set] = None,
+                      parts_path: str = './parts/') -> Optional[CompiledComponent]:
+    """Compile node as component_name; None when the node has to go to Granite whole"""
+    compiler = FastCompiler(approved, colors, prefix or component_name,
+                            seen_names if seen_names is not None else {component_name}, parts_path)
+    return compiler.compile(node, component_name)
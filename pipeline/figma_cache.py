@@ -0,0 +1,83 @@
+"""
+Version-Aware Figma Node Cache
+
+Stores fetched node documents in figma-exports/ using the documented
+naming scheme (figma-{fileKey}-node-{nodeId}-v{version}.json). Entries are
+keyed by file key, node id and Figma file version, so a new file version
+never serves stale design data.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from cache_store import DiskCache
+
+class FigmaCache:
+    """Node document cache with cheap per-file version revalidation"""
+
+    def __init__(self, root: Path, max_bytes: int = 200 * 1024 * 1024, version_ttl: float = 30.0):
+        self.store = DiskCache(root, max_bytes)
+        self.version_ttl = version_ttl
+        self._versions: Dict[str, Tuple[float, str, str]] = {}
+        self._version_lock = threading.Lock()
+
+    @staticmethod
+    def _key(file_key: str, node_id: str, version: str) -> str:
+        return f'{file_key}/{node_id.replace(":", "-")}/{version}'
+
+    def get(self, file_key: str, node_id: str, version: str) -> Optional[Dict]:
+        """Return the cached node entry for this exact file version"""
+        return self.store.get(self._key(file_key, node_id, version))
+
+    def put(self, file_key: str, node_id: str, entry: Dict):
+        """Cache a node entry under the file version it was fetched at"""
+        version = str(entry.get('version') or 'unknown')
+        safe_node_id = node_id.replace(':', '-')
+        self.store.put(
+            self._key(file_key, safe_node_id, version),
+            entry,
+            filename=f'figma-{file_key}-node-{safe_node_id}-v{version}.json',
+            meta={
+                'file_key': file_key,
+                'node_id': safe_node_id,
+                'version': version,
+                'lastModified': entry.get('lastModified'),
+                'stored_at': time.time()
+            }
+        )
+
+    def latest(self, file_key: str, node_id: str) -> Optional[Dict]:
+        """Return the most recently stored version of a node (offline mode)"""
+        safe_node_id = node_id.replace(':', '-')
+        candidates = [
+            (entry['meta'].get('stored_at', 0), key)
+            for key, entry in self.store.entries().items()
+            if entry['meta'].get('file_key') == file_key and entry['meta'].get('node_id') == safe_node_id
+        ]
+        for _, key in sorted(candidates, reverse=True):
+            entry = self.store.get(key)
+            if entry:
+                return entry
+        return None
+
+    def file_version(self, file_key: str, fetch_meta: Callable[[str], Tuple[str, str]]) -> str:
+        """Current (version, lastModified) of a file, revalidated at most once per TTL
+
+        fetch_meta is only called when the remembered version is older than
+        version_ttl, so a batch of workers shares one metadata request.
+        """
+        with self._version_lock:
+            cached = self._versions.get(file_key)
+            if cached and time.time() - cached[0] < self.version_ttl:
+                return cached[1]
+
+            version, last_modified = fetch_meta(file_key)
+            self._versions[file_key] = (time.time(), str(version), last_modified)
+            return str(version)
+
+    def remember_version(self, file_key: str, version: str, last_modified: str):
+        """Record a version fetched elsewhere (e.g. by a watch poll) as current"""
+        with self._version_lock:
+            self._versions[file_key] = (time.time(), str(version), last_modified)
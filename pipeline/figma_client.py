@@ -0,0 +1,135 @@
+"""
+Figma REST Client with Request Coalescing
+
+Node requests that arrive within a short window are merged into one
+/v1/files/{key}/nodes?ids=a,b,c call. Oversized batches are split, and all
+calls go through the shared HttpTransport (pooled keep-alive sessions,
+timeouts, retries honoring Figma's Retry-After on 429, circuit breaker).
+metrics() reports how many node requests were merged into how many calls.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from http_transport import HttpTransport
+
+FIGMA_API_BASE = 'https://api.figma.com'
+
+class FigmaClient:
+    """Coalescing Figma nodes client
+
+    get_node() returns the nodes-endpoint entry for one node
+    ({'document': ..., 'components': ..., ...}) plus the file 'version'
+    and 'lastModified' of the response it was served from.
+    """
+
+    def __init__(self, token: str, api_base: str = FIGMA_API_BASE,
+                 window: float = 0.05, max_batch: int = 50,
+                 timeout: tuple = (5, 60), transport: Optional[HttpTransport] = None):
+        self.token = token
+        self.api_base = api_base.rstrip('/')
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.owns_transport = transport is None
+        self.transport = transport or HttpTransport()
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[tuple]] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+
+        # Counters for metrics()
+        self.requests_made = 0
+        self.nodes_requested = 0
+
+    # ------------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------------
+    def get_node(self, file_key: str, node_id: str) -> Dict:
+        """Fetch one node, coalescing with concurrent requests for the same file"""
+        return self.submit(file_key, node_id).result()
+
+    def submit(self, file_key: str, node_id: str) -> Future:
+        """Queue a node request and return a Future for its entry"""
+        api_node_id = node_id.replace('-', ':')
+        future = Future()
+
+        flush_now = False
+        with self._lock:
+            self.nodes_requested += 1
+            pending = self._pending.setdefault(file_key, [])
+            pending.append((api_node_id, future))
+
+            if len(pending) >= self.max_batch:
+                flush_now = True
+            elif file_key not in self._timers:
+                timer = threading.Timer(self.window, self._flush, args=(file_key,))
+                timer.daemon = True
+                self._timers[file_key] = timer
+                timer.start()
+
+        if flush_now:
+            self._flush(file_key)
+        return future
+
+    def get_json(self, path: str, params: Optional[Dict] = None) -> Dict:
+        """GET any Figma API path through the transport"""
+        response = self.transport.request('GET', f'{self.api_base}{path}', 'figma', self.timeout, params=params,
+                                          headers={'X-Figma-Token': self.token or ''})
+        with self._lock:
+            self.requests_made += 1
+        if not response.ok:
+            raise Exception(f"Figma API error: {response.status_code} - {response.text}")
+        return response.json()
+
+    def metrics(self) -> Dict:
+        """{'nodes_requested', 'requests'}: node lookups and the API calls that served them"""
+        with self._lock:
+            return {'nodes_requested': self.nodes_requested, 'requests': self.requests_made}
+
+    def close(self):
+        """Flush outstanding requests and close the transport if this client created it"""
+        with self._lock:
+            file_keys = list(self._pending)
+        for file_key in file_keys:
+            self._flush(file_key)
+        if self.owns_transport:
+            self.transport.close()
+
+    # ------------------------------------------------------------------------
+    # Batching internals
+    # ------------------------------------------------------------------------
+    def _flush(self, file_key: str):
+        """Send every queued request for a file, split into max_batch chunks"""
+        with self._lock:
+            pending = self._pending.pop(file_key, [])
+            timer = self._timers.pop(file_key, None)
+        if timer:
+            timer.cancel()
+        if not pending:
+            return
+
+        for start in range(0, len(pending), self.max_batch):
+            self._fetch_batch(file_key, pending[start:start + self.max_batch])
+
+    def _fetch_batch(self, file_key: str, batch: List[tuple]):
+        """Fetch one multi-id batch and resolve its futures"""
+        ids = sorted({api_node_id for api_node_id, _ in batch})
+        try:
+            data = self.get_json(f'/v1/files/{file_key}/nodes', params={'ids': ','.join(ids)})
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        nodes = data.get('nodes') or {}
+        for api_node_id, future in batch:
+            node = nodes.get(api_node_id)
+            if not node or 'document' not in node:
+                future.set_exception(Exception(f"Node {api_node_id} not found in Figma file"))
+                continue
+            entry = dict(node)
+            entry['version'] = data.get('version')
+            entry['lastModified'] = data.get('lastModified')
+            future.set_result(entry)
@@ -0,0 +1,205 @@
+"""
+Figma Tree Compaction for Prompts
+
+Turns a Figma node document into a dense JSON form for the LLM prompt:
+- keeps only keys that affect markup (names, text, layout, size, styles)
+- rounds numbers and converts colors to hex
+- moves repeated fills/strokes/typography into a shared style legend
+- fits a token budget by including nodes breadth-first, so the top of the
+  design is always complete and only the deepest levels are cut
+"""
+
+import json
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
+
+CHARS_PER_TOKEN = 4
+
+# Explains the compact keys to the model; included in the prompt
+FORMAT_NOTE = (
+    'Compact format: n=name, t=type, txt=text content, box=[x,y,width,height] relative to parent, '
+    'lay=auto-layout {dir,gap,pad=[top,right,bottom,left],main,cross,wrap}, r=corner radius, '
+    'o=opacity, comp=component id, s=style id (see "styles"), c=children, '
+    'more=number of children omitted for size, '
+    'use=an existing shared component: output exactly this element in place of the node.'
+)
+
+LAYOUT_DIRECTIONS = {'HORIZONTAL': 'row', 'VERTICAL': 'col'}
+
+class CompactDesign(NamedTuple):
+    text: str
+    nodes_included: int
+    nodes_total: int
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for budgeting"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _round(value: float, digits: int = 0):
+    rounded = round(value, digits)
+    return int(rounded) if digits == 0 or rounded == int(rounded) else rounded
+
+def _hex_color(color: Dict, opacity: float = 1.0) -> str:
+    r, g, b = (int(round(color.get(channel, 0) * 255)) for channel in 'rgb')
+    alpha = color.get('a', 1.0) * opacity
+    hex_value = f'#{r:02X}{g:02X}{b:02X}'
+    return hex_value if alpha >= 0.995 else f'{hex_value}/{_round(alpha, 2)}'
+
+def _paints(paints: Optional[List[Dict]]) -> List[str]:
+    """Visible fills or strokes as short strings"""
+    result = []
+    for paint in paints or []:
+        if paint.get('visible') is False:
+            continue
+        paint_type = paint.get('type', '')
+        if paint_type == 'SOLID':
+            result.append(_hex_color(paint.get('color', {}), paint.get('opacity', 1.0)))
+        elif paint_type.startswith('GRADIENT'):
+            stops = [_hex_color(stop.get('color', {})) for stop in paint.get('gradientStops', [])]
+            result.append(f'{paint_type.lower()}({",".join(stops)})')
+        elif paint_type == 'IMAGE':
+            result.append('image')
+    return result
+
+def _style_signature(node: Dict) -> Optional[str]:
+    """Serialized visual style of a node, shared through the legend"""
+    style = {}
+    fills = _paints(node.get('fills'))
+    if fills:
+        style['fill'] = fills
+    strokes = _paints(node.get('strokes'))
+    if strokes:
+        style['stroke'] = strokes
+        if node.get('strokeWeight'):
+            style['strokeW'] = _round(node['strokeWeight'], 1)
+
+    text_style = node.get('style') or {}
+    if node.get('type') == 'TEXT' and text_style:
+        for source, target in (('fontFamily', 'font'), ('fontWeight', 'weight'),
+                               ('fontSize', 'size'), ('lineHeightPx', 'lh'),
+                               ('textAlignHorizontal', 'align'), ('textCase', 'case')):
+            if text_style.get(source) not in (None, 'LEFT', 'ORIGINAL'):
+                value = text_style[source]
+                style[target] = _round(value, 1) if isinstance(value, float) else value
+
+    effects = [effect.get('type', '').lower() for effect in node.get('effects') or []
+               if effect.get('visible', True)]
+    if effects:
+        style['fx'] = sorted(set(effects))
+
+    return json.dumps(style, sort_keys=True, separators=(',', ':')) if style else None
+
+def _compact_node(node: Dict, parent_box: Optional[Dict]) -> Optional[Dict]:
+    """Compact one node and its visible children (style ids are assigned later)"""
+    if node.get('visible') is False:
+        return None
+
+    compact = {'n': node.get('name', ''), 't': node.get('type', '')}
+    if node.get('sharedElement'):
+        compact['use'] = node['sharedElement']
+    if node.get('characters'):
+        compact['txt'] = node['characters']
+
+    box = node.get('absoluteBoundingBox')
+    if box:
+        x = box.get('x', 0) - (parent_box.get('x', 0) if parent_box else box.get('x', 0))
+        y = box.get('y', 0) - (parent_box.get('y', 0) if parent_box else box.get('y', 0))
+        compact['box'] = [_round(x), _round(y), _round(box.get('width', 0)), _round(box.get('height', 0))]
+
+    if node.get('layoutMode') in LAYOUT_DIRECTIONS:
+        layout = {'dir': LAYOUT_DIRECTIONS[node['layoutMode']]}
+        if node.get('itemSpacing'):
+            layout['gap'] = _round(node['itemSpacing'])
+        padding = [_round(node.get(f'padding{side}', 0)) for side in ('Top', 'Right', 'Bottom', 'Left')]
+        if any(padding):
+            layout['pad'] = padding
+        if node.get('primaryAxisAlignItems', 'MIN') != 'MIN':
+            layout['main'] = node['primaryAxisAlignItems'].lower()
+        if node.get('counterAxisAlignItems', 'MIN') != 'MIN':
+            layout['cross'] = node['counterAxisAlignItems'].lower()
+        if node.get('layoutWrap') == 'WRAP':
+            layout['wrap'] = True
+        compact['lay'] = layout
+
+    if node.get('cornerRadius'):
+        compact['r'] = _round(node['cornerRadius'])
+    if node.get('opacity', 1) < 1:
+        compact['o'] = _round(node['opacity'], 2)
+    if node.get('componentId'):
+        compact['comp'] = node['componentId']
+
+    signature = _style_signature(node)
+    if signature:
+        compact['_style'] = signature
+
+    children = []
+    for child in node.get('children') or []:
+        compact_child = _compact_node(child, box)
+        if compact_child:
+            children.append(compact_child)
+    compact['_children'] = children
+    return compact
+
+def compact_figma_node(node: Dict, token_budget: int = 1500) -> CompactDesign:
+    """Compact a Figma node document to fit token_budget
+
+    Nodes are included breadth-first until the budget is spent; every
+    included node whose children were cut gets a "more" count instead.
+    """
+    root = _compact_node(node, None) or {'n': node.get('name', ''), 't': node.get('type', ''), '_children': []}
+    budget_chars = token_budget * CHARS_PER_TOKEN
+
+    styles: Dict[str, str] = {}  # signature -> style id
+    used_chars = len('{"styles":{},"tree":}')
+    included = 0
+    total = 0
+    exhausted = False
+
+    queue = deque([root])
+    while queue:
+        compact = queue.popleft()
+        total += 1
+        if exhausted:
+            queue.extend(compact['_children'])
+            continue
+
+        own = {key: value for key, value in compact.items() if not key.startswith('_')}
+        # Own keys plus room for the children list, a style reference and a "more" count
+        cost = len(json.dumps(own, separators=(',', ':'), ensure_ascii=False)) + len(',"c":[],"more":00')
+        signature = compact.get('_style')
+        new_style = signature is not None and signature not in styles
+        if signature is not None:
+            cost += len(',"s":"S00"')
+        if new_style:
+            cost += len(signature) + len('"S00":,')
+
+        if included and used_chars + cost > budget_chars:
+            exhausted = True
+            queue.extend(compact['_children'])
+            continue
+
+        used_chars += cost
+        included += 1
+        compact['_included'] = True
+        if new_style:
+            styles[signature] = f'S{len(styles) + 1}'
+        queue.extend(compact['_children'])
+
+    tree = _emit(root, styles)
+    legend = {style_id: json.loads(signature) for signature, style_id in styles.items()}
+    text = json.dumps({'styles': legend, 'tree': tree}, separators=(',', ':'), ensure_ascii=False)
+    return CompactDesign(text, included, total)
+
+def _emit(compact: Dict, styles: Dict[str, str]) -> Dict:
+    """Build the output tree from included nodes only"""
+    out = {key: value for key, value in compact.items() if not key.startswith('_')}
+    if compact.get('_style') in styles:
+        out['s'] = styles[compact['_style']]
+
+    children = [child for child in compact['_children'] if child.get('_included')]
+    if children:
+        out['c'] = [_emit(child, styles) for child in children]
+    omitted = len(compact['_children']) - len(children)
+    if omitted:
+        out['more'] = omitted
+    return out
@@ -0,0 +1,232 @@
+"""
+Persistent Node Index for Full-File Figma Exports
+
+One streaming pass over an export (figma_stream) records, for every node,
+its id, name, type, parent, byte range and bounds. The index is saved next
+to the export as <export>.index and reused until the export changes, so
+looking a node up by id or name is a dictionary access and loading its
+subtree parses only that node's bytes from a memory-mapped export.
+
+Names and paths:
+  path(entry) is the '/'-separated chain of names from the page down, e.g.
+  'Tracking/Results/Result Row 1'. Patterns match the end of that path one
+  segment per '/', with shell wildcards inside a segment:
+    'Tracking Form'      - nodes named exactly that, at any depth
+    'Tracking/*'         - every child of a node named Tracking
+    'Tracking/Result*'   - children of Tracking whose names start with Result
+  When a pattern matches a node and some of its descendants, only the
+  outermost match is returned.
+
+Usage:
+  python pipeline/figma_index.py <export.json> [<id | name | pattern> ...]
+"""
+
+import fnmatch
+import json
+import mmap
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from figma_stream import ExportScanner
+from publisher import atomic_write
+
+INDEX_VERSION = 2
+NODE_ID = re.compile(r'^I?\d+[:-]\d+(?:;\d+[:-]\d+)*$')
+GLOB_CHARS = re.compile(r'[*?\[]')
+
+class IndexEntry(NamedTuple):
+    id: str
+    name: str
+    type: Optional[str]
+    parent: int  # position of the parent entry, -1 for the document
+    start: int
+    end: int
+    bounds: Optional[Tuple[float, float, float, float]]
+
+def is_node_id(ref: str) -> bool:
+    """'1:2', '1-2' and instance ids like 'I1:2;3:4' are ids; anything else is a name or pattern"""
+    return bool(NODE_ID.match(ref))
+
+def index_path_for(export_path: Path) -> Path:
+    return export_path.with_name(export_path.name + '.index')
+
+def export_signature(export_path: Path) -> Dict:
+    stat = export_path.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'version': INDEX_VERSION}
+
+class FigmaIndex:
+    """Node lookup by id, name or path pattern over one export"""
+
+    def __init__(self, export_path: Path, entries: List[IndexEntry], meta: Dict):
+        self.export_path = Path(export_path)
+        self.entries = entries
+        self.meta = meta  # top-level strings of the export: name, version, lastModified
+        self.by_id: Dict[str, int] = {entry.id: i for i, entry in enumerate(entries)}
+        self.by_name: Dict[str, List[int]] = {}
+        for i, entry in enumerate(entries):
+            self.by_name.setdefault(entry.name, []).append(i)
+        self._segments: Dict[int, Tuple[str, ...]] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Building and persistence
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, export_path: Path) -> 'FigmaIndex':
+        """Index an export in one streaming pass"""
+        export_path = Path(export_path)
+        with open(export_path, 'rb') as f:
+            scanner = ExportScanner(f)
+            spans = sorted(scanner.nodes(), key=lambda node: node.start)
+
+        # Parents by byte-range containment (spans arrive children first)
+        entries: List[IndexEntry] = []
+        open_positions: List[int] = []
+        for span in spans:
+            while open_positions and entries[open_positions[-1]].end <= span.start:
+                open_positions.pop()
+            parent = open_positions[-1] if open_positions else -1
+            entries.append(IndexEntry(span.id, span.name or '', span.type, parent, span.start, span.end, span.bounds))
+            open_positions.append(len(entries) - 1)
+        return cls(export_path, entries, scanner.meta)
+
+    @classmethod
+    def load(cls, export_path: Path, persist: bool = True) -> 'FigmaIndex':
+        """The saved index if it matches the export, otherwise a fresh (and saved) one"""
+        export_path = Path(export_path)
+        index_path = index_path_for(export_path)
+        signature = export_signature(export_path)
+        try:
+            data = json.loads(index_path.read_text(encoding='utf-8'))
+            if data.get('export') == signature:
+                entries = [IndexEntry(*row[:6], tuple(row[6]) if row[6] else None) for row in data['nodes']]
+                return cls(export_path, entries, data.get('meta', {}))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        index = cls.build(export_path)
+        if persist:
+            index.save(signature)
+        return index
+
+    def save(self, signature: Optional[Dict] = None):
+        index_path = index_path_for(self.export_path)
+        payload = {
+            'export': signature or export_signature(self.export_path),
+            'meta': self.meta,
+            'nodes': [list(entry[:6]) + [list(entry.bounds) if entry.bounds else None] for entry in self.entries]
+        }
+        atomic_write(index_path, json.dumps(payload, separators=(',', ':')))
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def get(self, node_id: str) -> Optional[IndexEntry]:
+        position = self.by_id.get(node_id.replace('-', ':'))
+        return self.entries[position] if position is not None else None
+
+    def segments(self, position: int) -> Tuple[str, ...]:
+        """Names from the page down to this node, split at '/' (Figma names may contain '/')"""
+        cached = self._segments.get(position)
+        if cached is None:
+            entry = self.entries[position]
+            own = tuple(entry.name.split('/')) if entry.name else ('',)
+            if entry.parent == -1 or self.entries[entry.parent].type == 'DOCUMENT':
+                cached = own if entry.type != 'DOCUMENT' else ()
+            else:
+                cached = self.segments(entry.parent) + own
+            self._segments[position] = cached
+        return cached
+
+    def path(self, entry: IndexEntry) -> str:
+        return '/'.join(self.segments(self.by_id[entry.id]))
+
+    def page(self, entry: IndexEntry) -> Optional[str]:
+        position = self.by_id[entry.id]
+        while position != -1:
+            candidate = self.entries[position]
+            if candidate.type == 'CANVAS':
+                return candidate.name
+            position = candidate.parent
+        return None
+
+    def find(self, pattern: str) -> List[IndexEntry]:
+        """Nodes whose path ends with the pattern's segments (outermost matches, document order)"""
+        pattern = pattern.strip('/')
+        if '/' not in pattern and not GLOB_CHARS.search(pattern):
+            positions = self.by_name.get(pattern, [])
+        else:
+            wanted = pattern.split('/')
+            positions = []
+            for position in range(len(self.entries)):
+                segments = self.segments(position)
+                if len(segments) >= len(wanted) and all(
+                        fnmatch.fnmatchcase(segment, part)
+                        for segment, part in zip(segments[-len(wanted):], wanted)):
+                    positions.append(position)
+
+        matched = set(positions)
+        result = []
+        for position in positions:
+            parent = self.entries[position].parent
+            while parent != -1 and parent not in matched:
+                parent = self.entries[parent].parent
+            if parent == -1:
+                result.append(self.entries[position])
+        return result
+
+    def resolve(self, ref: str) -> List[IndexEntry]:
+        """An id, exact name or path pattern; raises when nothing matches"""
+        if is_node_id(ref):
+            entry = self.get(ref)
+            if entry is None:
+                raise Exception(f'Node {ref} is not in {self.export_path.name}')
+            return [entry]
+        entries = self.find(ref)
+        if not entries:
+            raise Exception(f'No node named or matching "{ref}" in {self.export_path.name}')
+        return entries
+
+    # ------------------------------------------------------------------
+    # Subtrees
+    # ------------------------------------------------------------------
+    def subtree(self, node_id: str) -> Dict:
+        """Parse one node's document from the memory-mapped export"""
+        entry = self.get(node_id)
+        if entry is None:
+            raise Exception(f'Node {node_id} is not in {self.export_path.name}')
+        with self._lock:
+            if self._mmap is None:
+                self._file = open(self.export_path, 'rb')
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            data = self._mmap[entry.start:entry.end]
+        return json.loads(data)
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._file.close()
+                self._mmap = None
+                self._file = None
+
+def load_index(export_path: Union[str, Path]) -> FigmaIndex:
+    return FigmaIndex.load(Path(export_path))
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    index = load_index(sys.argv[1])
+    if len(sys.argv) == 2:
+        pages = [entry for entry in index.entries if entry.type == 'CANVAS']
+        print(f'{len(index.entries)} nodes, {len(pages)} pages: {", ".join(page.name for page in pages)}')
+    for ref in sys.argv[2:]:
+        for entry in index.resolve(ref):
+            bounds = 'x'.join(f'{value:g}' for value in entry.bounds[2:]) if entry.bounds else '-'
+            print(f'{entry.id:<16}{entry.type or "":<12}{bounds:>12}  {index.path(entry)}')
@@ -0,0 +1,184 @@
+"""
+Streaming Reader for Full-File Figma Exports
+
+figma-exports/figma-{fileKey}-full-*.json holds a whole design file, often
+tens of megabytes. json.load() of such a file to get one frame costs many
+times its size in memory. This reader scans the raw bytes in fixed-size
+chunks and keeps only the stack of open objects, so memory stays bounded
+by the nesting depth and the chunk size:
+
+  - iter_nodes() yields every node (an object with an "id" that is a
+    "document" or an element of a "children" array) as it closes, with its
+    byte range, name, type and absoluteBoundingBox; other objects with an
+    "id", like the variable aliases in boundVariables, are not nodes
+  - extract_subtrees() parses just the byte ranges of the requested nodes,
+    reading them back with seek(), and stops once all have been found
+
+Usage:
+  python pipeline/figma_stream.py <export.json> <node_id> [<node_id> ...]
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+CHUNK_SIZE = 1024 * 1024
+TOKEN_MARGIN = 4096  # tokens ending this close to the end of a chunk wait for the next one
+
+FIELDS = rb'(?:id|name|type|version|lastModified|absoluteBoundingBox|children|document)'
+STRING = rb'"(?:[^"\\]|\\.)*"'
+
+# One match per token the scanner needs; everything before it (other keys and
+# values, numbers, punctuation) is skipped by the regex engine, not in Python.
+TOKEN = re.compile(
+    rb'(?:[^"{}\[\]]|"(?!' + FIELDS + rb'"\s*:)(?:[^"\\]|\\.)*")*'
+    rb'(?:(?:"(children|document)"\s*:\s*)?([{}\[\]])'  # 1: key of a node container, 2: structure
+    rb'|"(id|name|type|version|lastModified)"\s*:\s*(' + STRING + rb')'  # 3, 4: string field
+    rb'|"absoluteBoundingBox"\s*:\s*(\{[^{}]*\})'  # 5: bounds
+    rb'|"' + FIELDS + rb'"\s*:)',  # a field with another kind of value
+    re.DOTALL
+)
+
+class NodeSpan(NamedTuple):
+    """One node of the export and where its JSON object sits in the file"""
+    id: str
+    name: Optional[str]
+    type: Optional[str]
+    start: int  # byte offset of '{'
+    end: int  # byte offset after '}'
+    depth: int  # number of enclosing nodes
+    bounds: Optional[Tuple[float, float, float, float]]  # x, y, width, height
+
+def _string(token: bytes) -> str:
+    if b'\\' in token:
+        return json.loads(token)
+    return token[1:-1].decode('utf-8')
+
+def _bounds(token: bytes) -> Optional[Tuple[float, float, float, float]]:
+    box = json.loads(token)
+    try:
+        return (box['x'], box['y'], box['width'], box['height'])
+    except KeyError:
+        return None
+
+class ExportScanner:
+    """Single pass over an export; meta holds the top-level strings (name, version, lastModified)"""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = max(chunk_size, 2 * TOKEN_MARGIN)
+        self.meta: Dict[str, str] = {}
+
+    def tokens(self) -> Iterator[Tuple[int, re.Match]]:
+        """(byte offset of the buffer, token match) pairs, reading chunk_size bytes at a time"""
+        base = 0
+        buffer = b''
+        eof = False
+        while not eof:
+            data = self.stream.read(self.chunk_size)
+            eof = not data
+            buffer += data
+            limit = len(buffer) if eof else len(buffer) - TOKEN_MARGIN
+            pos = 0
+            while True:
+                match = TOKEN.match(buffer, pos)
+                if match is None or match.end() > limit:
+                    break
+                yield base, match
+                pos = match.end()
+            buffer = buffer[pos:]
+            base += pos
+        if b'"' in buffer:
+            raise Exception('Figma export ended inside a string (truncated file?)')
+
+    def nodes(self) -> Iterator[NodeSpan]:
+        # Per open object: [start offset, fields, is node]; per array: whether it holds children
+        stack: List[Union[list, bool]] = []
+        node_depth = 0
+        for base, match in self.tokens():
+            structure = match.group(2)
+            if structure is not None:
+                char = structure[0]
+                if char == 0x7B:  # '{'
+                    is_node = match.group(1) == b'document' or (bool(stack) and stack[-1] is True)
+                    node_depth += is_node
+                    stack.append([base + match.start(2), None, is_node])
+                elif char == 0x5B:  # '['
+                    stack.append(match.group(1) == b'children')
+                else:
+                    obj = stack.pop()
+                    if isinstance(obj, list) and obj[2]:
+                        node_depth -= 1
+                        fields = obj[1]
+                        if fields and b'id' in fields:
+                            yield NodeSpan(
+                                _string(fields[b'id']),
+                                _string(fields[b'name']) if b'name' in fields else None,
+                                _string(fields[b'type']) if b'type' in fields else None,
+                                obj[0], base + match.end(2), node_depth, fields.get(b'bounds')
+                            )
+                continue
+
+            top = stack[-1] if stack else None
+            if not isinstance(top, list):
+                continue
+            if match.group(3) is not None:
+                key = match.group(3)
+                if len(stack) == 1:
+                    self.meta[key.decode('ascii')] = _string(match.group(4))
+                    continue
+                if not top[2]:
+                    continue
+                if top[1] is None:
+                    top[1] = {}
+                top[1][key] = match.group(4)
+            elif match.group(5) is not None and top[2]:
+                if top[1] is None:
+                    top[1] = {}
+                top[1][b'bounds'] = _bounds(match.group(5))
+
+        if stack:
+            raise Exception('Figma export ended inside an object (truncated file?)')
+
+def iter_nodes(path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[NodeSpan]:
+    """Every node of the export, children before their parents"""
+    with open(path, 'rb') as f:
+        yield from ExportScanner(f, chunk_size).nodes()
+
+def read_subtree(stream: BinaryIO, start: int, end: int) -> Dict:
+    """Parse one node's byte range"""
+    stream.seek(start)
+    return json.loads(stream.read(end - start))
+
+def extract_subtrees(path: Union[str, Path], node_ids: Iterable[str],
+                     chunk_size: int = CHUNK_SIZE) -> Dict[str, Dict]:
+    """Documents of the requested nodes, keyed by API id ('1:2'); missing ids are left out
+
+    Node ids may use the URL form ('1-2'). The scan stops as soon as every
+    requested node has been read.
+    """
+    wanted = {node_id.replace('-', ':') for node_id in node_ids}
+    found: Dict[str, Dict] = {}
+    if not wanted:
+        return found
+    with open(path, 'rb') as scan_file, open(path, 'rb') as read_file:
+        for node in ExportScanner(scan_file, chunk_size).nodes():
+            if node.id in wanted and node.id not in found:
+                found[node.id] = read_subtree(read_file, node.start, node.end)
+                if len(found) == len(wanted):
+                    break
+    return found
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    subtrees = extract_subtrees(sys.argv[1], sys.argv[2:])
+    missing = [node_id for node_id in sys.argv[2:] if node_id.replace('-', ':') not in subtrees]
+    json.dump(subtrees, sys.stdout, indent=2)
+    print()
+    if missing:
+        print(f'Not found: {", ".join(missing)}', file=sys.stderr)
+        sys.exit(1)
@@ -16,33 +16,127 @@ import os
 import sys
 import json
 import re
-import subprocess
+import argparse
 import time
 import webbrowser
 import shutil
 import stat
+import threading
+import asyncio
+import atexit
+import contextvars
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 import requests
 from dotenv import load_dotenv
 
+from figma_client import FigmaClient
+from http_transport import HttpTransport
+from figma_cache import FigmaCache
+from figma_index import FigmaIndex, export_signature, is_node_id
+from response_cache import ResponseCache
+from code_fences import CodeFenceParser
+from figma_compact import FORMAT_NOTE, compact_figma_node, estimate_tokens
+from brand_catalog import BrandCatalog, load_brand_catalog
+from brand_styles import color_classes
+from chunk_planner import PARTS_DIR, Chunk, compose_component, describe_plan, normalize_part, plan_chunks, subtree_tokens
+from fast_compiler import compile_component
+from design_diff import SnapshotStore, design_hash, diff_designs
+from component_dedupe import (PART_SHARED_PATH, SHARED_DIR, SHARED_PATH, SharedComponent, SharedRegistry,
+                              bind_inputs, extract_shared, import_shared, is_shared_use, shared_imports)
+from template_classes import audit_components, extract_class_usages
+from template_bindings import index_class_members, inject_missing_members
+from token_cache import TokenCache
+from dev_server import DevServer
+from route_registry import RouteRegistry, component_class_name
+from tracing import TRACER, current_span, span, submit_in_context, traced
+from publisher import PublishResult, collect_garbage, remove_tree, sync_directory, touch, write_if_changed
+
 # Load environment variables
 load_dotenv()
 
 # Configuration
 class Config:
     FIGMA_TOKEN = os.getenv('FIGMA_ACCESS_TOKEN')
+    FIGMA_API_BASE = os.getenv('FIGMA_API_BASE', 'https://api.figma.com')
+    FIGMA_BATCH_WINDOW = float(os.getenv('FIGMA_BATCH_WINDOW', '0.05'))  # seconds
+    FIGMA_MAX_BATCH = int(os.getenv('FIGMA_MAX_BATCH', '50'))  # ids per request
+    FIGMA_OFFLINE = os.getenv('FIGMA_OFFLINE', '0') == '1'  # serve Figma data from cache only
+    FIGMA_CACHE_MAX_MB = int(os.getenv('FIGMA_CACHE_MAX_MB', '200'))
+    FIGMA_EXPORT = os.getenv('FIGMA_EXPORT')  # --export: read nodes from a full-file export ('auto' = newest)
     IBM_API_KEY = os.getenv('IBM_GRANITE_API_KEY')
     IBM_PROJECT_ID = os.getenv('IBM_GRANITE_PROJECT_ID', '0d4fb471-2d2f-4496-8a2c-bfb3567fdea1')
-    IBM_ENDPOINT = 'https://us-south.ml.cloud.ibm.com/ml/v1/text/chat?version=2023-05-29'
-    IBM_IAM_ENDPOINT = 'https://iam.cloud.ibm.com/identity/token'
+    IBM_ENDPOINT = os.getenv('IBM_GRANITE_ENDPOINT', 'https://us-south.ml.cloud.ibm.com/ml/v1/text/chat?version=2023-05-29')
+    IBM_STREAM_ENDPOINT = os.getenv('IBM_GRANITE_STREAM_ENDPOINT', 'https://us-south.ml.cloud.ibm.com/ml/v1/text/chat_stream?version=2023-05-29')
+    IBM_IAM_ENDPOINT = os.getenv('IBM_IAM_ENDPOINT', 'https://iam.cloud.ibm.com/identity/token')
     MODEL_ID = 'ibm/granite-3-8b-instruct'
+    MAX_TOKENS = 6000
+    TEMPERATURE = 0.1
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE', '1') == '1'  # --no-cache disables lookups
+    LLM_CACHE_MAX_MB = int(os.getenv('LLM_CACHE_MAX_MB', '50'))
+    GRANITE_OFFLINE = os.getenv('GRANITE_OFFLINE', '0') == '1'  # serve generations from cache only
+    STREAM = os.getenv('GRANITE_STREAM', '0') == '1'  # --stream: write files as code blocks complete
+    CANDIDATES = int(os.getenv('PIPELINE_CANDIDATES', '1'))  # --candidates: parallel generations ranked locally
+    CANDIDATE_TEMPERATURE_STEP = float(os.getenv('PIPELINE_CANDIDATE_TEMPERATURE_STEP', '0.25'))
+    PREFETCH = os.getenv('PIPELINE_PREFETCH', '1') == '1'  # generate the next candidate during review
+    FIGMA_PROMPT_TOKENS = int(os.getenv('FIGMA_PROMPT_TOKENS', '1500'))  # budget for the design data
+    # --chunk-tokens: frames larger than this are split into parts generated in parallel (0 = never)
+    CHUNK_TOKENS = int(os.getenv('PIPELINE_CHUNK_TOKENS', os.getenv('FIGMA_PROMPT_TOKENS', '1500')))
+    CHUNK_CONCURRENCY = int(os.getenv('PIPELINE_CHUNK_CONCURRENCY', '8'))  # parallel Granite calls per frame
+    COMPILER = os.getenv('PIPELINE_COMPILER', '1') == '1'  # --no-compiler: send simple nodes to Granite too
+    DEDUPE = os.getenv('PIPELINE_DEDUPE', '1') == '1'  # --no-dedupe: generate repeated subtrees inline
+    IAM_TOKEN_PERSIST = os.getenv('IAM_TOKEN_PERSIST', '1') == '1'  # reuse the IAM token across runs
+    QUIET = os.getenv('PIPELINE_QUIET', '0') == '1'  # only print errors (benchmarks, servers)
+    
+    # Watch mode
+    WATCH_INTERVAL = float(os.getenv('PIPELINE_WATCH_INTERVAL', '30'))  # seconds between version checks
+    WATCH_CHUNK_TOKENS = int(os.getenv('PIPELINE_WATCH_CHUNK_TOKENS', '500'))  # smaller parts, smaller patches
+    
+    # Outbound HTTP (pipeline/http_transport.py); timeouts in seconds
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('PIPELINE_HTTP_CONNECT_TIMEOUT', '5'))
+    FIGMA_READ_TIMEOUT = float(os.getenv('FIGMA_READ_TIMEOUT', '60'))
+    IAM_READ_TIMEOUT = float(os.getenv('IBM_IAM_READ_TIMEOUT', '30'))
+    GRANITE_READ_TIMEOUT = float(os.getenv('IBM_GRANITE_READ_TIMEOUT', '180'))  # streaming: between chunks
+    HTTP_RETRIES = int(os.getenv('PIPELINE_HTTP_RETRIES', '3'))  # 429, 5xx, timeouts and connection errors
+    HTTP_BACKOFF = float(os.getenv('PIPELINE_HTTP_BACKOFF', '0.5'))  # first retry delay, doubling, jittered
+    HTTP_MAX_RETRY_AFTER = float(os.getenv('PIPELINE_HTTP_MAX_RETRY_AFTER', '60'))  # longer waits fail the call
+    BREAKER_THRESHOLD = int(os.getenv('PIPELINE_BREAKER_THRESHOLD', '5'))  # consecutive failures per host
+    BREAKER_RESET = float(os.getenv('PIPELINE_BREAKER_RESET', '30'))  # seconds before a trial call
+    
+    # Angular dev server (started and supervised by the pipeline)
+    DEV_SERVER_CMD = os.getenv('PIPELINE_DEV_SERVER_CMD', 'npm start')
+    DEV_SERVER_URL = os.getenv('PIPELINE_DEV_SERVER_URL', 'http://localhost:4200')
+    DEV_SERVER_START_TIMEOUT = int(os.getenv('PIPELINE_DEV_SERVER_TIMEOUT', '120'))  # seconds
+    DEV_SERVER_REBUILD_TIMEOUT = int(os.getenv('PIPELINE_DEV_SERVER_REBUILD_TIMEOUT', '60'))  # seconds
+    
+    # Publishing
+    LAZY_ROUTES = os.getenv('PIPELINE_LAZY_ROUTES', '1') == '1'  # loadComponent routes, one chunk per page
+    PREVIEW_KEEP = int(os.getenv('PIPELINE_PREVIEW_KEEP', '20'))  # .preview/ folders kept, most recently used
+    GC_MIN_AGE = int(os.getenv('PIPELINE_GC_MIN_AGE', '3600'))  # seconds a preview is safe from cleanup
+    
+    # Batch mode
+    BATCH_CONCURRENCY = int(os.getenv('PIPELINE_CONCURRENCY', '4'))
+    
+    # Job server (pipeline/job_server.py)
+    JOB_WORKERS = int(os.getenv('PIPELINE_JOB_WORKERS', '4'))  # components generated at once
+    JOB_REVIEW_TIMEOUT = float(os.getenv('PIPELINE_JOB_REVIEW_TIMEOUT', '0'))  # seconds, then reject (0 = wait)
     
     # Paths
     BASE_DIR = Path(__file__).parent.parent  # Go up to project root
     PREVIEW_DIR = BASE_DIR / 'pipeline' / '.preview'
+    FIGMA_CACHE_DIR = BASE_DIR / 'figma-exports'
+    LLM_CACHE_DIR = BASE_DIR / 'llm-processing' / 'cache'
     COMPONENT_DIR = BASE_DIR / 'generated-app' / 'src' / 'app' / 'components'
     STYLES_PATH = BASE_DIR / 'pipeline' / 'brand-css' / 'ups-brand.scss'
+    CACHE_DIR = BASE_DIR / 'pipeline' / '.cache'
+    BRAND_CATALOG_CACHE = CACHE_DIR / 'brand-catalog.json'
+    AUDIT_CACHE = CACHE_DIR / 'audit-cache.json'
+    IAM_TOKEN_CACHE = CACHE_DIR / 'iam-token.json'
+    PROFILE_DIR = CACHE_DIR / 'profiles'
+    DEV_SERVER_STATE = CACHE_DIR / 'dev-server.json'
+    DEV_SERVER_LOG = CACHE_DIR / 'dev-server.log'
     ROUTES_PATH = BASE_DIR / 'generated-app' / 'src' / 'app' / 'app.routes.ts'
 
 # Colors for terminal output
@@ -57,42 +151,185 @@ class Colors:
     END = '\033[0m'
 
 def log(message: str, color: Optional[str] = None):
-    """Print colored log messages"""
+    """Print colored log messages (one write per line, so concurrent stages don't interleave)"""
+    if Config.QUIET and color != 'red':
+        return
     if color:
         color_code = getattr(Colors, color.upper(), '')
-        print(f"{color_code}{message}{Colors.END}")
-    else:
-        print(message)
+        message = f"{color_code}{message}{Colors.END}"
+    sys.stdout.write(f"{message}\n")
+    sys.stdout.flush()
 
 def header(title: str):
     """Print a formatted header"""
+    if Config.QUIET:
+        return
     border = '=' * 50
     print(f"\n{Colors.CYAN}{border}")
     print(f"  {title}")
     print(f"{border}{Colors.END}\n")
 
+# ============================================================================
+# Outbound HTTP
+# ============================================================================
+_http_transport: Optional[HttpTransport] = None
+_http_transport_lock = threading.Lock()
+
+def get_http_transport() -> HttpTransport:
+    """Shared transport for Figma, IAM and watsonx: pooled, retrying, circuit-breaking"""
+    global _http_transport
+    with _http_transport_lock:
+        if _http_transport is None:
+            _http_transport = HttpTransport(
+                retries=Config.HTTP_RETRIES,
+                backoff=Config.HTTP_BACKOFF,
+                max_retry_after=Config.HTTP_MAX_RETRY_AFTER,
+                breaker_threshold=Config.BREAKER_THRESHOLD,
+                breaker_reset=Config.BREAKER_RESET
+            )
+        return _http_transport
+
+def http_timeout(read_timeout: float) -> Tuple[float, float]:
+    """(connect, read) timeout for one endpoint"""
+    return Config.HTTP_CONNECT_TIMEOUT, read_timeout
+
 # ============================================================================
 # STEP 1: Fetch Figma Design
 # ============================================================================
+_figma_client: Optional[FigmaClient] = None
+_figma_client_lock = threading.Lock()
+
+def get_figma_client() -> FigmaClient:
+    """Shared Figma client so concurrent fetches coalesce and reuse connections"""
+    global _figma_client
+    with _figma_client_lock:
+        if _figma_client is None:
+            _figma_client = FigmaClient(
+                Config.FIGMA_TOKEN,
+                api_base=Config.FIGMA_API_BASE,
+                window=Config.FIGMA_BATCH_WINDOW,
+                max_batch=Config.FIGMA_MAX_BATCH,
+                timeout=http_timeout(Config.FIGMA_READ_TIMEOUT),
+                transport=get_http_transport()
+            )
+        return _figma_client
+
+_figma_cache: Optional[FigmaCache] = None
+
+def get_figma_cache() -> FigmaCache:
+    """Shared on-disk node cache in figma-exports/"""
+    global _figma_cache
+    with _figma_client_lock:
+        if _figma_cache is None:
+            _figma_cache = FigmaCache(Config.FIGMA_CACHE_DIR, Config.FIGMA_CACHE_MAX_MB * 1024 * 1024)
+        return _figma_cache
+
+@traced('figma.file_meta', 'http')
+def fetch_figma_file_meta(file_key: str) -> Tuple[str, str]:
+    """Fetch only the file version and lastModified (no node trees)"""
+    data = get_figma_client().get_json(f'/v1/files/{file_key}', params={'depth': 1})
+    return data.get('version'), data.get('lastModified')
+
+def find_figma_export(file_key: str) -> Optional[Path]:
+    """The full-file export selected with --export, or None to use the API
+    
+    'auto' picks the newest figma-exports/figma-{fileKey}-full-*.json.
+    """
+    if not Config.FIGMA_EXPORT:
+        return None
+    if Config.FIGMA_EXPORT != 'auto':
+        return Path(Config.FIGMA_EXPORT)
+    exports = sorted(Config.FIGMA_CACHE_DIR.glob(f'figma-{file_key}-full-*.json'), key=lambda path: path.stat().st_mtime)
+    if not exports:
+        raise Exception(f'No figma-{file_key}-full-*.json export in {Config.FIGMA_CACHE_DIR}')
+    return exports[-1]
+
+_figma_indexes: Dict[Path, Tuple[Dict, FigmaIndex]] = {}
+_figma_index_lock = threading.Lock()
+
+@traced('figma.index')
+def get_figma_index(export_path: Path) -> FigmaIndex:
+    """Node index of an export, built once (one streaming pass) and saved next to it"""
+    with _figma_index_lock:
+        signature = export_signature(export_path)
+        cached = _figma_indexes.get(export_path)
+        if cached is None or cached[0] != signature:
+            if cached:
+                cached[1].close()
+            cached = (signature, FigmaIndex.load(export_path))
+            _figma_indexes[export_path] = cached
+        return cached[1]
+
+@traced('figma.export')
+def load_export_nodes(export_path: Path, node_ids: List[str]) -> Dict[str, Dict]:
+    """Node documents from a full-file export, keyed by the ids as given
+    
+    Only each node's own bytes are parsed, read from the memory-mapped export.
+    """
+    index = get_figma_index(export_path)
+    missing = [node_id for node_id in node_ids if index.get(node_id) is None]
+    if missing:
+        raise Exception(f'Nodes not found in {export_path.name}: {", ".join(missing)}')
+    documents = {node_id: index.subtree(node_id) for node_id in node_ids}
+    current_span().set(nodes=len(documents), bytes_in=sum(index.get(node_id).end - index.get(node_id).start
+                                                          for node_id in node_ids))
+    return documents
+
+def resolve_node_refs(file_key: str, ref: str) -> List[Dict]:
+    """(node_id, name) of the nodes an id, frame name or pattern like 'Tracking/*' refers to
+    
+    Names and patterns are looked up in the --export index, without API calls.
+    """
+    if is_node_id(ref):
+        return [{'node_id': ref.replace(':', '-'), 'name': None}]
+    export_path = find_figma_export(file_key)
+    if not export_path:
+        raise Exception(f'"{ref}" is not a node id; resolving names needs a full-file export (--export)')
+    return [{'node_id': entry.id.replace(':', '-'), 'name': entry.name}
+            for entry in get_figma_index(export_path).resolve(ref)]
+
+def resolve_node_id(file_key: str, ref: str) -> str:
+    """The single node an id or name refers to"""
+    nodes = resolve_node_refs(file_key, ref)
+    if len(nodes) > 1:
+        raise Exception(f'"{ref}" matches {len(nodes)} nodes ({", ".join(node["node_id"] for node in nodes[:5])}'
+                        f'{", ..." if len(nodes) > 5 else ""}); use a longer path or the node id')
+    return nodes[0]['node_id']
+
+@traced('figma.node')
 def fetch_figma_node(file_key: str, node_id: str) -> Dict:
     """Fetch design data from Figma API"""
     log('📥 Step 1: Fetching Figma design data...', 'blue')
     
-    # Convert node ID format (261-1272 → 261:1272)
-    api_node_id = node_id.replace('-', ':')
-    url = f"https://api.figma.com/v1/files/{file_key}/nodes?ids={api_node_id}"
-    
-    headers = {'X-Figma-Token': Config.FIGMA_TOKEN}
-    response = requests.get(url, headers=headers, verify=False)
-    
-    if not response.ok:
-        raise Exception(f"Figma API error: {response.status_code} - {response.text}")
-    
-    data = response.json()
-    node = data['nodes'].get(api_node_id)
-    
-    if not node or 'document' not in node:
-        raise Exception(f"Node {node_id} not found in Figma file")
+    export_path = find_figma_export(file_key)
+    if export_path:
+        document = load_export_nodes(export_path, [node_id])[node_id]
+        log(f'✓ Loaded node from export {export_path.name}: {node_id}', 'green')
+        return document
+    
+    cache = get_figma_cache()
+    
+    if Config.FIGMA_OFFLINE:
+        node = cache.latest(file_key, node_id)
+        if not node:
+            raise Exception(f"Node {node_id} is not cached in figma-exports/ (offline mode)")
+        log(f'✓ Loaded node from cache (offline, version {node.get("version")}): {node_id}', 'green')
+        current_span().set(cache_hits=1, node_id=node_id)
+        return node['document']
+    
+    # Cheap revalidation: file metadata only, shared across workers
+    version = cache.file_version(file_key, fetch_figma_file_meta)
+    node = cache.get(file_key, node_id, version)
+    if node:
+        log(f'✓ Loaded node from cache (version {version}): {node_id}', 'green')
+        current_span().set(cache_hits=1, node_id=node_id)
+        return node['document']
+    
+    # Requests from other workers within the batch window share one API call
+    node = get_figma_client().get_node(file_key, node_id)
+    cache.put(file_key, node_id, node)
+    if TRACER.enabled:
+        current_span().set(cache_hits=0, node_id=node_id, bytes_in=len(json.dumps(node['document'])))
     
     log(f'✓ Fetched node: {node_id}', 'green')
     return node['document']
@@ -100,56 +337,95 @@ def fetch_figma_node(file_key: str, node_id: str) -> Dict:
 # ============================================================================
 # STEP 2: Load UPS Brand CSS
 # ============================================================================
-def load_brand_css() -> Dict[str, any]:
-    """Load approved UPS brand CSS classes"""
+_brand_catalog: Optional[BrandCatalog] = None
+_brand_catalog_mtime = None
+_brand_catalog_lock = threading.Lock()
+
+@traced('brand_css.load')
+def load_brand_css() -> BrandCatalog:
+    """Load approved UPS brand CSS classes
+    
+    The compiled catalog is shared in-process and persisted in pipeline/.cache/,
+    keyed by the SCSS file's mtime and hash.
+    """
+    global _brand_catalog, _brand_catalog_mtime
     log('🎨 Step 2: Loading UPS Brand CSS...', 'blue')
     
-    with open(Config.STYLES_PATH, 'r', encoding='utf-8') as f:
-        css_content = f.read()
-    
-    # Extract all CSS classes
-    class_matches = re.findall(r'\.([a-zA-Z0-9_-]+)', css_content)
-    approved_classes = list(set(class_matches))
+    with _brand_catalog_lock:
+        mtime = Config.STYLES_PATH.stat().st_mtime_ns
+        if _brand_catalog is None or mtime != _brand_catalog_mtime:
+            _brand_catalog = load_brand_catalog(Config.STYLES_PATH, Config.BRAND_CATALOG_CACHE)
+            _brand_catalog_mtime = mtime
+        catalog = _brand_catalog
     
-    log(f'✓ Brand CSS loaded: {len(approved_classes)} approved classes', 'green')
-    
-    return {
-        'classes': approved_classes,
-        'raw_css': css_content
-    }
+    log(f'✓ Brand CSS loaded: {len(catalog.classes)} approved classes', 'green')
+    return catalog
 
 # ============================================================================
 # STEP 3: Get IBM Access Token
 # ============================================================================
-def get_ibm_access_token() -> str:
-    """Get IBM Cloud IAM access token"""
-    log('🔑 Step 3: Getting IBM access token...', 'blue')
-    
+_token_cache: Optional[TokenCache] = None
+_token_cache_lock = threading.Lock()
+
+@traced('iam.request', 'http')
+def request_ibm_token() -> Dict:
+    """Exchange the API key for a new IAM token response"""
     data = {
         'grant_type': 'urn:ibm:params:oauth:grant-type:apikey',
         'apikey': Config.IBM_API_KEY
     }
     
-    response = requests.post(Config.IBM_IAM_ENDPOINT, data=data, verify=False)
+    response = get_http_transport().request('POST', Config.IBM_IAM_ENDPOINT, 'iam',
+                                            http_timeout(Config.IAM_READ_TIMEOUT), data=data)
     
     if not response.ok:
         raise Exception(f"IBM IAM error: {response.status_code}")
+    current_span().set(bytes_in=len(response.content))
+    return response.json()
+
+def get_token_cache() -> TokenCache:
+    """Shared IAM token, persisted in pipeline/.cache/ unless IAM_TOKEN_PERSIST=0"""
+    global _token_cache
+    with _token_cache_lock:
+        if _token_cache is None:
+            _token_cache = TokenCache(
+                request_ibm_token,
+                owner=f'{Config.IBM_IAM_ENDPOINT}|{Config.IBM_API_KEY}',
+                path=Config.IAM_TOKEN_CACHE if Config.IAM_TOKEN_PERSIST else None
+            )
+        return _token_cache
+
+@traced('iam.token')
+def get_ibm_access_token() -> str:
+    """Get IBM Cloud IAM access token, reusing the cached one until shortly before it expires"""
+    log('🔑 Step 3: Getting IBM access token...', 'blue')
+    
+    if Config.GRANITE_OFFLINE:
+        log('✓ Skipped (offline mode, generations come from the response cache)', 'green')
+        return ''
     
-    token = response.json()['access_token']
-    log('✓ Access token obtained', 'green')
+    token_cache = get_token_cache()
+    reused = token_cache.valid()
+    token = token_cache.get()
+    current_span().set(cache_hits=int(reused))
+    if reused:
+        log(f'✓ Access token reused (valid for {int(token_cache.seconds_left() // 60)} more minutes)', 'green')
+    else:
+        log('✓ Access token obtained', 'green')
     return token
 
 # ============================================================================
 # STEP 4: Build Strict CSS Prompt
 # ============================================================================
-def build_strict_prompt(figma_node: Dict, brand_css: Dict, component_name: str) -> str:
+@traced('prompt.build')
+def build_strict_prompt(figma_node: Dict, brand_css: BrandCatalog, component_name: str) -> str:
     """Build prompt with strict CSS enforcement"""
     log('🧠 Step 4: Building prompt with STRICT CSS enforcement...', 'blue')
     
-    figma_json = json.dumps(figma_node, indent=2)
-    truncated_figma = figma_json[:5000] + '...' if len(figma_json) > 5000 else figma_json
-    
-    classes_str = ', '.join(brand_css['classes'])
+    # Dense, structurally pruned design data instead of truncated pretty JSON
+    design = compact_figma_node(figma_node, Config.FIGMA_PROMPT_TOKENS)
+    log(f'✓ Figma tree compacted: {design.nodes_included}/{design.nodes_total} nodes, '
+        f'~{estimate_tokens(design.text)} tokens', 'green')
     
     prompt = f"""You are an expert Angular developer. Generate a complete Angular standalone component from this Figma design.
 
@@ -165,8 +441,8 @@ Tailwind CSS is NOT installed. Bootstrap is NOT installed.
 - opacity-0 through opacity-100
 - bg-gradient-to-*
 
-✅ APPROVED CSS CLASSES - ONLY USE THESE {len(brand_css['classes'])} CLASSES:
-{classes_str}
+✅ APPROVED CSS CLASSES - ONLY USE THESE {len(brand_css.classes)} CLASSES:
+{brand_css.prompt_fragment}
 
 🎯 STRICT RULES:
 1. If a CSS class is NOT in the approved list above → DO NOT USE IT
@@ -175,7 +451,8 @@ Tailwind CSS is NOT installed. Bootstrap is NOT installed.
 4. Need sizing? → Use inline style: [style]="'width: 300px; height: 200px'"
 
 FIGMA DESIGN DATA:
-{truncated_figma}
+{FORMAT_NOTE}
+{design.text}
 
 COMPONENT NAME: {component_name}
 
@@ -241,45 +518,214 @@ Format your response EXACTLY like this:
 
 Generate clean, production-ready code now."""
 
+    current_span().set(bytes_out=len(prompt.encode('utf-8')), prompt_tokens=estimate_tokens(prompt))
     log('✓ Enhanced strict CSS prompt created', 'green')
     return prompt
 
 # ============================================================================
 # STEP 5: Generate Code with IBM Granite
 # ============================================================================
-def generate_with_granite(prompt: str, access_token: str) -> str:
-    """Generate code using IBM Granite LLM"""
-    log('🤖 Step 5: Generating code with IBM Granite LLM...', 'blue')
-    
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """Shared Granite response cache in llm-processing/cache/"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(Config.LLM_CACHE_DIR, Config.LLM_CACHE_MAX_MB * 1024 * 1024)
+        return _response_cache
+
+def granite_request(prompt: str, access_token: str, temperature: Optional[float] = None) -> Tuple[Dict, Dict]:
+    """Request body and headers for a watsonx chat call (temperature defaults to Config.TEMPERATURE)"""
     request_body = {
         'messages': [{'role': 'user', 'content': prompt}],
         'project_id': Config.IBM_PROJECT_ID,
         'model_id': Config.MODEL_ID,
-        'max_tokens': 6000,
-        'temperature': 0.1
+        'max_tokens': Config.MAX_TOKENS,
+        'temperature': Config.TEMPERATURE if temperature is None else temperature
     }
     
     headers = {
         'Content-Type': 'application/json',
         'Authorization': f'Bearer {access_token}'
     }
+    return request_body, headers
+
+def lookup_cached_generation(prompt: str, use_cache: bool,
+                             temperature: Optional[float] = None) -> Tuple[str, Optional[str]]:
+    """Return (cache_key, cached generation or None), honoring bypass and offline mode"""
+    cache = get_response_cache()
+    temperature = Config.TEMPERATURE if temperature is None else temperature
+    cache_key = cache.make_key(prompt, Config.MODEL_ID, temperature, Config.MAX_TOKENS)
+    
+    if use_cache and (Config.LLM_CACHE_ENABLED or Config.GRANITE_OFFLINE):
+        cached_code = cache.get(cache_key)
+        if cached_code is not None:
+            log(f'✓ Code loaded from response cache ({cache_key[:12]})', 'green')
+            return cache_key, cached_code
+    else:
+        cache.record_bypass()
+    
+    if Config.GRANITE_OFFLINE:
+        raise Exception(f"No cached generation for prompt {cache_key[:12]} (offline mode)")
+    return cache_key, None
+
+def store_generation(cache_key: str, generated_code: str, temperature: Optional[float] = None):
+    """Remember a fresh generation in the response cache"""
+    temperature = Config.TEMPERATURE if temperature is None else temperature
+    get_response_cache().put(cache_key, generated_code, Config.MODEL_ID, temperature, Config.MAX_TOKENS)
+
+@traced('granite.generate')
+def generate_with_granite(prompt: str, access_token: str, use_cache: bool = True) -> str:
+    """Generate code using IBM Granite LLM
+    
+    Identical prompts with identical model parameters are served from the
+    response cache. Pass use_cache=False to force a real regeneration; its
+    result replaces the cached entry.
+    """
+    log('🤖 Step 5: Generating code with IBM Granite LLM...', 'blue')
+    
+    cache_key, cached_code = lookup_cached_generation(prompt, use_cache)
+    current_span().set(cache_hits=int(cached_code is not None))
+    if cached_code is not None:
+        return cached_code
     
-    response = requests.post(Config.IBM_ENDPOINT, json=request_body, headers=headers, verify=False)
+    generated_code = request_generation(prompt, access_token)
+    store_generation(cache_key, generated_code)
+    log('✓ Code generated successfully', 'green')
+    return generated_code
+
+def post_granite(url: str, endpoint: str, request_body: Dict, headers: Dict, **kwargs) -> requests.Response:
+    """Send a watsonx chat request; after a 401 the IAM token is renewed and the call sent once more
+
+    The persisted token can be revoked before its stored expiry, so a 401
+    drops it from the token cache instead of failing the run.
+    """
+    transport = get_http_transport()
+    timeout = http_timeout(Config.GRANITE_READ_TIMEOUT)
+    response = transport.request('POST', url, endpoint, timeout, json=request_body, headers=headers,
+                                 idempotent=False, **kwargs)
+    if response.status_code != 401:
+        return response
+    
+    response.close()
+    token_cache = get_token_cache()
+    token_cache.invalidate(headers['Authorization'][len('Bearer '):])
+    headers['Authorization'] = f'Bearer {token_cache.get()}'
+    return transport.request('POST', url, endpoint, timeout, json=request_body, headers=headers,
+                             idempotent=False, **kwargs)
+
+@traced('granite.request', 'http')
+def request_generation(prompt: str, access_token: str, temperature: Optional[float] = None) -> str:
+    """One uncached watsonx chat call (no logging, safe on background threads)"""
+    request_body, headers = granite_request(prompt, access_token, temperature)
+    response = post_granite(Config.IBM_ENDPOINT, 'granite', request_body, headers)
     
     if not response.ok:
         raise Exception(f"IBM Granite API error: {response.status_code} - {response.text}")
     
-    generated_code = response.json()['choices'][0]['message']['content']
-    log('✓ Code generated successfully', 'green')
+    data = response.json()
+    record_granite_usage(data.get('usage'), len(response.request.body or b''), len(response.content))
+    return data['choices'][0]['message']['content']
+
+def record_granite_usage(usage: Optional[Dict], bytes_out: int, bytes_in: int):
+    """Attach token counts and payload sizes to the current span"""
+    usage = usage or {}
+    current_span().set(bytes_out=bytes_out, bytes_in=bytes_in,
+                       prompt_tokens=usage.get('prompt_tokens', 0),
+                       completion_tokens=usage.get('completion_tokens', 0))
+
+@traced('granite.stream', 'http')
+def generate_with_granite_stream(prompt: str, access_token: str,
+                                 on_block: Callable[[str, str], None], use_cache: bool = True) -> str:
+    """Generate code through the watsonx streaming endpoint
+    
+    on_block(language, content) is called as soon as each fenced code block
+    closes, while the rest of the completion is still streaming. Cached
+    generations are replayed through the same callback.
+    """
+    log('🤖 Step 5: Streaming code from IBM Granite LLM...', 'blue')
+    
+    parser = CodeFenceParser()
+    cache_key, cached_code = lookup_cached_generation(prompt, use_cache)
+    current_span().set(cache_hits=int(cached_code is not None))
+    if cached_code is not None:
+        for language, content in parser.feed(cached_code):
+            on_block(language, content)
+        return cached_code
+    
+    request_body, headers = granite_request(prompt, access_token)
+    headers['Accept'] = 'text/event-stream'
+    response = post_granite(Config.IBM_STREAM_ENDPOINT, 'granite.stream', request_body, headers, stream=True)
+    
+    if not response.ok:
+        raise Exception(f"IBM Granite API error: {response.status_code} - {response.text}")
+    
+    response.encoding = 'utf-8'
+    pieces = []
+    bytes_in = 0
+    usage = None
+    with response:
+        for line in response.iter_lines(decode_unicode=True):
+            bytes_in += len(line) + 1 if line else 1
+            # Server-sent events: only "data:" lines carry completion deltas
+            if not line or not line.startswith('data:'):
+                continue
+            payload = line[len('data:'):].strip()
+            if payload == '[DONE]':
+                break
+            event = json.loads(payload)
+            usage = event.get('usage') or usage
+            choices = event.get('choices') or []
+            text = choices[0].get('delta', {}).get('content') if choices else None
+            if not text:
+                continue
+            pieces.append(text)
+            for language, content in parser.feed(text):
+                on_block(language, content)
+    
+    generated_code = ''.join(pieces)
+    record_granite_usage(usage, len(response.request.body or b''), bytes_in)
+    store_generation(cache_key, generated_code)
+    log('✓ Code stream complete', 'green')
     return generated_code
 
+def log_cache_stats():
+    """Print response cache, outbound HTTP and Figma coalescing counters for this process"""
+    stats = get_response_cache().stats()
+    log(f'Response cache: {stats["hits"]} hits, {stats["misses"]} misses, '
+        f'{stats["bypassed"]} bypassed, {stats["evictions"]} evicted', 'gray')
+    
+    metrics = get_http_transport().metrics()
+    calls = []
+    for name, counters in sorted(metrics['endpoints'].items()):
+        extra = [f'{int(counters[key])} {label}' for key, label in
+                 (('retries', 'retried'), ('failures', 'failed'), ('rejected', 'rejected by breaker'))
+                 if counters.get(key)]
+        calls.append(f'{name} {int(counters.get("requests", 0))}' + (f' ({", ".join(extra)})' if extra else ''))
+    open_circuits = [host for host, state in metrics['circuits'].items() if state != 'closed']
+    if calls:
+        log(f'HTTP requests: {", ".join(calls)}'
+            + (f'; circuit open: {", ".join(open_circuits)}' if open_circuits else ''), 'gray')
+    
+    figma = get_figma_client().metrics()
+    if figma['nodes_requested']:
+        log(f'Figma: {figma["nodes_requested"]} nodes fetched in {figma["requests"]} API calls', 'gray')
+
 # ============================================================================
 # STEP 6: Parse Generated Code
 # ============================================================================
+@traced('code.parse')
 def parse_generated_code(generated_code: str) -> Dict[str, str]:
     """Parse TypeScript, HTML, and SCSS from generated code"""
     log('📦 Step 6: Parsing generated files...', 'blue')
-    
+    files = split_generated_code(generated_code)
+    log('✓ Files parsed successfully', 'green')
+    return files
+
+def split_generated_code(generated_code: str) -> Dict[str, str]:
+    """First typescript, html and scss code block of a completion ('' when missing)"""
     ts_match = re.search(r'```typescript\n(.*?)```', generated_code, re.DOTALL)
     html_match = re.search(r'```html\n(.*?)```', generated_code, re.DOTALL)
     scss_match = re.search(r'```scss\n(.*?)```', generated_code, re.DOTALL)
@@ -289,178 +735,548 @@ def parse_generated_code(generated_code: str) -> Dict[str, str]:
         'html': html_match.group(1).strip() if html_match else '',
         'scss': scss_match.group(1).strip() if scss_match else ''
     }
-    
-    log('✓ Files parsed successfully', 'green')
     return files
 
 # ============================================================================
 # STEP 6.5: Fix TypeScript Logic
 # ============================================================================
+@traced('code.fix_typescript')
 def fix_typescript_logic(typescript: str, html: str) -> str:
-    """Extract properties from HTML and inject into TypeScript"""
-    log('🔧 Step 6.5: Analyzing HTML for missing TypeScript properties...', 'blue')
-    
-    # Extract property references from HTML
-    referenced_properties = set()
-    
-    # Event bindings: (click)="prop = value"
-    for match in re.finditer(r'\(click\)="(\w+)\s*=', html):
-        referenced_properties.add(match.group(1))
-    
-    # *ngIf directives
-    for match in re.finditer(r'\*ngIf="(\w+)', html):
-        if match.group(1) not in ['style', 'class', 'src']:
-            referenced_properties.add(match.group(1))
-    
-    # Toggle patterns: prop = !prop
-    for match in re.finditer(r'(\w+)\s*=\s*!(\w+)', html):
-        referenced_properties.add(match.group(1))
-        referenced_properties.add(match.group(2))
+    """Inject typed stubs for members the template uses but the class lacks
     
-    # Check which properties already exist in TypeScript
-    existing_properties = set()
-    for match in re.finditer(r'^\s*(\w+)\s*[:=]', typescript, re.MULTILINE):
-        existing_properties.add(match.group(1))
-    
-    # Find missing properties
-    missing_properties = referenced_properties - existing_properties - {'constructor'}
+    The template is analyzed in one pass (interpolations, bindings, events,
+    structural directives, control flow) and compared with the members the
+    class already declares, so loop variables, template refs and pipes are
+    never mistaken for missing properties.
+    """
+    log('🔧 Step 6.5: Analyzing HTML for missing TypeScript properties...', 'blue')
     
-    if not missing_properties:
-        log('✓ All properties already defined in TypeScript', 'green')
+    if index_class_members(typescript) is None:
+        log('⚠️  Could not find class declaration', 'yellow')
         return typescript
     
-    log(f'⚠️  Found {len(missing_properties)} missing properties: {", ".join(missing_properties)}', 'yellow')
+    fixed_typescript, added = inject_missing_members(typescript, html)
     
-    # Inject missing properties
-    class_match = re.search(r'export class \w+Component \{', typescript)
-    if not class_match:
-        log('⚠️  Could not find class declaration', 'yellow')
+    if not added:
+        log('✓ All properties already defined in TypeScript', 'green')
         return typescript
     
-    # Generate property declarations
-    property_declarations = []
-    for prop in missing_properties:
-        is_boolean = f'{prop} = !{prop}' in html or f'*ngIf="{prop}"' in html
-        if is_boolean:
-            property_declarations.append(f'  {prop}: boolean = false;')
-        else:
-            property_declarations.append(f'  {prop} = \'\';')
-    
-    # Insert properties after class declaration
-    insertion_point = class_match.end()
-    fixed_typescript = (
-        typescript[:insertion_point] +
-        '\n' + '\n'.join(property_declarations) + '\n' +
-        typescript[insertion_point:]
-    )
-    
-    log(f'✅ Added {len(missing_properties)} missing properties to TypeScript', 'green')
+    current_span().set(injected=len(added))
+    log(f'⚠️  Found {len(added)} missing members: {", ".join(added)}', 'yellow')
+    log(f'✅ Added {len(added)} missing members to TypeScript', 'green')
     return fixed_typescript
 
 # ============================================================================
 # STEP 7: Validate CSS
 # ============================================================================
-def validate_css_strict(html_content: str, approved_classes: List[str]) -> Dict:
-    """Validate CSS classes against approved list"""
+@traced('css.validate')
+def validate_css_strict(html_content: str, approved_classes: frozenset) -> Dict:
+    """Validate CSS classes against approved list
+    
+    Covers class="...", class='...', [class.x], [class] and [ngClass]
+    bindings; each violation is reported with its line and column.
+    """
     log('🔍 Step 7: Validating CSS (STRICT MODE)...', 'yellow')
     
-    # Extract all class names from HTML
-    used_classes = set()
-    for match in re.finditer(r'class="([^"]+)"', html_content):
-        classes = match.group(1).split()
-        used_classes.update(cls.strip() for cls in classes if cls.strip())
+    # Extract all class usages from HTML in one pass
+    usages = extract_class_usages(html_content)
+    used_classes = {usage.name for usage in usages}
     
     # Check violations
-    violations = [cls for cls in used_classes if cls not in approved_classes]
+    violations = sorted(cls for cls in used_classes if cls not in approved_classes)
+    locations = {}
+    for usage in usages:
+        if usage.name not in approved_classes:
+            locations.setdefault(usage.name, []).append((usage.line, usage.column))
     
     result = {
         'total_classes': len(used_classes),
         'approved_count': len(used_classes) - len(violations),
         'violations': violations,
+        'locations': locations,
         'is_valid': len(violations) == 0
     }
+    current_span().set(violations=len(violations), bytes_in=len(html_content.encode('utf-8')))
     
     if result['is_valid']:
         log('✅ CSS Validation PASSED! All classes approved.', 'green')
     else:
         log(f'❌ CSS Validation FAILED! {len(violations)} unauthorized classes found:', 'red')
         for cls in violations:
-            log(f'   - {cls}', 'red')
+            where = ', '.join(f'{line}:{column}' for line, column in locations[cls])
+            log(f'   - {cls} (line:col {where})', 'red')
     
     return result
 
+def run_audit(workers: Optional[int] = None, use_cache: bool = True) -> int:
+    """Validate every component template in generated-app; returns the violation count"""
+    header('🔍 BRAND CSS AUDIT')
+    started = time.time()
+    
+    catalog = load_brand_css()
+    results = audit_components(
+        Config.COMPONENT_DIR,
+        catalog,
+        cache_path=Config.AUDIT_CACHE if use_cache else None,
+        workers=workers
+    )
+    
+    total_violations = 0
+    for result in results:
+        violations = result['violations']
+        total_violations += len(violations)
+        status = '(cached)' if result['cached'] else ''
+        if not violations:
+            log(f'  ✅ {result["path"]} {status}', 'green')
+            continue
+        log(f'  ❌ {result["path"]}: {len(violations)} violations {status}', 'red')
+        for violation in violations:
+            log(f'     {violation["line"]}:{violation["column"]}  {violation["name"]}  ({violation["source"]})', 'gray')
+    
+    checked = sum(1 for result in results if not result['cached'])
+    log(f'\n{len(results)} templates, {checked} checked, {len(results) - checked} unchanged, '
+        f'{total_violations} violations in {time.time() - started:.2f}s',
+        'green' if total_violations == 0 else 'red')
+    return total_violations
+
 # ============================================================================
-# STEP 8: Save to Preview Folder
+# Speculative Candidates: K Generations Ranked by the Local Validators
 # ============================================================================
-def save_to_preview(component_name: str, files: Dict[str, str]) -> Dict[str, Path]:
-    """Save generated files to preview folder"""
-    log('💾 Step 8: Saving to preview folder...', 'blue')
+CANDIDATE_WEIGHTS = {'empty_blocks': 10, 'violations': 3, 'injected': 1}
+
+def candidate_temperatures(count: int) -> List[float]:
+    """Config.TEMPERATURE first (so candidate 1 is the usual generation), then higher ones"""
+    return [round(min(1.0, Config.TEMPERATURE + i * Config.CANDIDATE_TEMPERATURE_STEP), 2)
+            for i in range(count)]
+
+def score_candidate(generated_code: str, approved_classes: frozenset) -> Dict:
+    """Quiet steps 6-7 for ranking: lower score is better"""
+    files = split_generated_code(generated_code)
+    _, injected = inject_missing_members(files['typescript'], files['html'])
+    used_classes = {usage.name for usage in extract_class_usages(files['html'])}
+    counts = {
+        'empty_blocks': sum(1 for language in ('typescript', 'html') if not files[language]),
+        'violations': len(used_classes - approved_classes),
+        'injected': len(injected)
+    }
+    counts['score'] = sum(CANDIDATE_WEIGHTS[name] * counts[name] for name in CANDIDATE_WEIGHTS)
+    return counts
+
+@traced('granite.candidate')
+def generate_candidate(prompt: str, access_token: str, temperature: float,
+                       approved_classes: frozenset, use_cache: bool = True) -> Dict:
+    """One candidate at the given temperature, generated (or replayed from cache) and scored"""
+    try:
+        cache_key, generated_code = lookup_cached_generation(prompt, use_cache, temperature)
+        if generated_code is None:
+            generated_code = request_generation(prompt, access_token, temperature)
+            store_generation(cache_key, generated_code, temperature)
+    except Exception as e:
+        return {'temperature': temperature, 'code': None, 'error': str(e), 'score': float('inf')}
     
-    preview_path = Config.PREVIEW_DIR / component_name
-    preview_path.mkdir(parents=True, exist_ok=True)
+    candidate = {'temperature': temperature, 'code': generated_code, 'error': None}
+    candidate.update(score_candidate(generated_code, approved_classes))
+    current_span().set(temperature=temperature, score=candidate['score'])
+    return candidate
+
+@traced('granite.candidates')
+def generate_candidates(prompt: str, access_token: str, brand_css: BrandCatalog, count: int,
+                        use_cache: bool = True) -> List[Dict]:
+    """Generate count candidates in parallel and return the usable ones, best first"""
+    log(f'🤖 Step 5: Generating {count} candidates with IBM Granite LLM in parallel...', 'blue')
+    started = time.time()
+    
+    temperatures = candidate_temperatures(count)
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [submit_in_context(executor, generate_candidate, prompt, access_token, temperature,
+                                     brand_css.classes, use_cache)
+                   for temperature in temperatures]
+        candidates = [future.result() for future in futures]
+    
+    for number, candidate in enumerate(candidates, start=1):
+        if candidate['error']:
+            log(f'  ❌ Candidate {number} (t={candidate["temperature"]}): {candidate["error"]}', 'red')
+        else:
+            log(f'  • Candidate {number} (t={candidate["temperature"]}): score {candidate["score"]} - '
+                f'{candidate["violations"]} CSS violations, {candidate["injected"]} missing members, '
+                f'{candidate["empty_blocks"]} empty blocks', 'gray')
     
-    file_paths = {
-        'ts': preview_path / f'{component_name}.component.ts',
-        'html': preview_path / f'{component_name}.component.html',
-        'scss': preview_path / f'{component_name}.component.scss'
-    }
+    usable = sorted((candidate for candidate in candidates if not candidate['error']),
+                    key=lambda candidate: (candidate['score'], candidate['temperature']))
+    if not usable:
+        raise Exception(f'All {count} Granite candidates failed')
+    
+    log(f'✓ {len(usable)} candidates ranked in {time.time() - started:.1f}s', 'green')
+    return usable
+
+# ============================================================================
+# STEP 8: Save to Preview Folder
+# ============================================================================
+PREVIEW_EXTENSIONS = {'typescript': 'ts', 'html': 'html', 'scss': 'scss'}
+
+def preview_file_path(component_name: str, language: str) -> Path:
+    return Config.PREVIEW_DIR / component_name / f'{component_name}.component.{PREVIEW_EXTENSIONS[language]}'
+
+def save_preview_file(component_name: str, language: str, content: str) -> bool:
+    """Write one generated file (typescript, html or scss) to the preview folder
     
-    file_paths['ts'].write_text(files['typescript'], encoding='utf-8')
-    file_paths['html'].write_text(files['html'], encoding='utf-8')
-    file_paths['scss'].write_text(files['scss'], encoding='utf-8')
+    Returns False when the file already had this content and was left untouched.
+    """
+    preview_path = Config.PREVIEW_DIR / component_name
+    written = write_if_changed(preview_file_path(component_name, language), content)
+    touch(preview_path)  # most recently used, for collect_pipeline_garbage()
+    return written
+
+@traced('preview.save')
+def save_to_preview(component_name: str, files: Dict[str, str],
+                    parts: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Path]:
+    """Save generated files to preview folder (unchanged files are not rewritten)
+    
+    parts are the child components of a chunked frame, saved under
+    parts/<name>/; parts from an earlier generation that are not in parts
+    are removed.
+    """
+    log('💾 Step 8: Saving to preview folder...', 'blue')
     
-    log(f'✓ Preview files saved to: .preview/{component_name}/', 'green')
+    file_paths = {}
+    written = 0
+    for language in ('typescript', 'html', 'scss'):
+        written += save_preview_file(component_name, language, files[language])
+        file_paths[PREVIEW_EXTENSIONS[language]] = preview_file_path(component_name, language)
+    total = 3
+    
+    parts = parts or {}
+    parts_dir = Config.PREVIEW_DIR / component_name / PARTS_DIR
+    for part_name, part_files in parts.items():
+        for language, extension in PREVIEW_EXTENSIONS.items():
+            written += write_if_changed(parts_dir / part_name / f'{part_name}.component.{extension}',
+                                        part_files[language])
+            total += 1
+    if parts_dir.exists():
+        for stale in parts_dir.iterdir():
+            if stale.name not in parts:
+                remove_tree(stale)
+        if not parts:
+            remove_tree(parts_dir)
+    
+    current_span().set(files_written=written,
+                       bytes_out=sum(len(content.encode('utf-8'))
+                                     for generated in [files, *parts.values()] for content in generated.values()))
+    
+    log(f'✓ Preview files saved to: .preview/{component_name}/ ({written} changed, {total - written} unchanged)', 'green')
     return file_paths
 
+def stream_to_preview(prompt: str, access_token: str, component_name: str, brand_css: BrandCatalog,
+                      use_cache: bool = True) -> Tuple[Dict[str, str], Dict]:
+    """Steps 5-8 in streaming mode
+    
+    Each code block is saved to the preview folder as soon as it closes, and
+    the HTML block is validated right away instead of after the whole
+    completion has arrived.
+    """
+    files = {'typescript': '', 'html': '', 'scss': ''}
+    css_validation = {}
+    started = time.time()
+    
+    def on_block(language: str, content: str):
+        # First block of each language wins, like parse_generated_code
+        if language not in files or files[language]:
+            return
+        files[language] = content
+        log(f'⚡ {language} block ready after {time.time() - started:.1f}s', 'cyan')
+        if language == 'html':
+            css_validation.update(validate_css_strict(content, brand_css.classes))
+        save_preview_file(component_name, language, content)
+    
+    generate_with_granite_stream(prompt, access_token, on_block, use_cache=use_cache)
+    
+    # STEP 6.5 needs the finished template
+    fixed_typescript = fix_typescript_logic(files['typescript'], files['html'])
+    if fixed_typescript != files['typescript'] or not fixed_typescript:
+        files['typescript'] = fixed_typescript
+        save_preview_file(component_name, 'typescript', fixed_typescript)
+    
+    for language in ('html', 'scss'):
+        if not files[language]:
+            save_preview_file(component_name, language, '')
+    if not css_validation:
+        css_validation.update(validate_css_strict(files['html'], brand_css.classes))
+    
+    log(f'✓ Preview files saved to: .preview/{component_name}/ ({time.time() - started:.1f}s)', 'green')
+    return files, css_validation
+
+# ============================================================================
+# Oversized Frames and Simple Nodes: Parts and the Local Compiler
+# ============================================================================
+@traced('chunks.plan')
+def plan_generation(figma_node: Dict, component_name: str, brand_css: BrandCatalog,
+                    compile_locally: Optional[bool] = None) -> Optional[Chunk]:
+    """How to generate a design: None for one Granite prompt, otherwise a chunk plan
+    
+    Frames larger than Config.CHUNK_TOKENS are split into parts (see
+    chunk_planner.py). With the local compiler on (Config.COMPILER), every
+    part it supports is compiled without the LLM (see fast_compiler.py) and
+    only the subtrees it cannot handle become Granite parts. Repeated
+    subtrees are first replaced by shared components (Config.DEDUPE, see
+    component_dedupe.py), listed in plan.shared.
+    """
+    if compile_locally is None:
+        compile_locally = Config.COMPILER
+    shared = []
+    if Config.DEDUPE:
+        figma_node, shared = extract_shared(figma_node, get_shared_registry())
+        if shared:
+            ready = sum(1 for component in shared if shared_entry(component, brand_css) is not None)
+            log(f'♻️  Step 4: {sum(component.copies for component in shared)} repeated subtrees use '
+                f'{len(shared)} shared components ({ready} already generated)', 'blue')
+    
+    if Config.CHUNK_TOKENS > 0:
+        plan = plan_chunks(figma_node, component_name, Config.CHUNK_TOKENS)
+    else:
+        plan = Chunk(component_name, figma_node, 0)
+    if not plan.is_leaf:
+        log(f'🧩 Step 4: Frame is ~{plan.tokens} tokens, splitting it into {len(plan.leaves())} parts '
+            f'(limit {Config.CHUNK_TOKENS})', 'blue')
+    
+    compiled_nodes = 0
+    colors = color_classes(brand_css.classes, brand_css.variables)
+    seen_names = {chunk.name for chunk in plan.all_chunks()}
+    for leaf in plan.leaves():
+        # A part that is only a shared component's element is compiled even without the compiler
+        if not compile_locally and not is_shared_use(leaf.node):
+            continue
+        compiled = compile_component(leaf.node, leaf.name, brand_css.classes, colors, component_name,
+                                     seen_names, './parts/' if leaf is plan else '../')
+        if compiled is None:
+            continue
+        leaf.files = compiled.files
+        leaf.children = [Chunk(hole.name, hole.node, subtree_tokens(hole.node)) for hole in compiled.holes]
+        compiled_nodes += compiled.nodes_compiled
+    
+    if plan.needs_generation and not shared:
+        return None
+    plan.shared = shared
+    
+    granite_parts = [chunk for chunk in plan.all_chunks() if chunk.needs_generation]
+    current_span().set(chunks=len(granite_parts), compiled_nodes=compiled_nodes, shared=len(shared))
+    if compiled_nodes:
+        log(f'⚡ Step 4: Compiled {compiled_nodes} nodes locally, {len(granite_parts)} subtrees left for Granite', 'blue')
+    for line in describe_plan(plan):
+        log(f'   {line}', 'gray')
+    for component in shared:
+        inputs = f', inputs {", ".join(component.inputs)}' if component.inputs else ''
+        log(f'   {SHARED_DIR}/{component.name} ({component.copies}x{inputs})', 'gray')
+    return plan
+
+def generate_part(chunk: Chunk, brand_css: BrandCatalog, access_token: str, use_cache: bool = True) -> Dict[str, str]:
+    """Steps 4-6.5 for one leaf of a chunk plan (executed on a worker thread)"""
+    with span('chunk.part', component=chunk.name):
+        prompt = build_strict_prompt(chunk.node, brand_css, chunk.name)
+        generated_code = generate_with_granite(prompt, access_token, use_cache=use_cache)
+        files = split_generated_code(generated_code)
+        files['typescript'] = normalize_part(fix_typescript_logic(files['typescript'], files['html']), chunk.name)
+        return files
+
+def published_files(component_name: str, part: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """The files of a component (or one of its parts) in generated-app, None when incomplete"""
+    folder = Config.COMPONENT_DIR / component_name
+    if part is not None:
+        folder = folder / PARTS_DIR / part
+    try:
+        return {language: (folder / f'{part or component_name}.component.{extension}').read_text(encoding='utf-8')
+                for language, extension in PREVIEW_EXTENSIONS.items()}
+    except OSError:
+        return None
+
+def reuse_unchanged_parts(plan: Chunk, component_name: str, previous: Dict[str, str]) -> Dict[str, str]:
+    """Keep the published files of Granite parts whose design matches previous (name -> design_hash)
+    
+    Returns the design hash of every part that needed Granite, for the next
+    snapshot (see design_diff.py).
+    """
+    hashes = {}
+    reused = []
+    for chunk in plan.all_chunks():
+        if not chunk.needs_generation:
+            continue
+        hashes[chunk.name] = design_hash(chunk.node)
+        if previous.get(chunk.name) != hashes[chunk.name]:
+            continue
+        files = published_files(component_name, None if chunk is plan else chunk.name)
+        if files is not None:
+            chunk.files = files
+            reused.append(chunk.name)
+    if reused:
+        log(f'♻️  Step 4: {len(reused)} of {len(hashes)} Granite parts unchanged, keeping their files', 'blue')
+    return hashes
+
+_shared_registry: Optional[SharedRegistry] = None
+_shared_registry_lock = threading.Lock()
+
+def get_shared_registry() -> SharedRegistry:
+    """Shared components generated so far, by structural hash (pipeline/.cache/shared-components/)"""
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = SharedRegistry(Config.CACHE_DIR / 'shared-components')
+        return _shared_registry
+
+def shared_entry(component: SharedComponent, brand_css: BrandCatalog) -> Optional[Dict]:
+    """The registry entry of a shared component, unless missing or built for another brand catalog"""
+    entry = get_shared_registry().get(component.key)
+    if entry is None or entry.get('catalog') != brand_css.source_hash:
+        return None
+    return entry
+
+def generate_shared(component: SharedComponent, brand_css: BrandCatalog, access_token: str,
+                    use_cache: bool = True) -> Dict[str, str]:
+    """Generate one shared component into the registry (executed on a worker thread)
+    
+    Compiled locally when the compiler handles the whole subtree, otherwise
+    by one Granite call. A component another worker generated meanwhile is
+    reused. use_cache=False (Regenerate) replaces the registry entry with a
+    fresh Granite generation, bypassing the registry, compiler and response cache.
+    """
+    registry = get_shared_registry()
+    with registry.lock(component.key), span('shared.generate', component=component.name):
+        entry = shared_entry(component, brand_css) if use_cache else None
+        if entry is not None:
+            return entry['files']
+        
+        compiled = None
+        if Config.COMPILER and use_cache:
+            colors = color_classes(brand_css.classes, brand_css.variables)
+            compiled = compile_component(component.node, component.name, brand_css.classes, colors)
+        if compiled is not None and not compiled.holes:
+            files = compiled.files
+        else:
+            prompt = build_strict_prompt(component.node, brand_css, component.name)
+            files = split_generated_code(generate_with_granite(prompt, access_token, use_cache=use_cache))
+            files['typescript'] = normalize_part(files['typescript'], component.name)
+        files, unbound = bind_inputs(files, component.inputs)
+        files['typescript'] = fix_typescript_logic(files['typescript'], files['html'])
+        if unbound:
+            log(f'⚠️  Shared component {component.name} does not display {", ".join(unbound)}', 'yellow')
+        
+        registry.store(component.key, {
+            'name': component.name,
+            'inputs': list(component.inputs),
+            'defaults': list(component.inputs.values()),
+            'catalog': brand_css.source_hash,
+            'files': files
+        })
+        return files
+
+@traced('chunks.generate')
+def generate_chunked(plan: Chunk, brand_css: BrandCatalog, access_token: str,
+                     use_cache: bool = True) -> Tuple[Dict[str, str], Dict[str, Dict[str, str]], Dict]:
+    """Steps 5-7 for a chunk plan; returns (files, parts, css_validation)
+    
+    Every part left for Granite is generated by its own call, all in
+    parallel with the plan's shared components that were never generated
+    (all of them when use_cache=False);
+    compiled parts are already written and composite components that
+    reference their parts are written locally. files are the planned
+    component's own files, parts the child components by name. Shared
+    components go to the registry and are published with the component.
+    """
+    pending = [chunk for chunk in plan.all_chunks() if chunk.needs_generation]
+    new_shared = [component for component in plan.shared
+                  if not use_cache or shared_entry(component, brand_css) is None]
+    generated = {}
+    shared_files = {}
+    if pending or new_shared:
+        work = ', '.join(filter(None, [f'{len(pending)} parts' if pending else '',
+                                       f'{len(new_shared)} shared components' if new_shared else '']))
+        log(f'🤖 Step 5: Generating {work} in parallel...', 'blue')
+        started = time.time()
+        workers = max(1, min(len(pending) + len(new_shared), Config.CHUNK_CONCURRENCY))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chunk') as executor:
+            futures = [submit_in_context(executor, generate_part, chunk, brand_css, access_token, use_cache)
+                       for chunk in pending]
+            shared_futures = [submit_in_context(executor, generate_shared, component, brand_css, access_token,
+                                                use_cache) for component in new_shared]
+            generated = {chunk.name: future.result() for chunk, future in zip(pending, futures)}
+            shared_files = {component.name: future.result() for component, future in zip(new_shared, shared_futures)}
+        log(f'✓ {work} generated in {time.time() - started:.1f}s', 'green')
+    else:
+        log('⚡ Step 5: Compiled locally, no Granite call needed', 'blue')
+    
+    # Composites are only layout and child selectors, so their CSS is valid by construction
+    validations = {chunk.name: validate_css_strict((chunk.files or generated[chunk.name])['html'], brand_css.classes)
+                   for chunk in plan.all_chunks() if chunk.files is not None or chunk.name in generated}
+    for name, component_files in shared_files.items():
+        validations[f'{SHARED_DIR}/{name}'] = validate_css_strict(component_files['html'], brand_css.classes)
+    
+    colors = color_classes(brand_css.classes, brand_css.variables)
+    shared_names = {component.name for component in plan.shared}
+    files = {}
+    parts = {}
+    for chunk in plan.all_chunks():
+        if chunk.files is not None:
+            chunk_files = chunk.files
+        elif chunk.is_leaf:
+            chunk_files = generated[chunk.name]
+        else:
+            chunk_files = compose_component(chunk, brand_css.classes, colors, None if chunk is plan else '../')
+        if shared_names and (chunk.is_leaf or chunk.files is not None):
+            shared_path = SHARED_PATH if chunk is plan else PART_SHARED_PATH
+            chunk_files = {**chunk_files, 'typescript': import_shared(chunk_files['typescript'], chunk_files['html'],
+                                                                      shared_names, shared_path)}
+        if chunk is plan:
+            files = chunk_files
+        else:
+            parts[chunk.name] = chunk_files
+    if parts:
+        log(f'✓ Composed {plan.name} from {len(parts)} parts', 'green')
+    return files, parts, merge_css_validations(validations)
+
+def merge_css_validations(validations: Dict[str, Dict]) -> Dict:
+    """One validate_css_strict() result for several templates; 'parts' lists violations per part"""
+    violations = sorted({cls for result in validations.values() for cls in result['violations']})
+    locations = {}
+    for result in validations.values():
+        for cls, found in result['locations'].items():
+            locations.setdefault(cls, []).extend(found)
+    return {
+        'total_classes': sum(result['total_classes'] for result in validations.values()),
+        'approved_count': sum(result['approved_count'] for result in validations.values()),
+        'violations': violations,
+        'locations': locations,
+        'is_valid': not violations,
+        'parts': {name: result['violations'] for name, result in validations.items() if result['violations']}
+    }
+
 # ============================================================================
 # STEP 9: Update Routes
 # ============================================================================
-def update_routes(component_name: str):
-    """Update app.routes.ts with new component"""
-    log(f'🛣️  Step 9: Updating routes for {component_name}...', 'blue')
+@traced('routes.update')
+def update_routes(*component_names: str) -> bool:
+    """Register components in app.routes.ts with one write; False when nothing changed
     
-    routes_content = Config.ROUTES_PATH.read_text(encoding='utf-8')
+    Routes are lazy (loadComponent) unless PIPELINE_LAZY_ROUTES=0.
+    """
+    log(f'🛣️  Step 9: Updating routes for {", ".join(component_names)}...', 'blue')
     
-    # Prepare import and route statements
-    class_name = ''.join(word.capitalize() for word in component_name.split('-')) + 'Component'
-    import_path = f'./components/{component_name}/{component_name}.component'
+    with RouteRegistry.transaction(Config.ROUTES_PATH) as routes:
+        added = [name for name in component_names if routes.add(name, lazy=Config.LAZY_ROUTES)]
+        summary = routes.summary()
     
-    import_statement = f"import {{ {class_name} }} from '{import_path}';"
-    route_entry = f"{{ path: '{component_name}', component: {class_name} }}"
-    
-    # Check if already exists
-    if import_statement in routes_content:
-        log('⚠️  Import already exists, skipping route update', 'yellow')
-        return
-    
-    # Add import after Routes import
-    routes_import_match = re.search(r"(import \{ Routes \} from '@angular/router';)", routes_content)
-    if routes_import_match:
-        insert_pos = routes_import_match.end()
-        routes_content = (
-            routes_content[:insert_pos] +
-            '\n' + import_statement +
-            routes_content[insert_pos:]
-        )
-    
-    # Add route entry
-    routes_match = re.search(r'export const routes: Routes = \[(.*?)\];', routes_content, re.DOTALL)
-    if routes_match:
-        existing_routes = routes_match.group(1).strip()
-        if existing_routes:
-            new_routes = f'[\n  {route_entry},\n{existing_routes}\n]'
-        else:
-            new_routes = f'[\n  {route_entry}\n]'
-        
-        routes_content = re.sub(
-            r'export const routes: Routes = \[.*?\];',
-            f'export const routes: Routes = {new_routes};',
-            routes_content,
-            flags=re.DOTALL
-        )
+    if not added:
+        log('✓ Routes already registered', 'green')
+        return False
     
-    Config.ROUTES_PATH.write_text(routes_content, encoding='utf-8')
-    log(f'✅ Routes updated: /{component_name} → {class_name}', 'green')
+    kind = 'lazy' if Config.LAZY_ROUTES else 'eager'
+    for name in added:
+        log(f'✅ Routes updated: /{name} → {component_class_name(name)} ({kind})', 'green')
+    log(f'   {summary["routes"]} routes, {summary["lazy"]} lazy', 'gray')
+    return True
+
+@traced('routes.remove')
+def remove_routes(*component_names: str) -> bool:
+    """Unregister components from app.routes.ts with one write"""
+    with RouteRegistry.transaction(Config.ROUTES_PATH) as routes:
+        return any([routes.remove(name) for name in component_names])
 
 # ============================================================================
 # STEP 10: Copy to Generated App
@@ -498,96 +1314,154 @@ def safe_remove_tree(path: Path, max_retries: int = 3):
                     return False
     return False
 
-def copy_to_generated_app(component_name: str) -> Path:
-    """Copy component from preview to generated-app"""
+@traced('app.publish')
+def copy_to_generated_app(component_name: str) -> PublishResult:
+    """Publish the preview files to generated-app
+    
+    Only files whose content changed are written (atomically), so the dev
+    server sees one event per changed file instead of a recreated folder.
+    """
     log('📁 Step 10: Copying to generated-app...', 'blue')
     
     src_path = Config.PREVIEW_DIR / component_name
     dest_path = Config.COMPONENT_DIR / component_name
     
-    # Remove existing if present (Windows-safe)
-    if dest_path.exists():
-        safe_remove_tree(dest_path)
-    
-    # Ensure destination doesn't exist before copying
-    if dest_path.exists():
-        # Overwrite individual files if can't delete folder
-        for src_file in src_path.rglob('*'):
-            if src_file.is_file():
-                rel_path = src_file.relative_to(src_path)
-                dest_file = dest_path / rel_path
-                dest_file.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(src_file, dest_file)
-    else:
-        shutil.copytree(src_path, dest_path)
+    result = sync_directory(src_path, dest_path)
+    shared = publish_shared_components(dest_path)
+    result = PublishResult(result.written + shared.written, result.unchanged + shared.unchanged, result.removed)
+    if TRACER.enabled:
+        current_span().set(files_written=len(result.written),
+                           bytes_out=sum(path.stat().st_size for path in result.written))
     
-    log(f'✓ Copied to: generated-app/src/app/components/{component_name}/', 'green')
-    return dest_path
+    log(f'✓ Copied to: generated-app/src/app/components/{component_name}/ '
+        f'({len(result.written)} changed, {len(result.unchanged)} unchanged, {len(result.removed)} removed)', 'green')
+    return result
 
-# ============================================================================
-# STEP 11: Check Server Running
-# ============================================================================
-def check_server_running() -> bool:
-    """Check if dev server is running on localhost:4200"""
-    try:
-        response = requests.get('http://localhost:4200', timeout=2)
-        return response.status_code == 200
-    except:
-        return False
+def publish_shared_components(component_dir: Path) -> PublishResult:
+    """Write the shared components a published component imports to components/shared/
+    
+    Shared components are only ever added or updated: other components may
+    use them too, so rejecting a component leaves them in place.
+    """
+    names = sorted({name for path in component_dir.rglob('*.component.ts')
+                    for name in shared_imports(path.read_text(encoding='utf-8'))})
+    written = []
+    unchanged = []
+    for name in names:
+        entry = get_shared_registry().by_name(name)
+        if entry is None:
+            log(f'⚠️  Shared component {name} is not in the registry, skipping it', 'yellow')
+            continue
+        for language, extension in PREVIEW_EXTENSIONS.items():
+            path = Config.COMPONENT_DIR / SHARED_DIR / name / f'{name}.component.{extension}'
+            (written if write_if_changed(path, entry['files'][language]) else unchanged).append(path)
+    if names:
+        log(f'✓ Shared components: {", ".join(names)}', 'green')
+    return PublishResult(written, unchanged, [])
+
+def collect_pipeline_garbage(active_component: Optional[str] = None):
+    """Prune old .preview/ folders (LRU) and *_old_* folders left by locked deletes"""
+    protect = [Config.PREVIEW_DIR / active_component] if active_component else []
+    removed = []
+    if Config.PREVIEW_DIR.exists():
+        removed += collect_garbage(Config.PREVIEW_DIR.iterdir(), keep=Config.PREVIEW_KEEP,
+                                   min_age=Config.GC_MIN_AGE, protect=protect)
+    if Config.COMPONENT_DIR.exists():
+        removed += collect_garbage(Config.COMPONENT_DIR.glob('*_old_*'))
+    if removed:
+        log(f'🧹 Removed {len(removed)} stale folders: {", ".join(path.name for path in removed)}', 'gray')
 
 # ============================================================================
-# STEP 12: Wait for Server
+# STEP 11: Dev Server
 # ============================================================================
-def wait_for_server(max_wait: int = 120) -> bool:
-    """Wait for dev server to be ready"""
-    log('⏳ Waiting for dev server to start...', 'yellow')
-    
-    start_time = time.time()
-    while time.time() - start_time < max_wait:
-        if check_server_running():
-            log('✅ Dev server is ready!', 'green')
-            return True
-        time.sleep(2)
-        log('   Checking server...', 'gray')
+_dev_server: Optional[DevServer] = None
+_dev_server_lock = threading.Lock()
+
+def get_dev_server() -> DevServer:
+    """Shared dev server supervisor, kept alive across regenerations and runs"""
+    global _dev_server
+    with _dev_server_lock:
+        if _dev_server is None:
+            _dev_server = DevServer(
+                Config.DEV_SERVER_CMD,
+                cwd=Config.BASE_DIR / 'generated-app',
+                url=Config.DEV_SERVER_URL,
+                state_path=Config.DEV_SERVER_STATE,
+                log_path=Config.DEV_SERVER_LOG
+            )
+        return _dev_server
+
+@traced('dev_server.start')
+def ensure_dev_server() -> bool:
+    """Attach to the running dev server, or start it and wait for its first build"""
+    server = get_dev_server()
+    if server.pid and server.running() or server.external and server.running():
+        return True
+    
+    log(f'⏳ Connecting to dev server (or starting: {Config.DEV_SERVER_CMD})...', 'yellow')
+    started = time.time()
+    if not server.start(timeout=Config.DEV_SERVER_START_TIMEOUT):
+        log(f'❌ Dev server did not become ready: {server.last_line or "no output"}', 'red')
+        log(f'   Full output: {Config.DEV_SERVER_LOG}', 'gray')
+        return False
     
-    log('❌ Server failed to start within timeout', 'red')
-    return False
+    if server.external:
+        log('✓ Dev server already running (started outside the pipeline)', 'green')
+    elif server.started:
+        log(f'✅ Dev server is ready! ({time.time() - started:.1f}s)', 'green')
+    else:
+        log(f'✓ Dev server already running (pid {server.pid})', 'green')
+    return True
+
+@traced('dev_server.rebuild')
+def wait_for_rebuild(since: int) -> bool:
+    """Wait for the rebuild triggered by files written after build_count was since"""
+    server = get_dev_server()
+    if server.external:
+        return True  # output not visible, nothing to wait on
+    
+    started = time.time()
+    status = server.wait_for_build(since, timeout=Config.DEV_SERVER_REBUILD_TIMEOUT)
+    if status == 'ok':
+        log(f'✓ Dev server rebuilt in {time.time() - started:.1f}s', 'green')
+        return True
+    if status == 'failed':
+        log(f'❌ Dev server build failed: {server.last_line}', 'red')
+        log(f'   Full output: {Config.DEV_SERVER_LOG}', 'gray')
+        return False
+    log('⚠️  No rebuild reported by the dev server, opening preview anyway', 'yellow')
+    return True
+
+def open_preview(component_name: str):
+    """Open the component route in the browser"""
+    url = f'{Config.DEV_SERVER_URL}/{component_name}'
+    log(f'🌐 Opening browser: {url}', 'cyan')
+    webbrowser.open(url)
+
+def publish_component(component_name: str) -> bool:
+    """Copy the component to generated-app and register its route; True if anything changed"""
+    published = copy_to_generated_app(component_name)
+    routes_changed = update_routes(component_name)
+    return published.changed or routes_changed
 
-# ============================================================================
-# STEP 13: Setup Browser Preview
-# ============================================================================
 def setup_browser_preview(component_name: str) -> bool:
     """Setup browser preview automation"""
     log('🌐 Step 11: Setting up browser preview...', 'blue')
     
-    # Copy component to generated-app
-    copy_to_generated_app(component_name)
+    # Start (or attach to) the dev server first so the rebuild below can be observed
+    if not ensure_dev_server():
+        return False
+    build_mark = get_dev_server().build_count
     
-    # Update routes
-    update_routes(component_name)
+    # Copy component to generated-app and update routes
+    changed = publish_component(component_name)
     
-    # Check if server is running
-    if check_server_running():
-        log('✓ Dev server already running', 'green')
-    else:
-        log('🚀 Starting dev server in new PowerShell window...', 'yellow')
-        
-        # Start dev server in new window
-        start_cmd = 'npm start'
-        subprocess.Popen(
-            ['powershell', '-Command', f'Start-Process powershell -ArgumentList \'-NoExit\', \'-Command\', \'cd "{Config.BASE_DIR / "generated-app"}"; {start_cmd}\''],
-            cwd=Config.BASE_DIR / 'generated-app',
-            shell=True
-        )
-        
-        # Wait for server
-        if not wait_for_server():
-            return False
+    # Wait for the incremental rebuild instead of polling the server
+    if changed:
+        wait_for_rebuild(build_mark)
     
     # Open browser
-    url = f'http://localhost:4200/{component_name}'
-    log(f'🌐 Opening browser: {url}', 'cyan')
-    webbrowser.open(url)
+    open_preview(component_name)
     
     log('✅ Browser preview ready!', 'green')
     return True
@@ -595,6 +1469,7 @@ def setup_browser_preview(component_name: str) -> bool:
 # ============================================================================
 # STEP 14: Prompt for Approval
 # ============================================================================
+@traced('user.review', 'wait')
 def prompt_for_approval() -> str:
     """Ask user to approve or reject the component"""
     header('USER APPROVAL REQUIRED')
@@ -615,6 +1490,7 @@ def prompt_for_approval() -> str:
 # ============================================================================
 # STEP 15: Cleanup on Reject
 # ============================================================================
+@traced('app.cleanup')
 def cleanup_browser_preview(component_name: str):
     """Cleanup files on reject"""
     log('🧹 Cleaning up rejected component...', 'yellow')
@@ -628,22 +1504,11 @@ def cleanup_browser_preview(component_name: str):
             log(f'⚠️  Could not fully remove {component_name}, but routes will be reverted', 'yellow')
     
     # Revert routes
-    routes_content = Config.ROUTES_PATH.read_text(encoding='utf-8')
-    class_name = ''.join(word.capitalize() for word in component_name.split('-')) + 'Component'
-    import_statement = f"import {{ {class_name} }} from './components/{component_name}/{component_name}.component';"
-    
-    # Remove import
-    routes_content = routes_content.replace('\n' + import_statement, '')
-    
-    # Remove route entry
-    route_pattern = rf'\{{\s*path:\s*[\'"]{component_name}[\'"],\s*component:\s*{class_name}\s*\}},?\n?\s*'
-    routes_content = re.sub(route_pattern, '', routes_content)
-    
-    Config.ROUTES_PATH.write_text(routes_content, encoding='utf-8')
+    remove_routes(component_name)
     log('✓ Routes reverted', 'green')
     
     # Note: Dev server left running (user controls it)
-    log('ℹ️  Dev server left running - you can stop it manually', 'gray')
+    log('ℹ️  Dev server left running - stop it with: python pipeline/dev_server.py stop', 'gray')
 
 # ============================================================================
 # STEP 16: Handle Approval
@@ -657,42 +1522,199 @@ def handle_approval(choice: str, component_name: str) -> str:
         cleanup_browser_preview(component_name)
         log('❌ Component REJECTED and cleaned up.', 'red')
         return 'rejected'
-    else:  # 'G'
-        cleanup_browser_preview(component_name)
+    else:  # 'G': the next candidate overwrites the published files in place
         log('🔄 Component will be REGENERATED...', 'yellow')
         return 'regenerate'
 
 # ============================================================================
-# Main Pipeline Orchestrator
+# Async Stages
 # ============================================================================
-def run_pipeline(file_key: str, node_id: str, component_name: str):
-    """Run the complete pipeline"""
+# Each blocking stage as an awaitable, so callers (batch, servers) can
+# overlap many components on one event loop. The work runs on the loop's
+# default thread pool; the shared clients and caches are thread-safe.
+async def run_in_thread(func: Callable, *args):
+    """Await a blocking call on the event loop's thread pool (asyncio.to_thread for Python 3.8)"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()  # keeps the caller's trace span as parent
+    return await loop.run_in_executor(None, functools.partial(context.run, func, *args))
+
+async def run_in_daemon_thread(func: Callable, *args):
+    """Await a call that may block indefinitely (e.g. input()) without holding up interpreter exit"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
     
-    header(f'🚀 FIGMA TO ANGULAR CODE GENERATOR')
-    log(f'File Key: {file_key}', 'cyan')
-    log(f'Node ID: {node_id}', 'cyan')
-    log(f'Component: {component_name}', 'cyan')
+    def worker():
+        try:
+            result = func(*args)
+        except BaseException as e:
+            loop.call_soon_threadsafe(lambda error=e: future.done() or future.set_exception(error))
+        else:
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
     
-    try:
-        # Validation
-        if not all([Config.FIGMA_TOKEN, Config.IBM_API_KEY]):
-            raise Exception('Missing required environment variables. Check .env file.')
+    threading.Thread(target=worker, daemon=True).start()
+    return await future
+
+async def fetch_figma_node_async(file_key: str, node_id: str) -> Dict:
+    """Step 1 as an awaitable"""
+    return await run_in_thread(fetch_figma_node, file_key, node_id)
+
+async def load_brand_css_async() -> BrandCatalog:
+    """Step 2 as an awaitable"""
+    return await run_in_thread(load_brand_css)
+
+async def get_ibm_access_token_async() -> str:
+    """Step 3 as an awaitable (the token is shared until it nears expiry)"""
+    return await run_in_thread(get_ibm_access_token)
+
+async def generate_with_granite_async(prompt: str, access_token: str, use_cache: bool = True) -> str:
+    """Step 5 as an awaitable"""
+    return await run_in_thread(generate_with_granite, prompt, access_token, use_cache)
+
+async def gather_stages(*stages):
+    """Await independent stages concurrently (asyncio.run needs a coroutine, not a future)"""
+    return await asyncio.gather(*stages)
+
+# ============================================================================
+# Main Pipeline Orchestrator
+# ============================================================================
+def check_credentials():
+    """Fail early when required API credentials are missing"""
+    figma_ok = Config.FIGMA_TOKEN or Config.FIGMA_OFFLINE or Config.FIGMA_EXPORT
+    ibm_ok = Config.IBM_API_KEY or Config.GRANITE_OFFLINE
+    if not all([figma_ok, ibm_ok]):
+        raise Exception('Missing required environment variables. Check .env file.')
+
+def flush_caches():
+    """Write the access times the disk caches hold in memory (also run at exit)"""
+    for cache in (_figma_cache, _response_cache):
+        if cache is not None:
+            cache.store.flush()
+
+atexit.register(flush_caches)
+
+def reset_shared_state():
+    """Drop the in-process clients and caches; the next use rebuilds them from Config
+    
+    Used between benchmark iterations so each one starts like a new process.
+    """
+    flush_caches()
+    global _figma_client, _figma_cache, _token_cache, _response_cache, _brand_catalog, _brand_catalog_mtime
+    global _shared_registry, _http_transport
+    with _figma_client_lock:
+        if _figma_client is not None:
+            _figma_client.close()
+        _figma_client = None
+        _figma_cache = None
+    with _http_transport_lock:
+        if _http_transport is not None:
+            _http_transport.close()
+        _http_transport = None
+    with _token_cache_lock:
+        _token_cache = None
+    with _response_cache_lock:
+        _response_cache = None
+    with _brand_catalog_lock:
+        _brand_catalog = None
+        _brand_catalog_mtime = None
+    with _shared_registry_lock:
+        _shared_registry = None
+
+class PipelineSession:
+    """Artifacts of steps 1-4 for one component, reused across regenerations
+    
+    The Figma node, brand catalog, IAM token and prompt are built once by
+    prepare(); generate() only repeats steps 5-8. While the user reviews a
+    candidate, start_prefetch() requests the next one on a background
+    thread so that choosing Regenerate rarely waits for Granite.
+    
+    A frame above Config.CHUNK_TOKENS, or one the local compiler handles,
+    gets a chunk plan instead of one prompt; its Granite parts are generated
+    in parallel on every generate(). Regenerating a compiled design plans it
+    again without the compiler, since compiling twice gives the same output.
+    """
+    
+    def __init__(self, file_key: str, node_id: str, component_name: str):
+        self.file_key = file_key
+        self.node_id = node_id
+        self.component_name = component_name
+        self.figma_node: Optional[Dict] = None
+        self.brand_css: Optional[BrandCatalog] = None
+        self.access_token: Optional[str] = None
+        self.prompt: Optional[str] = None
+        self.plan: Optional[Chunk] = None
+        self.candidates = 0
+        self.ranked: List[Dict] = []  # remaining candidates from --candidates, best first
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
+        self._prefetch: Optional[Future] = None
+    
+    def prepare(self):
+        """Steps 1-4 (blocking)"""
+        asyncio.run(self.prepare_async())
+    
+    async def prepare_async(self):
+        """Steps 1-4; the independent steps 1-3 run concurrently"""
+        # STEP 1-3: Figma design, brand CSS and IBM token
+        self.figma_node, self.brand_css, self.access_token = await asyncio.gather(
+            fetch_figma_node_async(self.file_key, self.node_id),
+            load_brand_css_async(),
+            get_ibm_access_token_async()
+        )
+        
+        # STEP 4: Build prompt, or plan parts (oversized frames, locally compiled nodes)
+        self.plan_design(Config.COMPILER)
+    
+    def plan_design(self, compile_locally: bool):
+        self.plan = plan_generation(self.figma_node, self.component_name, self.brand_css, compile_locally)
+        if self.plan is None and self.prompt is None:
+            self.prompt = build_strict_prompt(self.figma_node, self.brand_css, self.component_name)
+    
+    async def generate_async(self, use_cache: bool = True) -> Tuple[Dict[str, str], Dict]:
+        """Steps 5-8 as an awaitable"""
+        return await run_in_thread(self.generate, use_cache)
+    
+    def generate(self, use_cache: bool = True) -> Tuple[Dict[str, str], Dict]:
+        """Steps 5-8 for the next candidate; returns (files, css_validation)"""
+        self.candidates += 1
+        if self.candidates > 1 and self.plan is not None and any(
+                chunk.files is not None for chunk in self.plan.all_chunks()):
+            log('🔄 Regenerating with Granite instead of the local compiler', 'yellow')
+            self.plan_design(compile_locally=False)
         
-        # STEP 1: Fetch Figma design
-        figma_node = fetch_figma_node(file_key, node_id)
+        if self.plan is not None:
+            # STEP 5-8: Parts in parallel (candidates, prefetch and streaming apply to single prompts)
+            files, parts, css_validation = generate_chunked(self.plan, self.brand_css, self.access_token, use_cache)
+            save_to_preview(self.component_name, files, parts)
+            return files, css_validation
         
-        # STEP 2: Load brand CSS
-        brand_css = load_brand_css()
+        if Config.CANDIDATES > 1:
+            return self._next_ranked(use_cache)
         
-        # STEP 3: Get IBM token
-        access_token = get_ibm_access_token()
+        prefetched = self._take_prefetched()
+        if prefetched is not None:
+            return self._finish(prefetched)
         
-        # STEP 4: Build prompt
-        prompt = build_strict_prompt(figma_node, brand_css, component_name)
+        if Config.STREAM:
+            # STEP 5-8: Stream code, validating and saving each block as it completes
+            return stream_to_preview(
+                self.prompt, self.access_token, self.component_name, self.brand_css, use_cache=use_cache
+            )
         
         # STEP 5: Generate code
-        generated_code = generate_with_granite(prompt, access_token)
+        return self._finish(generate_with_granite(self.prompt, self.access_token, use_cache=use_cache))
+    
+    def _next_ranked(self, use_cache: bool) -> Tuple[Dict[str, str], Dict]:
+        """Preview the best remaining candidate; Regenerate swaps to the next one without waiting"""
+        if self.ranked:
+            log(f'🔀 Swapping to the next ranked candidate ({len(self.ranked)} ready)', 'cyan')
+        else:
+            self.ranked = generate_candidates(self.prompt, self.access_token, self.brand_css,
+                                              Config.CANDIDATES, use_cache=use_cache)
         
+        candidate = self.ranked.pop(0)
+        log(f'✓ Previewing candidate t={candidate["temperature"]} (score {candidate["score"]})', 'green')
+        return self._finish(candidate['code'])
+    
+    def _finish(self, generated_code: str) -> Tuple[Dict[str, str], Dict]:
         # STEP 6: Parse files
         files = parse_generated_code(generated_code)
         
@@ -700,30 +1722,129 @@ def run_pipeline(file_key: str, node_id: str, component_name: str):
         files['typescript'] = fix_typescript_logic(files['typescript'], files['html'])
         
         # STEP 7: Validate CSS
-        css_validation = validate_css_strict(files['html'], brand_css['classes'])
+        css_validation = validate_css_strict(files['html'], self.brand_css.classes)
         
         # STEP 8: Save to preview
-        save_to_preview(component_name, files)
+        save_to_preview(self.component_name, files)
+        return files, css_validation
+    
+    def start_prefetch(self):
+        """Request the next candidate in the background, bypassing the response cache"""
+        if not Config.PREFETCH or Config.GRANITE_OFFLINE or self._prefetch is not None or self.plan is not None:
+            return
+        if Config.CANDIDATES > 1:
+            return  # the remaining ranked candidates are the next ones
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+        self._prefetch = submit_in_context(self._prefetch_executor, request_generation, self.prompt, self.access_token)
+    
+    def _take_prefetched(self) -> Optional[str]:
+        """The background candidate, or None when there is none or it failed"""
+        future, self._prefetch = self._prefetch, None
+        if future is None:
+            return None
+        
+        if not future.done():
+            log('⏳ Waiting for the candidate generated in the background...', 'cyan')
+        try:
+            generated_code = future.result()
+        except Exception as e:
+            log(f'⚠️  Background generation failed ({e}), generating again', 'yellow')
+            return None
         
-        # STEP 9-11: Browser preview
-        preview_success = setup_browser_preview(component_name)
+        log('🤖 Step 5: Using the candidate generated in the background', 'blue')
+        cache = get_response_cache()
+        cache.record_bypass()
+        store_generation(cache.make_key(self.prompt, Config.MODEL_ID, Config.TEMPERATURE, Config.MAX_TOKENS),
+                         generated_code)
+        return generated_code
+    
+    def close(self):
+        """Drop any unused background candidate"""
+        if self._prefetch is not None:
+            self._prefetch.cancel()
+            self._prefetch = None
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False)
+            self._prefetch_executor = None
+
+async def run_pipeline_async(file_key: str, node_id: str, component_name: str,
+                             regenerate: bool = False,
+                             review: Optional[Callable[[str], str]] = None) -> str:
+    """Run the complete pipeline for one component; returns 'accepted' or 'rejected'
+    
+    Steps 1-4 run once (steps 1-3 concurrently); each Regenerate loops over
+    steps 5-16 again with the response cache bypassed. regenerate=True
+    bypasses it for the first candidate too. Errors are raised to the caller.
+    
+    review(component_name) -> 'A'/'R'/'G' replaces the browser preview and
+    the approval prompt for non-interactive runs (benchmarks, job servers);
+    the component is still published to generated-app.
+    """
+    
+    header(f'🚀 FIGMA TO ANGULAR CODE GENERATOR')
+    log(f'File Key: {file_key}', 'cyan')
+    log(f'Node ID: {node_id}', 'cyan')
+    log(f'Component: {component_name}', 'cyan')
+    
+    session = PipelineSession(file_key, node_id, component_name)
+    with span('pipeline.run', 'run', component=component_name) as run_span:
+        return await run_session(session, regenerate, run_span, review)
+
+async def run_session(session: PipelineSession, regenerate: bool, run_span,
+                      review: Optional[Callable[[str], str]] = None) -> str:
+    """Body of run_pipeline_async, inside its trace span"""
+    component_name = session.component_name
+    try:
+        # Validation
+        check_credentials()
         
-        if not preview_success:
-            log('⚠️  Browser preview failed, but files are saved.', 'yellow')
+        # STEP 1-4: Figma design, brand CSS, IBM token, prompt
+        await session.prepare_async()
         
-        # STEP 12: User approval
-        approval = prompt_for_approval()
-        result = handle_approval(approval, component_name)
+        use_cache = not regenerate
+        while True:
+            # STEP 5-8: Generate, parse, fix, validate and save
+            await session.generate_async(use_cache=use_cache)
+            
+            if review is not None:
+                # STEP 9-12: Publish without a browser, decided by the caller
+                await run_in_thread(publish_component, component_name)
+                approval = await run_in_thread(review, component_name)
+            else:
+                # Next candidate is generated while this one is reviewed
+                session.start_prefetch()
+                
+                # STEP 9-11: Browser preview
+                preview_success = await run_in_thread(setup_browser_preview, component_name)
+                
+                if not preview_success:
+                    log('⚠️  Browser preview failed, but files are saved.', 'yellow')
+                
+                # STEP 12: User approval
+                approval = await run_in_daemon_thread(prompt_for_approval)
+            result = await run_in_thread(handle_approval, approval, component_name)
+            
+            if result != 'regenerate':
+                break
+            log(f'🔄 Regenerating component (candidate {session.candidates + 1})...', 'yellow')
+            run_span.add('retries')
+            use_cache = False
         
-        if result == 'regenerate':
-            log('🔄 Regenerating component...', 'yellow')
-            run_pipeline(file_key, node_id, component_name)  # Recursive call
-        else:
-            header('✨ PIPELINE COMPLETE ✨')
-            if result == 'accepted':
-                log(f'Component location: generated-app/src/app/components/{component_name}/', 'green')
-                log(f'Route: http://localhost:4200/{component_name}', 'cyan')
-    
+        header('✨ PIPELINE COMPLETE ✨')
+        collect_pipeline_garbage(component_name if result == 'accepted' else None)
+        log_cache_stats()
+        if result == 'accepted':
+            log(f'Component location: generated-app/src/app/components/{component_name}/', 'green')
+            log(f'Route: {Config.DEV_SERVER_URL}/{component_name}', 'cyan')
+        return result
+    finally:
+        session.close()
+
+def run_pipeline(file_key: str, node_id: str, component_name: str, regenerate: bool = False):
+    """Run the complete pipeline (blocking CLI wrapper around run_pipeline_async)"""
+    try:
+        asyncio.run(run_pipeline_async(file_key, node_id, component_name, regenerate))
     except KeyboardInterrupt:
         log('\n\n⚠️  Pipeline interrupted by user', 'yellow')
         sys.exit(0)
@@ -733,32 +1854,624 @@ def run_pipeline(file_key: str, node_id: str, component_name: str):
         traceback.print_exc()
         sys.exit(1)
 
+# ============================================================================
+# Batch Mode: Many Components from One Figma File
+# ============================================================================
+BATCH_NODE_TYPES = {'FRAME', 'COMPONENT', 'COMPONENT_SET', 'INSTANCE', 'SECTION'}
+
+def slugify_component_name(name: str) -> str:
+    """Turn a Figma layer name into a kebab-case Angular component name"""
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+    if not slug or not slug[0].isalpha():
+        slug = f'component-{slug}'.rstrip('-')
+    return slug
+
+def load_batch_manifest(manifest_path: str) -> List[Dict]:
+    """Load (node_id, component_name) pairs from a JSON manifest
+    
+    Accepts a list of {"node_id": ..., "component_name": ...} objects
+    or a list of [node_id, component_name] pairs.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    
+    items = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            node_id, component_name = entry['node_id'], entry['component_name']
+        else:
+            node_id, component_name = entry
+        items.append({'node_id': str(node_id), 'component_name': component_name})
+    
+    if not items:
+        raise Exception(f'Batch manifest is empty: {manifest_path}')
+    return items
+
+def unique_component_name(name: str, seen_names: set) -> str:
+    """slugify_component_name with -2, -3... appended to names already in seen_names"""
+    base_name = slugify_component_name(name)
+    component_name = base_name
+    suffix = 2
+    while component_name in seen_names:
+        component_name = f'{base_name}-{suffix}'
+        suffix += 1
+    seen_names.add(component_name)
+    return component_name
+
+def select_batch_manifest(file_key: str, pattern: str) -> List[Dict]:
+    """Build a manifest from the --export index: every node matching a name or pattern like 'Tracking/*'"""
+    seen_names = set()
+    items = []
+    for node in resolve_node_refs(file_key, pattern):
+        items.append({
+            'node_id': node['node_id'],
+            'component_name': unique_component_name(node['name'] or node['node_id'], seen_names)
+        })
+    log(f'✓ "{pattern}" matched {len(items)} nodes', 'green')
+    return items
+
+def page_batch_manifest(file_key: str, page_node_id: str) -> List[Dict]:
+    """Build a manifest from the top-level frames of a Figma page or frame"""
+    page = fetch_figma_node(file_key, page_node_id)
+    
+    items = []
+    seen_names = set()
+    for child in page.get('children', []):
+        if child.get('type') not in BATCH_NODE_TYPES or child.get('visible') is False:
+            continue
+        
+        component_name = unique_component_name(child.get('name', child['id']), seen_names)
+        
+        # The page response already contains the full subtree, no need to refetch
+        items.append({
+            'node_id': child['id'].replace(':', '-'),
+            'component_name': component_name,
+            'document': child
+        })
+    
+    if not items:
+        raise Exception(f'No frames found under page node {page_node_id}')
+    
+    log(f'✓ Found {len(items)} frames on page {page.get("name", page_node_id)}', 'green')
+    return items
+
+@traced('batch.item')
+def generate_batch_item(file_key: str, item: Dict, brand_css: BrandCatalog, access_token: str) -> Dict:
+    """Run steps 1 and 4-7 for one manifest entry (executed on a worker thread)
+    
+    Oversized frames are chunked and simple nodes compiled locally; child
+    components are returned under 'parts'. Regenerated items skip the
+    compiler. item['reuse'] (watch mode) holds the design hashes of the
+    last generation: Granite parts that still match keep their published
+    files. 'part_hashes' are the hashes for the next snapshot.
+    """
+    component_name = item['component_name']
+    current_span().set(component=component_name)
+    result = {
+        'node_id': item['node_id'],
+        'component_name': component_name,
+        'files': None,
+        'parts': None,
+        'css_validation': None,
+        'part_hashes': None,
+        'error': None
+    }
+    
+    try:
+        figma_node = item.get('document') or fetch_figma_node(file_key, item['node_id'])
+        use_cache = not item.get('regenerate')
+        plan = plan_generation(figma_node, component_name, brand_css, Config.COMPILER and use_cache)
+        if plan is not None:
+            result['part_hashes'] = reuse_unchanged_parts(plan, component_name, item.get('reuse') or {})
+            result['files'], result['parts'], result['css_validation'] = generate_chunked(
+                plan, brand_css, access_token, use_cache=use_cache)
+            return result
+        
+        result['part_hashes'] = {component_name: design_hash(figma_node)}
+        files = None
+        if (item.get('reuse') or {}).get(component_name) == result['part_hashes'][component_name]:
+            files = published_files(component_name)
+        if files is None:
+            prompt = build_strict_prompt(figma_node, brand_css, component_name)
+            generated_code = generate_with_granite(prompt, access_token, use_cache=use_cache)
+            files = parse_generated_code(generated_code)
+            files['typescript'] = fix_typescript_logic(files['typescript'], files['html'])
+        result['css_validation'] = validate_css_strict(files['html'], brand_css.classes)
+        result['files'] = files
+    except Exception as e:
+        log(f'❌ {component_name}: {str(e)}', 'red')
+        result['error'] = str(e)
+    
+    return result
+
+def write_batch_results(results: List[Dict]) -> bool:
+    """Write every successful component to the preview folder and the app in one step
+    
+    Returns True when any app file or route actually changed.
+    """
+    header('WRITING BATCH RESULTS')
+    
+    changed = False
+    written = []
+    for result in results:
+        if result['error']:
+            continue
+        component_name = result['component_name']
+        save_to_preview(component_name, result['files'], result.get('parts'))
+        changed |= copy_to_generated_app(component_name).changed
+        written.append(component_name)
+    
+    # All routes in one transaction and one write
+    if written:
+        changed |= update_routes(*written)
+    return changed
+
+def print_batch_summary(results: List[Dict]):
+    """Print one line per component with its generation and CSS status"""
+    header('BATCH SUMMARY')
+    
+    for result in results:
+        name = result['component_name']
+        if result['error']:
+            log(f'  ❌ {name:<30} {result["error"]}', 'red')
+        elif result['css_validation']['is_valid']:
+            log(f'  ✅ {name:<30} CSS valid', 'green')
+        else:
+            violations = len(result['css_validation']['violations'])
+            log(f'  ⚠️  {name:<30} {violations} CSS violations', 'yellow')
+
+def review_batch_results(results: List[Dict], build_mark: Optional[int] = None) -> List[Dict]:
+    """Ask for approval of each generated component, returning the ones to regenerate
+    
+    build_mark is the dev server build count from before the files were
+    written, or None when nothing changed and no rebuild is expected.
+    """
+    if not ensure_dev_server():
+        log('⚠️  Browser preview failed, but files are saved.', 'yellow')
+    elif build_mark is not None:
+        wait_for_rebuild(build_mark)
+    
+    regenerate = []
+    for result in results:
+        if result['error']:
+            continue
+        
+        component_name = result['component_name']
+        log(f'\nReviewing: {component_name}', 'bold')
+        open_preview(component_name)
+        
+        approval = prompt_for_approval()
+        if handle_approval(approval, component_name) == 'regenerate':
+            regenerate.append({
+                'node_id': result['node_id'],
+                'component_name': component_name,
+                'regenerate': True
+            })
+    
+    return regenerate
+
+@traced('batch.run', 'run')
+def run_batch(file_key: str, items: List[Dict], concurrency: Optional[int] = None,
+              review: bool = True) -> List[Dict]:
+    """Generate many components with a bounded worker pool
+    
+    The brand CSS and IBM token are loaded once and shared by all workers.
+    Files are written after every worker has finished and approval happens
+    afterwards, so no component blocks the others. concurrency defaults to
+    Config.BATCH_CONCURRENCY.
+    """
+    concurrency = Config.BATCH_CONCURRENCY if concurrency is None else concurrency
+    header(f'🚀 FIGMA TO ANGULAR BATCH GENERATOR')
+    log(f'File Key: {file_key}', 'cyan')
+    log(f'Components: {len(items)}', 'cyan')
+    log(f'Concurrency: {concurrency}', 'cyan')
+    
+    check_credentials()
+    
+    # Shared across workers, loaded concurrently
+    brand_css, access_token = asyncio.run(gather_stages(load_brand_css_async(), get_ibm_access_token_async()))
+    
+    # With --export, every design comes from one pass over the export file
+    export_path = find_figma_export(file_key)
+    node_ids = [item['node_id'] for item in items if not item.get('document')]
+    if export_path and node_ids:
+        documents = load_export_nodes(export_path, node_ids)
+        items = [item if item.get('document') else dict(item, document=documents[item['node_id']]) for item in items]
+        log(f'✓ Loaded {len(node_ids)} nodes from export {export_path.name}', 'green')
+    
+    all_results = []
+    pending = items
+    while pending:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [submit_in_context(executor, generate_batch_item, file_key, item, brand_css, access_token)
+                       for item in pending]
+            results = [future.result() for future in futures]
+        
+        build_mark = get_dev_server().build_count
+        changed = write_batch_results(results)
+        print_batch_summary(results)
+        all_results.extend(results)
+        
+        pending = review_batch_results(results, build_mark if changed else None) if review else []
+        if pending:
+            log(f'🔄 Regenerating {len(pending)} components...', 'yellow')
+    
+    header('✨ BATCH COMPLETE ✨')
+    collect_pipeline_garbage()
+    log_cache_stats()
+    return all_results
+
+# ============================================================================
+# Watch Mode: Incremental Regeneration from Figma Diffs
+# ============================================================================
+def get_snapshot_store() -> SnapshotStore:
+    """Snapshots of the designs watch mode generated from (pipeline/.cache/snapshots/)"""
+    return SnapshotStore(Config.CACHE_DIR / 'snapshots')
+
+def poll_design_version(file_key: str) -> str:
+    """Current version of the watched design: the Figma file version, or the export's size and mtime"""
+    export_path = find_figma_export(file_key)
+    if export_path:
+        signature = export_signature(export_path)
+        return f'{export_path.name}@{signature["size"]}-{signature["mtime_ns"]}'
+    version, last_modified = fetch_figma_file_meta(file_key)
+    get_figma_cache().remember_version(file_key, version, last_modified)  # node fetches skip revalidating
+    return f'{version} ({last_modified})'
+
+def fetch_watched_documents(file_key: str, items: List[Dict]) -> List[Dict]:
+    """Current node documents of the watched items (one export pass, or coalesced API calls)"""
+    export_path = find_figma_export(file_key)
+    if export_path:
+        documents = load_export_nodes(export_path, [item['node_id'] for item in items])
+        return [documents[item['node_id']] for item in items]
+    with ThreadPoolExecutor(max_workers=max(1, min(len(items), Config.BATCH_CONCURRENCY))) as executor:
+        futures = [submit_in_context(executor, fetch_figma_node, file_key, item['node_id']) for item in items]
+        return [future.result() for future in futures]
+
+@traced('watch.cycle', 'run')
+def watch_cycle(file_key: str, items: List[Dict], version: str, concurrency: int) -> List[Dict]:
+    """Regenerate the watched components whose design changed since their snapshot
+    
+    Unchanged components are skipped; changed ones are generated like batch
+    items, keeping the files of every part whose design did not change, and
+    are published without review. Returns the batch results.
+    """
+    snapshots = get_snapshot_store()
+    documents = fetch_watched_documents(file_key, items)
+    
+    changed = []
+    for item, document in zip(items, documents):
+        component_name = item['component_name']
+        snapshot = snapshots.load(component_name)
+        if snapshot is None or snapshot.get('node_id') != item['node_id']:
+            log(f'🆕 {component_name}: no snapshot yet, generating', 'cyan')
+            changed.append(dict(item, document=document))
+            continue
+        diff = diff_designs(snapshot['document'], document)
+        if diff.empty and (Config.COMPONENT_DIR / component_name).exists():
+            log(f'✓ {component_name}: unchanged', 'gray')
+            continue
+        log(f'✏️  {component_name}: {diff.summary()}', 'cyan')
+        changed.append(dict(item, document=document, reuse=snapshot.get('parts') or {}))
+    current_span().set(components=len(items), changed=len(changed))
+    if not changed:
+        return []
+    
+    brand_css, access_token = asyncio.run(gather_stages(load_brand_css_async(), get_ibm_access_token_async()))
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [submit_in_context(executor, generate_batch_item, file_key, item, brand_css, access_token)
+                   for item in changed]
+        results = [future.result() for future in futures]
+    write_batch_results(results)
+    print_batch_summary(results)
+    
+    for item, result in zip(changed, results):
+        if not result['error']:
+            snapshots.save(item['component_name'], {
+                'file_key': file_key,
+                'node_id': item['node_id'],
+                'version': version,
+                'document': item['document'],
+                'parts': result['part_hashes']
+            })
+    return results
+
+def run_watch(file_key: str, items: List[Dict], interval: Optional[float] = None,
+              concurrency: Optional[int] = None, once: bool = False):
+    """Poll the design version and regenerate what changed, until interrupted
+    
+    Only the file metadata is requested per poll; node trees are fetched
+    when the version changes. A cycle that failed, or in which any
+    component failed, is retried at the next poll; components that
+    succeeded have their snapshot by then and are skipped as unchanged.
+    interval and concurrency default to Config.WATCH_INTERVAL and
+    Config.BATCH_CONCURRENCY.
+    """
+    interval = Config.WATCH_INTERVAL if interval is None else interval
+    concurrency = Config.BATCH_CONCURRENCY if concurrency is None else concurrency
+    header('👀 FIGMA WATCH MODE')
+    log(f'File Key: {file_key}', 'cyan')
+    log(f'Components: {", ".join(item["component_name"] for item in items)}', 'cyan')
+    log(f'Polling every {interval:g}s (parts up to {Config.CHUNK_TOKENS} tokens)', 'cyan')
+    check_credentials()
+    
+    seen_version = None
+    while True:
+        try:
+            version = poll_design_version(file_key)
+            if version != seen_version:
+                log(f'\n🔔 Design version {version}', 'bold')
+                results = watch_cycle(file_key, items, version, concurrency)
+                failed = [result['component_name'] for result in results if result['error']]
+                if failed:
+                    log(f'⚠️  Retrying {", ".join(failed)} at the next poll', 'yellow')
+                else:
+                    seen_version = version
+                log_cache_stats()
+        except Exception as e:
+            log(f'❌ Watch cycle failed: {e}', 'red')
+        if once:
+            return
+        time.sleep(interval)
+
 # ============================================================================
 # CLI Entry Point
 # ============================================================================
-if __name__ == '__main__':
-    if len(sys.argv) < 4:
-        print(f"""
+USAGE = f"""
 {Colors.BOLD}Usage:{Colors.END}
-  python pipeline/generate_pipeline.py <file_key> <node_id> <component_name>
+  python pipeline/generate_pipeline.py <file_key> <node_id> <component_name> [--candidates K] [options]
+  python pipeline/generate_pipeline.py batch <file_key> <manifest.json> [--concurrency N] [--no-review] [options]
+  python pipeline/generate_pipeline.py batch <file_key> --page <page_node_id> [--concurrency N] [--no-review] [options]
+  python pipeline/generate_pipeline.py batch <file_key> --select "<name or pattern>" --export [options]
+  python pipeline/generate_pipeline.py watch <file_key> (<node_id> <component_name> | <manifest.json> | --page <page_node_id>)
+                                             [--interval S] [--once] [options]
+  python pipeline/generate_pipeline.py audit [--workers N] [--no-cache]
+
+{Colors.BOLD}Options:{Colors.END}
+  --offline              Serve Figma data and Granite generations only from the local caches
+  --no-cache             Always call Granite (fresh results still refresh the response cache)
+  --stream               Stream the completion and write each file as its code block completes
+  --export [PATH]        Read Figma nodes from a full-file export (streamed, bounded memory) instead of
+                         the API; default is the newest figma-exports/figma-<fileKey>-full-*.json.
+                         Node ids may then be frame names or patterns like "Tracking/*" (see pipeline/figma_index.py)
+  --profile [PATH]       Time every step (bytes, tokens, cache hits, retries); writes PATH.jsonl and
+                         PATH.trace.json for chrome://tracing (default pipeline/.cache/profiles/)
+  --chunk-tokens N       Split frames whose design exceeds N prompt tokens into child components generated
+                         in parallel and composed into the parent (default FIGMA_PROMPT_TOKENS, 0 = never)
+  --no-compiler          Send every node to Granite instead of compiling text, rectangles, auto-layout
+                         frames and known component instances locally (pipeline/fast_compiler.py)
+  --no-dedupe            Generate repeated subtrees inline instead of as shared components in
+                         components/shared/ (pipeline/component_dedupe.py)
+  --candidates K         Generate K candidates in parallel at rising temperatures, preview the one with
+                         the fewest CSS violations / missing members first; [G] swaps to the next
 
 {Colors.BOLD}Example:{Colors.END}
   python pipeline/generate_pipeline.py 0eg3UmbqMcZtym1x8sGtZX 261-1272 home-page-test
+  python pipeline/generate_pipeline.py batch 0eg3UmbqMcZtym1x8sGtZX --page 255-2652 --concurrency 4
+  python pipeline/generate_pipeline.py 0eg3UmbqMcZtym1x8sGtZX "Tracking Form" tracking-form --export
+  python pipeline/generate_pipeline.py watch 0eg3UmbqMcZtym1x8sGtZX --page 255-2652 --interval 15
+
+{Colors.BOLD}Batch manifest:{Colors.END}
+  [{{"node_id": "261-1272", "component_name": "home-page"}}, ["255-2652", "tracking-page"]]
 
 {Colors.BOLD}Environment Variables Required:{Colors.END}
   FIGMA_ACCESS_TOKEN     - Your Figma API token
   IBM_GRANITE_API_KEY    - Your IBM Cloud API key
   IBM_GRANITE_PROJECT_ID - Your IBM Watson project ID (optional)
+  IBM_GRANITE_ENDPOINT, IBM_GRANITE_STREAM_ENDPOINT, IBM_IAM_ENDPOINT
+                         - Override IBM URLs, e.g. pipeline/servers/granite_stub_server.py (optional)
+  PIPELINE_CONCURRENCY   - Default batch worker count (optional, default 4)
+  PIPELINE_CANDIDATES    - Default for --candidates (optional, default 1)
+  PIPELINE_CHUNK_TOKENS  - Default for --chunk-tokens (optional)
+  PIPELINE_COMPILER      - 0 disables the local compiler, like --no-compiler (optional, default 1)
+  PIPELINE_DEDUPE        - 0 disables shared components, like --no-dedupe (optional, default 1)
+  PIPELINE_CHUNK_CONCURRENCY - Parallel Granite calls for the parts of one frame (optional, default 8)
+  PIPELINE_WATCH_INTERVAL - Seconds between watch polls (optional, default 30)
+  PIPELINE_WATCH_CHUNK_TOKENS - --chunk-tokens default in watch mode (optional, default 500)
+  PIPELINE_HTTP_RETRIES, PIPELINE_HTTP_CONNECT_TIMEOUT, FIGMA_READ_TIMEOUT, IBM_GRANITE_READ_TIMEOUT,
+  PIPELINE_BREAKER_THRESHOLD, PIPELINE_BREAKER_RESET
+                         - Outbound retries, timeouts and circuit breakers (optional, see pipeline/http_transport.py)
+  PIPELINE_PREFETCH      - 0 disables generating the next candidate during review (optional, default 1)
+  PIPELINE_DEV_SERVER_CMD - Dev server command (optional, default "npm start"; see pipeline/dev_server.py)
+  PIPELINE_DEV_SERVER_URL - Dev server address (optional, default http://localhost:4200)
+  PIPELINE_LAZY_ROUTES   - 0 registers eager component routes instead of lazy loadComponent (optional)
+  IAM_TOKEN_PERSIST      - 0 keeps the IAM token in memory only instead of pipeline/.cache/ (optional)
+  PIPELINE_QUIET         - 1 prints errors only (optional)
 
 {Colors.BOLD}Before running:{Colors.END}
   1. Create .env file with credentials
   2. Install dependencies: pip install -r requirements.txt
   3. Ensure Angular app exists: generated-app/
-        """)
+        """
+
+def add_common_options(parser: argparse.ArgumentParser):
+    """Options shared by the single and batch commands"""
+    parser.add_argument('--offline', action='store_true',
+                        help='Serve Figma data and Granite generations only from the local caches')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always call Granite instead of replaying cached generations')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream the completion and write each file as its code block completes')
+    parser.add_argument('--export', nargs='?', const='auto', metavar='PATH',
+                        help='Read Figma nodes from a full-file export instead of the API '
+                             '(default: newest figma-exports/figma-<fileKey>-full-*.json)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='PATH',
+                        help='Trace every step; writes PATH.jsonl and PATH.trace.json '
+                             '(default pipeline/.cache/profiles/<timestamp>)')
+    parser.add_argument('--chunk-tokens', type=int, metavar='N',
+                        help='Split frames above N prompt tokens into parts generated in parallel (0 = never)')
+    parser.add_argument('--no-compiler', action='store_true',
+                        help='Send every node to Granite instead of compiling simple nodes locally')
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help='Generate repeated subtrees inline instead of as shared components')
+
+def apply_common_options(args: argparse.Namespace):
+    """Copy shared CLI options onto Config"""
+    if args.offline:
+        Config.FIGMA_OFFLINE = True
+        Config.GRANITE_OFFLINE = True
+    if args.no_cache:
+        Config.LLM_CACHE_ENABLED = False
+    if args.stream:
+        Config.STREAM = True
+    if args.export is not None:
+        Config.FIGMA_EXPORT = args.export
+    if args.chunk_tokens is not None:
+        Config.CHUNK_TOKENS = args.chunk_tokens
+    if args.no_compiler:
+        Config.COMPILER = False
+    if args.no_dedupe:
+        Config.DEDUPE = False
+    if args.profile is not None:
+        enable_profiling(args.profile)
+
+# ============================================================================
+# Profiling (--profile)
+# ============================================================================
+def enable_profiling(path_prefix: str = ''):
+    """Record spans for this process and write them when it exits"""
+    if not path_prefix:
+        path_prefix = str(Config.PROFILE_DIR / time.strftime('run-%Y%m%d-%H%M%S'))
+    TRACER.enable()
+    atexit.register(write_profile, Path(path_prefix))
+
+def write_profile(path_prefix: Path):
+    """Write the JSON-lines and Chrome trace files and print a per-step summary"""
+    jsonl_path = path_prefix.with_name(path_prefix.name + '.jsonl')
+    trace_path = path_prefix.with_name(path_prefix.name + '.trace.json')
+    TRACER.write_jsonl(jsonl_path)
+    TRACER.write_chrome_trace(trace_path)
+    
+    rows = TRACER.summary()
+    run_total = sum(row['total'] for row in rows if row['category'] == 'run') or None
+    header('PROFILE')
+    log(f'{"step":<24}{"count":>6}{"total s":>10}{"max s":>9}{"share":>7}{"KB in":>9}{"KB out":>9}'
+        f'{"tok in":>8}{"tok out":>8}{"hits":>6}{"retry":>6}', 'bold')
+    for row in rows:
+        share = f'{row["total"] / run_total:.0%}' if run_total and row['category'] != 'run' else ''
+        log(f'{row["name"]:<24}{row["count"]:>6}{row["total"]:>10.2f}{row["max"]:>9.2f}{share:>7}'
+            f'{row.get("bytes_in", 0) / 1024:>9.1f}{row.get("bytes_out", 0) / 1024:>9.1f}'
+            f'{int(row.get("prompt_tokens", 0)):>8}{int(row.get("completion_tokens", 0)):>8}'
+            f'{int(row.get("cache_hits", 0)):>6}{int(row.get("retries", 0)):>6}',
+            'yellow' if row['category'] == 'wait' else None)
+    log(f'\nTrace: {trace_path} (chrome://tracing or ui.perfetto.dev)', 'cyan')
+    log(f'Spans: {jsonl_path}', 'cyan')
+
+def single_main(argv: List[str]):
+    """Parse single-component arguments and run the pipeline"""
+    parser = argparse.ArgumentParser(prog='generate_pipeline.py')
+    parser.add_argument('file_key')
+    parser.add_argument('node_id')
+    parser.add_argument('component_name')
+    parser.add_argument('--candidates', type=int, default=Config.CANDIDATES,
+                        help='Generate K candidates in parallel and preview the best first')
+    add_common_options(parser)
+    args = parser.parse_args(argv)
+    apply_common_options(args)
+    Config.CANDIDATES = max(1, args.candidates)
+    
+    try:
+        node_id = resolve_node_id(args.file_key, args.node_id)
+    except Exception as e:
+        log(f'❌ {e}', 'red')
         sys.exit(1)
+    run_pipeline(args.file_key, node_id, args.component_name)
+
+def batch_main(argv: List[str]):
+    """Parse batch arguments and run the batch pipeline"""
+    parser = argparse.ArgumentParser(prog='generate_pipeline.py batch')
+    parser.add_argument('file_key')
+    parser.add_argument('manifest', nargs='?')
+    parser.add_argument('--page', help='Generate every top-level frame of this node')
+    parser.add_argument('--select', metavar='PATTERN',
+                        help='Generate every node matching a name or path pattern, e.g. "Tracking/*" (needs --export)')
+    parser.add_argument('--concurrency', type=int, default=Config.BATCH_CONCURRENCY)
+    parser.add_argument('--no-review', action='store_true', help='Skip the approval step')
+    add_common_options(parser)
+    args = parser.parse_args(argv)
+    apply_common_options(args)
+    
+    if sum(map(bool, (args.manifest, args.page, args.select))) != 1:
+        parser.error('provide one of a manifest file, --page <node_id> or --select <pattern>')
     
-    file_key = sys.argv[1]
-    node_id = sys.argv[2]
-    component_name = sys.argv[3]
+    try:
+        if args.page:
+            items = page_batch_manifest(args.file_key, resolve_node_id(args.file_key, args.page))
+        elif args.select:
+            items = select_batch_manifest(args.file_key, args.select)
+        else:
+            items = [dict(item, node_id=resolve_node_id(args.file_key, item['node_id']))
+                     for item in load_batch_manifest(args.manifest)]
+        results = run_batch(args.file_key, items, args.concurrency, review=not args.no_review)
+    except KeyboardInterrupt:
+        log('\n\n⚠️  Batch interrupted by user', 'yellow')
+        sys.exit(0)
+    except Exception as e:
+        log(f'\n\n❌ Batch error: {str(e)}', 'red')
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    
+    if any(result['error'] for result in results):
+        sys.exit(1)
+
+def watch_main(argv: List[str]):
+    """Parse watch arguments and poll until interrupted"""
+    parser = argparse.ArgumentParser(prog='generate_pipeline.py watch')
+    parser.add_argument('file_key')
+    parser.add_argument('targets', nargs='*', metavar='TARGET',
+                        help='<node_id> <component_name>, or a batch manifest file')
+    parser.add_argument('--page', help='Watch every top-level frame of this node')
+    parser.add_argument('--interval', type=float, default=Config.WATCH_INTERVAL, help='Seconds between polls')
+    parser.add_argument('--concurrency', type=int, default=Config.BATCH_CONCURRENCY)
+    parser.add_argument('--once', action='store_true', help='Run one cycle and exit')
+    add_common_options(parser)
+    args = parser.parse_args(argv)
+    apply_common_options(args)
+    if args.chunk_tokens is None:
+        Config.CHUNK_TOKENS = Config.WATCH_CHUNK_TOKENS
+    
+    if bool(args.page) == bool(args.targets) or len(args.targets) > 2:
+        parser.error('provide <node_id> <component_name>, a manifest file or --page <node_id>')
+    
+    try:
+        if args.page:
+            items = [{key: value for key, value in item.items() if key != 'document'}
+                     for item in page_batch_manifest(args.file_key, resolve_node_id(args.file_key, args.page))]
+        elif len(args.targets) == 2:
+            items = [{'node_id': resolve_node_id(args.file_key, args.targets[0]), 'component_name': args.targets[1]}]
+        else:
+            items = [dict(item, node_id=resolve_node_id(args.file_key, item['node_id']))
+                     for item in load_batch_manifest(args.targets[0])]
+        run_watch(args.file_key, items, args.interval, args.concurrency, once=args.once)
+    except KeyboardInterrupt:
+        log('\n\n👋 Watch stopped', 'yellow')
+    except Exception as e:
+        log(f'\n\n❌ Watch error: {str(e)}', 'red')
+        sys.exit(1)
+
+def audit_main(argv: List[str]):
+    """Audit all generated components against the brand CSS"""
+    parser = argparse.ArgumentParser(prog='generate_pipeline.py audit')
+    parser.add_argument('--workers', type=int, help='Process pool size (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='Re-check files even if unchanged')
+    args = parser.parse_args(argv)
+    
+    violations = run_audit(args.workers, use_cache=not args.no_cache)
+    sys.exit(1 if violations else 0)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(sys.argv[2:])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'audit':
+        audit_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        watch_main(sys.argv[2:])
+        sys.exit(0)
+    
+    if len([arg for arg in sys.argv[1:] if not arg.startswith('--')]) < 3:
+        print(USAGE)
+        sys.exit(1)
     
-    run_pipeline(file_key, node_id, component_name)
+    single_main(sys.argv[1:])
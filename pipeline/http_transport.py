@@ -0,0 +1,252 @@
+"""
+Shared HTTP Transport with Timeouts, Retries and Circuit Breakers
+
+Every outbound API call of the pipeline (Figma, IBM IAM and watsonx chat)
+goes through one HttpTransport:
+
+  - one pooled keep-alive session per host, shared by all threads
+  - connect/read timeouts per endpoint, so a stalled upstream fails the
+    call instead of hanging a worker forever
+  - connection errors, timeouts, 429 and 5xx responses are retried with
+    full-jitter exponential backoff; a Retry-After header (seconds or HTTP
+    date) replaces the computed delay; calls that are not safe to repeat
+    (idempotent=False, the Granite generations) only retry failed connects,
+    429 and 503, never a read timeout or a 500 that may have done the work
+  - a circuit breaker per host: after `breaker_threshold` consecutive
+    failed calls the host is skipped for `breaker_reset` seconds, then one
+    trial call decides whether it is back
+  - counters per endpoint (requests, retries, failures, status codes,
+    seconds) for logs, profiles and the job server's /health
+
+Responses that are not retried are returned as they are; callers keep
+raising their own errors for them. Streaming responses are only retried
+until their status line arrives.
+"""
+
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from tracing import current_span
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+NON_IDEMPOTENT_RETRY_STATUSES = {429, 503}  # refused before the request was processed
+BREAKER_STATUSES = {500, 502, 503, 504}  # a rate limit is not an outage
+
+def retry_after_seconds(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header ('120' or an HTTP date), None if absent or invalid"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - (time.time() if now is None else now))
+
+def never_sent(error: Exception) -> bool:
+    """Whether a failed request never reached the server: the connection was not made
+
+    A reset or dropped connection after the body went out does not count,
+    since the server may have processed the request.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError):
+        return False
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, 'reason', reason)  # urllib3's MaxRetryError wraps the cause
+    return isinstance(reason, NewConnectionError)  # includes NameResolutionError
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one upstream host: closed, open, then half-open"""
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_after else 'open'
+
+    def allow(self) -> bool:
+        """Whether a call may go out; in half-open state only one trial call at a time"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def seconds_left(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_after - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.threshold and (self.opened_at is not None or self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+
+class HttpTransport:
+    """Pooled, retrying, circuit-breaking requests for every upstream"""
+
+    def __init__(self, pool_size: int = 16, retries: int = 3, backoff: float = 0.5, backoff_max: float = 30.0,
+                 max_retry_after: float = 60.0, breaker_threshold: int = 5, breaker_reset: float = 30.0,
+                 verify: bool = False):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.verify = verify
+
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._metrics: Dict[str, Dict] = {}
+
+    # ------------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------------
+    def request(self, method: str, url: str, endpoint: str, timeout: Tuple[float, float],
+                retries: Optional[int] = None, breaker: bool = True, idempotent: bool = True,
+                **kwargs) -> requests.Response:
+        """Send a request with retries; raises when the host's circuit is open or every attempt failed
+
+        endpoint names the call in the metrics ('figma', 'iam', 'granite', ...).
+        breaker=False keeps the call out of the host's circuit breaker
+        (probes that are expected to fail, like a health check).
+        idempotent=False marks calls that must not run twice upstream: only
+        connections that were never made, 429 and 503 are retried.
+        """
+        host = urlsplit(url).netloc
+        circuit = self.breaker(host) if breaker else None
+        if circuit is not None and not circuit.allow():
+            self._count(endpoint, 'rejected')
+            raise Exception(f'{host} is unavailable: circuit open after {circuit.failures} failed calls '
+                            f'(next try in {circuit.seconds_left():.0f}s)')
+
+        session = self.session(url)
+        retries = self.retries if retries is None else retries
+        retry_statuses = RETRY_STATUSES if idempotent else NON_IDEMPOTENT_RETRY_STATUSES
+        attempt = 0
+        while True:
+            self._count(endpoint, 'requests')
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=timeout, verify=self.verify, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count(endpoint, 'seconds', time.perf_counter() - started)
+                self._count(endpoint, 'timeouts' if isinstance(e, requests.Timeout) else 'connection_errors')
+                if attempt >= retries or not (idempotent or never_sent(e)):
+                    self._fail(endpoint, circuit)
+                    raise Exception(f'{endpoint} request to {host} failed after {attempt + 1} attempts: {e}')
+                delay = self.backoff_delay(attempt)
+            except requests.RequestException:
+                self._fail(endpoint, circuit)
+                raise
+            else:
+                self._count(endpoint, 'seconds', time.perf_counter() - started)
+                self._count(endpoint, f'status_{response.status_code}')
+                if response.status_code not in retry_statuses:
+                    if response.status_code in BREAKER_STATUSES:
+                        self._fail(endpoint, circuit)
+                    elif circuit is not None:
+                        circuit.record_success()
+                    return response
+
+                delay = retry_after_seconds(response.headers.get('Retry-After'))
+                if delay is None:
+                    delay = self.backoff_delay(attempt)
+                if attempt >= retries or delay > self.max_retry_after:
+                    if response.status_code in BREAKER_STATUSES:
+                        self._fail(endpoint, circuit)
+                    elif circuit is not None:
+                        circuit.record_success()
+                    return response
+                response.close()
+
+            attempt += 1
+            self._count(endpoint, 'retries')
+            current_span().add('retries')
+            time.sleep(delay)
+
+    def session(self, url: str) -> requests.Session:
+        """The pooled session for a URL's scheme and host"""
+        parts = urlsplit(url)
+        key = f'{parts.scheme}://{parts.netloc}'
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                session.mount(f'{key}/', HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size))
+                self._sessions[key] = session
+            return session
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            circuit = self._breakers.get(host)
+            if circuit is None:
+                circuit = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+                self._breakers[host] = circuit
+            return circuit
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and the exponential backoff for this attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    def metrics(self) -> Dict:
+        """{'endpoints': {name: counters}, 'circuits': {host: state}}"""
+        with self._lock:
+            return {
+                'endpoints': {name: dict(counters) for name, counters in self._metrics.items()},
+                'circuits': {host: circuit.state for host, circuit in self._breakers.items()}
+            }
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+
+    # ------------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------------
+    def _count(self, endpoint: str, counter: str, amount: float = 1):
+        with self._lock:
+            counters = self._metrics.setdefault(endpoint, {})
+            counters[counter] = counters.get(counter, 0) + amount
+
+    def _fail(self, endpoint: str, circuit: Optional[CircuitBreaker]):
+        self._count(endpoint, 'failures')
+        if circuit is not None:
+            circuit.record_failure()
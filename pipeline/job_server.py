@@ -0,0 +1,363 @@
+"""
+Local Job Server for Many Designers
+
+A long-running process that accepts generation jobs over HTTP, so each run
+does not pay for a fresh interpreter, imports, connections and cold caches.
+The brand catalog, Figma client and caches, IAM token, response cache and
+shared-component registry are the pipeline's process-wide singletons, so
+every job after the first starts warm.
+
+Jobs are queued and run by run_pipeline_async() on a pool of --workers
+slots. A job waiting for review releases its slot: the component is
+published to generated-app (open the route on the dev server) and the
+designer decides through the API. Regenerate queues the job again behind
+the jobs already waiting.
+
+Endpoints (JSON):
+  POST /jobs                      - {"file_key", "node_id", "component_name", "regenerate"?, "review"?}
+  GET  /jobs                      - every job, newest first
+  GET  /jobs/{id}                 - status: queued, running, review, accepted, rejected or failed
+  GET  /jobs/{id}/result          - the component's published files (in review or accepted)
+  POST /jobs/{id}/accept          - keep the component
+  POST /jobs/{id}/reject          - remove it and its route
+  POST /jobs/{id}/regenerate      - generate a new candidate (response cache bypassed)
+  GET  /health                    - workers, queue length, jobs per status, HTTP and Figma counters
+
+"review": false accepts the first candidate without waiting. Only one job
+per component name can be active at a time.
+
+Usage:
+  python pipeline/job_server.py [--port 8770] [--workers 4] [--review-timeout 0] [options]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import queue
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import generate_pipeline as pipeline
+from generate_pipeline import Config, log
+
+ACTIVE_STATUSES = ('queued', 'running', 'review')
+DECISIONS = {'accept': 'A', 'reject': 'R', 'regenerate': 'G'}
+COMPONENT_NAME = re.compile(r'^[a-z][a-z0-9-]*$')
+JOB_PATH = re.compile(r'^/jobs/(\d+)(?:/(result|accept|reject|regenerate))?$')
+
+class JobError(Exception):
+    """A request the server refuses; status is the HTTP status to answer with"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class Job:
+    """One component request and its progress"""
+
+    def __init__(self, job_id: str, file_key: str, node_id: str, component_name: str,
+                 regenerate: bool = False, review: bool = True):
+        self.id = job_id
+        self.file_key = file_key
+        self.node_id = node_id
+        self.component_name = component_name
+        self.regenerate = regenerate
+        self.review = review
+        self.status = 'queued'
+        self.candidates = 0
+        self.decision: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.holds_slot = False
+        self.resume: Optional[threading.Event] = None  # set by the dispatcher when a regenerate gets its slot
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'file_key': self.file_key,
+            'node_id': self.node_id,
+            'component_name': self.component_name,
+            'status': self.status,
+            'candidates': self.candidates,
+            'error': self.error,
+            'preview_url': f'{Config.DEV_SERVER_URL}/{self.component_name}',
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+
+class JobQueue:
+    """Queued jobs run on a fixed number of worker slots
+
+    Every job runs on its own thread, but only while holding one of the
+    slots; waiting for review gives the slot back, so designers reviewing
+    components never keep the queue from moving. A regenerated job goes
+    back to the end of the queue and resumes on its own thread once the
+    dispatcher hands it a slot.
+    """
+
+    def __init__(self, workers: Optional[int] = None, review_timeout: Optional[float] = None):
+        self.workers = max(1, Config.JOB_WORKERS if workers is None else workers)
+        self.review_timeout = Config.JOB_REVIEW_TIMEOUT if review_timeout is None else review_timeout
+        self.jobs: Dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._pending: 'queue.Queue[Optional[Job]]' = queue.Queue()
+        self._slots = threading.Semaphore(self.workers)
+        self._changed = threading.Condition()
+        self._dispatcher = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+
+    def start(self):
+        self._dispatcher.start()
+
+    def stop(self):
+        """Stop starting queued jobs; running ones finish on their daemon threads"""
+        self._pending.put(None)
+
+    def warm(self):
+        """Load the brand catalog and IAM token before the first job arrives"""
+        started = time.time()
+        try:
+            pipeline.check_credentials()
+            pipeline.load_brand_css()
+            if not Config.GRANITE_OFFLINE:
+                pipeline.get_ibm_access_token()
+        except Exception as e:
+            log(f'⚠️  Warm-up skipped ({e}); the first job will load everything', 'yellow')
+            return
+        log(f'✓ Warm: brand catalog and IAM token ready ({time.time() - started:.1f}s)', 'green')
+
+    # ------------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------------
+    def submit(self, request: Dict) -> Job:
+        missing = [key for key in ('file_key', 'node_id', 'component_name') if not request.get(key)]
+        if missing:
+            raise JobError(400, f'Missing {", ".join(missing)}')
+        component_name = str(request['component_name'])
+        if not COMPONENT_NAME.match(component_name):
+            raise JobError(400, f'Invalid component name "{component_name}" (use kebab-case)')
+
+        with self._changed:
+            active = next((job for job in self.jobs.values() if job.component_name == component_name
+                           and job.status in ACTIVE_STATUSES), None)
+            if active is not None:
+                raise JobError(409, f'Job {active.id} is already {active.status} for {component_name}')
+            job = Job(str(next(self._ids)), str(request['file_key']), str(request['node_id']), component_name,
+                      regenerate=bool(request.get('regenerate')), review=request.get('review', True) is not False)
+            self.jobs[job.id] = job
+        self._pending.put(job)
+        log(f'📥 Job {job.id}: {component_name} ({job.file_key} {job.node_id}) queued', 'cyan')
+        return job
+
+    def get(self, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise JobError(404, f'Unknown job {job_id}')
+        return job
+
+    def list(self) -> List[Job]:
+        return sorted(self.jobs.values(), key=lambda job: -int(job.id))
+
+    def result(self, job_id: str) -> Dict:
+        job = self.get(job_id)
+        if job.status not in ('review', 'accepted'):
+            raise JobError(409, f'Job {job_id} has no result while {job.status}')
+        files = pipeline.published_files(job.component_name)
+        if files is None:
+            raise JobError(404, f'Files of {job.component_name} are missing from generated-app')
+        return dict(job.to_dict(), files=files)
+
+    def decide(self, job_id: str, action: str) -> Job:
+        with self._changed:
+            job = self.get(job_id)
+            if job.status != 'review':
+                raise JobError(409, f'Job {job_id} is {job.status}, not waiting for review')
+            job.decision = DECISIONS[action]
+            job.status = 'queued' if action == 'regenerate' else 'running'
+            self._changed.notify_all()
+        return job
+
+    def health(self) -> Dict:
+        with self._changed:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            'workers': self.workers,
+            'queued': self._pending.qsize(),
+            'jobs': {status: statuses.count(status) for status in sorted(set(statuses))},
+            'http': pipeline.get_http_transport().metrics(),
+            'figma': pipeline.get_figma_client().metrics()
+        }
+
+    # ------------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------------
+    def _dispatch(self):
+        """Start queued jobs in order as slots become free"""
+        while True:
+            job = self._pending.get()
+            if job is None:
+                return
+            self._slots.acquire()
+            job.holds_slot = True
+            resume, job.resume = job.resume, None
+            if resume is not None:
+                resume.set()
+                continue
+            threading.Thread(target=self._run, args=(job,), name=f'job-{job.id}', daemon=True).start()
+
+    def _run(self, job: Job):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            result = asyncio.run(pipeline.run_pipeline_async(
+                job.file_key, job.node_id, job.component_name, job.regenerate,
+                review=lambda component_name: self._review(job)
+            ))
+            job.status = result
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            log(f'❌ Job {job.id} ({job.component_name}) failed: {e}', 'red')
+        finally:
+            job.finished = time.time()
+            if job.holds_slot:
+                job.holds_slot = False
+                self._slots.release()
+        log(f'🏁 Job {job.id}: {job.component_name} {job.status}', 'green' if job.status == 'accepted' else 'yellow')
+
+    def _review(self, job: Job) -> str:
+        """review hook of run_pipeline_async: wait for the API without holding a slot"""
+        job.candidates += 1
+        if not job.review:
+            return 'A'
+
+        with self._changed:
+            job.decision = None
+            job.status = 'review'
+            job.holds_slot = False
+            self._slots.release()
+            log(f'👀 Job {job.id}: {job.component_name} ready for review at '
+                f'{Config.DEV_SERVER_URL}/{job.component_name}', 'cyan')
+            decided = self._changed.wait_for(lambda: job.decision is not None, self.review_timeout or None)
+            if not decided:
+                job.decision = 'R'
+                job.error = f'No review within {self.review_timeout:g}s'
+                log(f'⏰ Job {job.id}: review timed out, rejecting {job.component_name}', 'yellow')
+            decision = job.decision
+
+        if decision == 'G':
+            job.resume = threading.Event()
+            self._pending.put(job)
+            job.resume.wait()
+            job.status = 'running'
+        return decision
+
+# ============================================================================
+# HTTP
+# ============================================================================
+class JobHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    jobs: JobQueue
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict:
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise JobError(400, 'Invalid Content-Length')
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise JobError(400, 'Body is not valid JSON')
+        if not isinstance(body, dict):
+            raise JobError(400, 'Body must be a JSON object')
+        return body
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        path = self.path.split('?')[0].rstrip('/')
+        try:
+            if method == 'POST':
+                body = self._read_json()
+            if path == '/health' and method == 'GET':
+                return self._send_json(200, self.jobs.health())
+            if path == '/jobs':
+                if method == 'POST':
+                    return self._send_json(202, self.jobs.submit(body).to_dict())
+                return self._send_json(200, [job.to_dict() for job in self.jobs.list()])
+
+            match = JOB_PATH.match(path)
+            if not match:
+                raise JobError(404, f'Unknown path {path}')
+            job_id, action = match.groups()
+            if method == 'GET' and action is None:
+                return self._send_json(200, self.jobs.get(job_id).to_dict())
+            if method == 'GET' and action == 'result':
+                return self._send_json(200, self.jobs.result(job_id))
+            if method == 'POST' and action in DECISIONS:
+                return self._send_json(200, self.jobs.decide(job_id, action).to_dict())
+            raise JobError(405, f'{method} is not supported on {path}')
+        except JobError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            log(f'❌ {method} {path} failed: {e}', 'red')
+            self._send_json(500, {'error': f'Internal error: {e}'})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+def start_job_server(host: str = '127.0.0.1', port: int = 0, jobs: Optional[JobQueue] = None) -> ThreadingHTTPServer:
+    """Serve the job API on a background thread (port 0 picks a free port)"""
+    jobs = jobs or JobQueue()
+    jobs.start()
+    handler = type('BoundJobHandler', (JobHandler,), {'jobs': jobs})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.jobs = jobs
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='job_server.py', description='Queue and run generation jobs over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8770)
+    parser.add_argument('--workers', type=int, default=Config.JOB_WORKERS, help='Jobs generating at once')
+    parser.add_argument('--review-timeout', type=float, default=Config.JOB_REVIEW_TIMEOUT,
+                        help='Reject components not reviewed within this many seconds (0 = wait)')
+    pipeline.add_common_options(parser)
+    args = parser.parse_args(argv)
+    pipeline.apply_common_options(args)
+
+    jobs = JobQueue(args.workers, args.review_timeout)
+    jobs.warm()
+    server = start_job_server(args.host, args.port, jobs)
+    log(f'🚦 Job server listening on http://{args.host}:{server.server_port} ({jobs.workers} workers)', 'green')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        log('\n👋 Job server stopped', 'yellow')
+        jobs.stop()
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Incremental, Atomic Publishing of Generated Files
+
+Writes go through a content-hash comparison, so a regeneration that only
+changed the SCSS touches only the .scss file. The Angular watcher then sees
+one event instead of a deleted and recreated directory. Every write goes
+to a temp file in the same directory followed by os.replace, so the watcher
+never reads a half-written file. atomic_write() is that write on its own; the
+caches, indexes, snapshots and routes file use it too.
+
+collect_garbage() prunes directories the pipeline leaves behind (.preview/
+entries, *_old_* folders from locked deletes) least recently used first.
+"""
+
+import hashlib
+import os
+import shutil
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Union
+
+class PublishResult(NamedTuple):
+    written: List[Path]
+    unchanged: List[Path]
+    removed: List[Path]
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.written or self.removed)
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def file_hash(path: Path) -> Optional[str]:
+    try:
+        return content_hash(Path(path).read_bytes())
+    except OSError:
+        return None
+
+def write_if_changed(path: Path, content: Union[str, bytes], retries: int = 5) -> bool:
+    """Atomically write content unless the file already holds it; True when written"""
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    path = Path(path)
+    if file_hash(path) == content_hash(data):
+        return False
+
+    atomic_write(path, data, retries=retries)
+    return True
+
+def atomic_write(path: Path, content: Union[str, bytes], mode: Optional[int] = None, retries: int = 5):
+    """Write through a temp file in the same directory and os.replace, so readers never see partial data
+
+    The temp name carries the process and thread id: concurrent writers of
+    one path each replace it with a complete file, and the last one wins.
+    mode sets the permissions before anything is written (e.g. 0o600 for tokens).
+    """
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666 if mode is None else mode)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    for attempt in range(retries):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            # Windows: the watcher or an editor may hold the file for a moment
+            if attempt == retries - 1:
+                tmp_path.unlink()
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+def sync_directory(src_dir: Path, dest_dir: Path, remove_extra: bool = True) -> PublishResult:
+    """Mirror src_dir into dest_dir, writing only files whose content differs"""
+    src_dir, dest_dir = Path(src_dir), Path(dest_dir)
+    written, unchanged, removed = [], [], []
+
+    wanted = set()
+    for src_file in sorted(src_dir.rglob('*')):
+        if not src_file.is_file() or src_file.name.endswith('.tmp'):
+            continue
+        rel_path = src_file.relative_to(src_dir)
+        wanted.add(rel_path)
+        dest_file = dest_dir / rel_path
+        if write_if_changed(dest_file, src_file.read_bytes()):
+            written.append(dest_file)
+        else:
+            unchanged.append(dest_file)
+
+    if remove_extra and dest_dir.exists():
+        for dest_file in sorted(dest_dir.rglob('*'), reverse=True):
+            rel_path = dest_file.relative_to(dest_dir)
+            if dest_file.is_file() and rel_path not in wanted:
+                dest_file.unlink()
+                removed.append(dest_file)
+            elif dest_file.is_dir() and not any(dest_file.iterdir()):
+                dest_file.rmdir()
+
+    return PublishResult(written, unchanged, removed)
+
+def touch(path: Path):
+    """Mark a directory as recently used for collect_garbage()"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+# ============================================================================
+# Garbage Collection
+# ============================================================================
+def last_used(path: Path) -> float:
+    """Newest mtime of a directory or anything inside it"""
+    newest = path.stat().st_mtime
+    for child in path.rglob('*'):
+        try:
+            newest = max(newest, child.stat().st_mtime)
+        except OSError:
+            pass
+    return newest
+
+def remove_tree(path: Path) -> bool:
+    """Remove a directory, clearing read-only flags (Windows); False if it is locked"""
+    def handle_remove_readonly(func, failed_path, exc):
+        os.chmod(failed_path, stat.S_IWUSR)
+        func(failed_path)
+
+    try:
+        shutil.rmtree(path, onerror=handle_remove_readonly)
+        return True
+    except OSError:
+        return False
+
+def collect_garbage(directories: Iterable[Path], keep: int = 0, min_age: float = 0,
+                    protect: Iterable[Path] = ()) -> List[Path]:
+    """Remove all but the keep most recently used directories
+
+    Directories used within min_age seconds and those in protect are never
+    removed. Locked directories are skipped and retried on the next run.
+    """
+    protected = {Path(path).resolve() for path in protect}
+    now = time.time()
+    candidates = []
+    for directory in directories:
+        directory = Path(directory)
+        if directory.is_dir() and directory.resolve() not in protected:
+            candidates.append((last_used(directory), directory))
+
+    candidates.sort(reverse=True)  # most recently used first
+    removed = []
+    for used_at, directory in candidates[keep:]:
+        if now - used_at < min_age:
+            continue
+        if remove_tree(directory):
+            removed.append(directory)
+    return removed
@@ -0,0 +1,61 @@
+"""
+Content-Addressed Granite Response Cache
+
+Generations are keyed by a SHA-256 of the final prompt plus the model
+parameters that change the output (model_id, temperature, max_tokens).
+Entries live in llm-processing/cache/ and are evicted least recently used
+once the directory exceeds its byte budget.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from cache_store import DiskCache
+
+class ResponseCache:
+    """Prompt-hash -> generated text cache with hit/miss counters"""
+
+    def __init__(self, root: Path, max_bytes: int = 50 * 1024 * 1024):
+        self.store = DiskCache(root, max_bytes)
+        self.bypassed = 0
+
+    @staticmethod
+    def make_key(prompt: str, model_id: str, temperature: float, max_tokens: int) -> str:
+        payload = json.dumps({
+            'prompt': prompt,
+            'model_id': model_id,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached generation for key, or None"""
+        entry = self.store.get(key)
+        return entry['content'] if entry else None
+
+    def put(self, key: str, content: str, model_id: str, temperature: float, max_tokens: int):
+        """Store a generation, replacing any earlier one for the same key"""
+        self.store.put(
+            key,
+            {'content': content},
+            filename=f'response-{key[:32]}.json',
+            meta={
+                'model_id': model_id,
+                'temperature': temperature,
+                'max_tokens': max_tokens,
+                'stored_at': time.time()
+            }
+        )
+
+    def record_bypass(self):
+        """Count a generation that skipped the cache on purpose"""
+        self.bypassed += 1
+
+    def stats(self) -> Dict[str, int]:
+        stats = self.store.stats()
+        stats['bypassed'] = self.bypassed
+        return stats
@@ -0,0 +1,243 @@
+"""
+Route Registry for app.routes.ts
+
+Parses the routes file once into a model (imports, route entries, the text
+around them), applies any number of additions and removals, and renders the
+file in one write with consistent formatting. Routes it does not generate
+(redirects, children, guards) are kept verbatim.
+
+Generated components can be registered as lazy routes:
+  { path: 'x', loadComponent: () => import('./components/x/x.component').then(m => m.XComponent) }
+so each page becomes its own chunk and the initial bundle stays the same size
+however many pages are generated. The '**' wildcard route always stays last.
+
+Usage:
+  with RouteRegistry.transaction(routes_path) as routes:
+      routes.add('home-page', lazy=True)
+      routes.remove('old-page')
+"""
+
+import re
+import textwrap
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from publisher import atomic_write
+
+ROUTES_DECLARATION = re.compile(r'export\s+const\s+routes\s*:\s*Routes\s*=\s*\[')
+IMPORT_LINE = re.compile(r'^import\s+\{\s*([\w\s,]+?)\s*\}\s+from\s+[\'"]([^\'"]+)[\'"];?\s*$')
+PATH_KEY = re.compile(r'\bpath\s*:\s*[\'"]([^\'"]*)[\'"]')
+COMPONENT_KEY = re.compile(r'\bcomponent\s*:\s*(\w+)')
+LAZY_KEY = re.compile(r'\bloadComponent\s*:\s*\(\)\s*=>\s*import\(\s*[\'"]([^\'"]+)[\'"]\s*\)'
+                      r'\s*\.then\(\s*(\w+)\s*=>\s*\2\.(\w+)\s*\)')
+
+# One process-wide lock: batch workers and the review loop share one file
+_write_lock = threading.Lock()
+
+def component_class_name(component_name: str) -> str:
+    return ''.join(word.capitalize() for word in component_name.split('-')) + 'Component'
+
+def component_import_path(component_name: str) -> str:
+    return f'./components/{component_name}/{component_name}.component'
+
+class Route:
+    """One entry of the routes array"""
+
+    def __init__(self, text: str):
+        self.text = text.strip()
+        path = PATH_KEY.search(self.text)
+        self.path: Optional[str] = path.group(1) if path else None
+        component = COMPONENT_KEY.search(self.text)
+        lazy = LAZY_KEY.search(self.text)
+        self.component: Optional[str] = component.group(1) if component else (lazy.group(3) if lazy else None)
+        self.lazy = lazy is not None
+
+    @classmethod
+    def generated(cls, component_name: str, lazy: bool) -> 'Route':
+        class_name = component_class_name(component_name)
+        if lazy:
+            return cls(f"{{ path: '{component_name}', loadComponent: () => "
+                       f"import('{component_import_path(component_name)}').then(m => m.{class_name}) }}")
+        return cls(f"{{ path: '{component_name}', component: {class_name} }}")
+
+    def render(self) -> str:
+        # Multi-line entries keep their own inner layout, re-indented as a block
+        first, *rest = self.text.splitlines()
+        if not rest:
+            return f'  {first}'
+        return '\n'.join([f'  {first}'] + [f'  {line}' if line.strip() else ''
+                                           for line in textwrap.dedent('\n'.join(rest)).splitlines()])
+
+class RouteRegistry:
+    """In-memory model of app.routes.ts"""
+
+    def __init__(self, text: str):
+        self.original = text
+        declaration = ROUTES_DECLARATION.search(text)
+        if not declaration:
+            raise Exception('No "export const routes: Routes = [" declaration in routes file')
+
+        array_end = _matching_bracket(text, declaration.end() - 1)
+        head = text[:declaration.start()]
+        self.imports: List[str] = []  # import lines, in order
+        self.header: List[str] = []  # any other lines before the routes declaration
+        for line in head.splitlines():
+            if line.strip().startswith('import '):
+                self.imports.append(line.strip())
+            elif line.strip() or (self.header and self.header[-1].strip()):
+                self.header.append(line.rstrip())
+        self.routes: List[Route] = [Route(item) for item in _split_top_level(text[declaration.end():array_end])]
+        self.footer = text[array_end + 1:].lstrip()
+        if self.footer.startswith(';'):
+            self.footer = self.footer[1:]
+        self.footer = self.footer.strip()
+
+    @classmethod
+    def load(cls, path: Path) -> 'RouteRegistry':
+        return cls(Path(path).read_text(encoding='utf-8'))
+
+    @classmethod
+    @contextmanager
+    def transaction(cls, path: Path) -> Iterator['RouteRegistry']:
+        """Load, let the caller apply changes, and write once if anything changed"""
+        path = Path(path)
+        with _write_lock:
+            registry = cls.load(path)
+            yield registry
+            rendered = registry.render()
+            if rendered != registry.original:
+                atomic_write(path, rendered)
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+    def find(self, route_path: str) -> Optional[Route]:
+        return next((route for route in self.routes if route.path == route_path), None)
+
+    def add(self, component_name: str, lazy: bool = True) -> bool:
+        """Register a generated component at /component_name; False if it already is, in that form"""
+        existing = self.find(component_name)
+        class_name = component_class_name(component_name)
+        if existing and existing.component == class_name and existing.lazy == lazy:
+            return False
+
+        route = Route.generated(component_name, lazy)
+        if existing:
+            self.routes[self.routes.index(existing)] = route
+        else:
+            # Before the '**' wildcard, which must stay last
+            wildcard = next((i for i, entry in enumerate(self.routes) if entry.path == '**'), len(self.routes))
+            self.routes.insert(wildcard, route)
+
+        if not lazy:
+            self._ensure_import(class_name, component_import_path(component_name))
+        self._drop_unused_imports()
+        return True
+
+    def remove(self, component_name: str) -> bool:
+        """Remove the route(s) at /component_name and the component's now-unused import"""
+        class_name = component_class_name(component_name)
+        kept = [route for route in self.routes
+                if not (route.path == component_name and route.component == class_name)]
+        changed = len(kept) != len(self.routes)
+        self.routes = kept
+        return self._drop_unused_imports() or changed
+
+    def _ensure_import(self, class_name: str, import_path: str):
+        statement = f"import {{ {class_name} }} from '{import_path}';"
+        if statement not in self.imports:
+            self.imports.append(statement)
+
+    def _drop_unused_imports(self) -> bool:
+        """Remove component imports that no route references any more"""
+        # Lazy routes name their class inside import(), which needs no static import
+        used_text = '\n'.join([route.text for route in self.routes if not route.lazy] + self.header + [self.footer])
+        kept = []
+        for statement in self.imports:
+            match = IMPORT_LINE.match(statement)
+            if match and match.group(2).startswith('./components/'):
+                names = [name.strip() for name in match.group(1).split(',') if name.strip()]
+                if not any(re.search(rf'\b{name}\b', used_text) for name in names):
+                    continue
+            kept.append(statement)
+        changed = len(kept) != len(self.imports)
+        self.imports = kept
+        return changed
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+    def render(self) -> str:
+        parts = ['\n'.join(self.imports), '']
+        if self.header:
+            parts += ['\n'.join(self.header).strip(), '']
+        entries = ',\n'.join(route.render() for route in self.routes)
+        parts.append(f'export const routes: Routes = [\n{entries}\n];' if entries else 'export const routes: Routes = [];')
+        if self.footer:
+            parts += ['', self.footer]
+        return '\n'.join(parts) + '\n'
+
+    def summary(self) -> Dict[str, int]:
+        lazy = sum(1 for route in self.routes if route.lazy)
+        return {'routes': len(self.routes), 'lazy': lazy, 'eager': len(self.routes) - lazy}
+
+# ============================================================================
+# Scanning Helpers
+# ============================================================================
+def _skip_string_or_comment(text: str, i: int) -> int:
+    """Index after the string/comment starting at i, or i if there is none"""
+    char = text[i]
+    if char in '\'"`':
+        end = i + 1
+        while end < len(text) and text[end] != char:
+            end += 2 if text[end] == '\\' else 1
+        return end + 1
+    if text.startswith('//', i):
+        end = text.find('\n', i)
+        return len(text) if end == -1 else end
+    if text.startswith('/*', i):
+        end = text.find('*/', i + 2)
+        return len(text) if end == -1 else end + 2
+    return i
+
+def _matching_bracket(text: str, open_index: int) -> int:
+    depth = 0
+    i = open_index
+    while i < len(text):
+        skipped = _skip_string_or_comment(text, i)
+        if skipped != i:
+            i = skipped
+            continue
+        if text[i] in '[{(':
+            depth += 1
+        elif text[i] in ']})':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise Exception('Unbalanced brackets in routes file')
+
+def _split_top_level(body: str) -> List[str]:
+    """Split the routes array body at top-level commas"""
+    items: List[str] = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(body):
+        skipped = _skip_string_or_comment(body, i)
+        if skipped != i:
+            i = skipped
+            continue
+        char = body[i]
+        if char in '[{(':
+            depth += 1
+        elif char in ']})':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            items.append(body[start:i])
+            start = i + 1
+        i += 1
+    items.append(body[start:])
+    return [item for item in items if item.strip()]
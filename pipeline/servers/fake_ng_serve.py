@@ -0,0 +1,84 @@
+"""
+Fake `ng serve` for Testing the Dev Server Supervisor
+
+Prints the same build messages as the Angular CLI esbuild builder and
+serves a placeholder page, without Node or node_modules:
+  - "Application bundle generation complete. [..]" after the initial build
+  - "Changes detected. Rebuilding..." + the same message after each change
+    under --watch (checked every --poll seconds)
+
+Use it through the pipeline with:
+  PIPELINE_DEV_SERVER_CMD="python pipeline/servers/fake_ng_serve.py --port 4200 --watch src"
+
+Usage:
+  python pipeline/servers/fake_ng_serve.py [--port 4200] [--watch src] [--build-delay 0.3] [--poll 0.1]
+"""
+
+import argparse
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE = b'<!doctype html><html><body><app-root>fake ng serve</app-root></body></html>'
+
+class PageHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+def snapshot(root: str) -> dict:
+    """mtime and size of every file under root"""
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+def build(delay: float):
+    started = time.time()
+    time.sleep(delay)
+    print(f'Application bundle generation complete. [{time.time() - started:.3f} seconds]', flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in for the Angular dev server')
+    parser.add_argument('--port', type=int, default=4200)
+    parser.add_argument('--watch', default='src', help='Directory whose changes trigger a rebuild')
+    parser.add_argument('--build-delay', type=float, default=0.3)
+    parser.add_argument('--poll', type=float, default=0.1)
+    args = parser.parse_args()
+
+    print('Initial chunk files | Names | Raw size', flush=True)
+    build(args.build_delay)
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), PageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print('Watch mode enabled. Watching for file changes...', flush=True)
+    print(f'  Local:   http://localhost:{args.port}/', flush=True)
+
+    previous = snapshot(args.watch)
+    try:
+        while True:
+            time.sleep(args.poll)
+            current = snapshot(args.watch)
+            if current != previous:
+                previous = current
+                print('Changes detected. Rebuilding...', flush=True)
+                build(args.build_delay)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
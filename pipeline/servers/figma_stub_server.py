@@ -0,0 +1,152 @@
+"""
+Local Stand-In for the Figma REST API
+
+Serves recorded node documents so the pipeline (and the benchmark harness)
+can fetch designs without network access or a Figma token:
+  GET /v1/files/{key}?depth=1          - file name, version, lastModified, pages
+  GET /v1/files/{key}/nodes?ids=a,b    - node documents (any node of the fixture)
+
+A fixture is either a recorded /nodes response ({"version", "nodes": {...}})
+or a figma-exports/ cache entry ({"document", "version", ...}). Every node
+inside the recorded documents can be requested by id, not only the roots.
+
+Point the pipeline at it with:
+  FIGMA_API_BASE=http://localhost:8091
+
+Usage:
+  python pipeline/servers/figma_stub_server.py [--port 8091] [--latency 0.15]
+                                               [--fixture pipeline/servers/fixtures/figma-tracking-page.json]
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_FIXTURE = Path(__file__).parent / 'fixtures' / 'figma-tracking-page.json'
+
+class FigmaStubState:
+    """Fixture and settings shared by all request handlers"""
+    name = 'Figma stub'
+    version = '1'
+    last_modified = '2025-01-01T00:00:00Z'
+    roots: List[Dict] = []  # recorded top-level documents
+    nodes: Dict[str, Dict] = {}  # every node by API id ('1:2')
+    components: Dict[str, Dict] = {}
+    latency = 0.0  # seconds before each response
+    requests = 0
+    lock = threading.Lock()
+
+def walk(node: Dict) -> Iterator[Dict]:
+    yield node
+    for child in node.get('children', []):
+        yield from walk(child)
+
+def load_fixture(path: Path):
+    """Load a recorded /nodes response or figma-exports/ cache entry into FigmaStubState"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if 'nodes' in data:
+        entries = [entry for entry in data['nodes'].values() if entry]
+    else:
+        entries = [data]
+
+    FigmaStubState.name = data.get('name', Path(path).stem)
+    FigmaStubState.version = str(data.get('version') or FigmaStubState.version)
+    FigmaStubState.last_modified = data.get('lastModified') or FigmaStubState.last_modified
+    FigmaStubState.roots = [entry['document'] for entry in entries]
+    FigmaStubState.nodes = {node['id']: node for root in FigmaStubState.roots for node in walk(root)}
+    FigmaStubState.components = {}
+    for entry in entries:
+        FigmaStubState.components.update(entry.get('components') or {})
+
+class FigmaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with FigmaStubState.lock:
+            FigmaStubState.requests += 1
+        if FigmaStubState.latency:
+            time.sleep(FigmaStubState.latency)
+
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        query = parse_qs(url.query)
+        if not self.headers.get('X-Figma-Token'):
+            self._send_json(403, {'status': 403, 'err': 'Invalid token'})
+        elif len(parts) == 3 and parts[:2] == ['v1', 'files']:
+            self._send_file()
+        elif len(parts) == 4 and parts[:2] == ['v1', 'files'] and parts[3] == 'nodes':
+            ids = ','.join(query.get('ids', [])).split(',')
+            self._send_nodes([node_id for node_id in ids if node_id])
+        else:
+            self._send_json(404, {'status': 404, 'err': 'Not found'})
+
+    def _send_file(self):
+        """File metadata with the recorded roots as pages (no subtrees)"""
+        pages = [{key: value for key, value in root.items() if key != 'children'}
+                 for root in FigmaStubState.roots]
+        self._send_json(200, {
+            'name': FigmaStubState.name,
+            'version': FigmaStubState.version,
+            'lastModified': FigmaStubState.last_modified,
+            'document': {'id': '0:0', 'name': 'Document', 'type': 'DOCUMENT', 'children': pages}
+        })
+
+    def _send_nodes(self, ids: List[str]):
+        nodes = {}
+        for node_id in ids:
+            document = FigmaStubState.nodes.get(node_id)
+            nodes[node_id] = {'document': document, 'components': FigmaStubState.components,
+                              'styles': {}} if document else None
+        self._send_json(200, {
+            'name': FigmaStubState.name,
+            'version': FigmaStubState.version,
+            'lastModified': FigmaStubState.last_modified,
+            'nodes': nodes
+        })
+
+def start_stub_server(port: int = 0, fixture: Optional[Path] = None,
+                      latency: Optional[float] = None) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread and return the server (port 0 = any free port)"""
+    if fixture is not None or not FigmaStubState.nodes:
+        load_fixture(fixture or DEFAULT_FIXTURE)
+    if latency is not None:
+        FigmaStubState.latency = latency
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), FigmaStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Figma REST API stand-in')
+    parser.add_argument('--port', type=int, default=8091)
+    parser.add_argument('--latency', type=float, default=FigmaStubState.latency)
+    parser.add_argument('--fixture', type=Path, default=DEFAULT_FIXTURE,
+                        help='Recorded /nodes response or figma-exports/ cache entry')
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.fixture, args.latency)
+    print(f'Figma stub listening on http://localhost:{server.server_port} '
+          f'({len(FigmaStubState.nodes)} nodes, version {FigmaStubState.version})')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,203 @@
+"""
+Local Stand-In for IBM Cloud IAM and watsonx Chat
+
+Lets the Python pipeline run without network access. Serves:
+  POST /identity/token              - IAM token exchange
+  POST /ml/v1/text/chat             - chat completion (JSON)
+  POST /ml/v1/text/chat_stream      - chat completion (server-sent events)
+
+Point the pipeline at it with:
+  IBM_IAM_ENDPOINT=http://localhost:8090/identity/token
+  IBM_GRANITE_ENDPOINT=http://localhost:8090/ml/v1/text/chat?version=2023-05-29
+  IBM_GRANITE_STREAM_ENDPOINT=http://localhost:8090/ml/v1/text/chat_stream?version=2023-05-29
+
+Usage:
+  python pipeline/servers/granite_stub_server.py [--port 8090] [--chunk-delay 0.02] [--latency 0]
+                                                 [--iam-latency 0] [--response-file response.md]
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_RESPONSE = """Here is the component.
+
+```typescript
+import { Component } from '@angular/core';
+import { CommonModule } from '@angular/common';
+
+@Component({
+  selector: 'app-stub',
+  standalone: true,
+  imports: [CommonModule],
+  templateUrl: './stub.component.html',
+  styleUrls: ['./stub.component.scss']
+})
+export class StubComponent {
+  title = 'Track a Package';
+}
+```
+
+```html
+<div class="flex flex-col items-center gap-4 p-4 bg-ups-white">
+  <h1 class="text-ups-black font-roboto-bold">{{ title }}</h1>
+  <button class="bg-ups-gold rounded-full px-4 cursor-pointer" (click)="showDetails = !showDetails">Track</button>
+  <p *ngIf="showDetails" class="text-ups-grey-1">Enter up to 25 tracking numbers.</p>
+</div>
+```
+
+```scss
+/* Uses global UPS brand classes */
+```
+"""
+
+class StubState:
+    """Settings shared by all request handlers"""
+    response_text = DEFAULT_RESPONSE
+    chunk_size = 24
+    chunk_delay = 0.02
+    latency = 0.0  # seconds before the first byte of a chat response
+    iam_latency = 0.0  # seconds before the token response
+    drop_chats = 0  # chat requests to drop without a response after reading their body
+    tokens_issued = 0
+    revoked_tokens = set()  # bearer tokens that chat requests are rejected with 401 for
+    requests = 0
+    lock = threading.Lock()
+
+class GraniteStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self._read_body()
+        with StubState.lock:
+            StubState.requests += 1
+
+        path = self.path.split('?')[0]
+        if path != '/identity/token':
+            with StubState.lock:
+                drop, StubState.drop_chats = StubState.drop_chats > 0, max(0, StubState.drop_chats - 1)
+            if drop:
+                self.close_connection = True
+                return
+
+        delay = StubState.iam_latency if path == '/identity/token' else StubState.latency
+        if delay:
+            time.sleep(delay)
+
+        if path == '/identity/token':
+            now = int(time.time())
+            with StubState.lock:
+                StubState.tokens_issued += 1
+                token = f'stub-access-token-{StubState.tokens_issued}'
+            self._send_json(200, {
+                'access_token': token,
+                'token_type': 'Bearer',
+                'expires_in': 3600,
+                'expiration': now + 3600
+            })
+        elif self.headers.get('Authorization', '')[len('Bearer '):] in StubState.revoked_tokens:
+            self._send_json(401, {'error': 'Token expired or revoked'})
+        elif path == '/ml/v1/text/chat':
+            self._send_json(200, {
+                'model_id': 'ibm/granite-3-8b-instruct',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': StubState.response_text},
+                    'finish_reason': 'stop'
+                }],
+                'usage': usage_for(StubState.response_text)
+            })
+        elif path == '/ml/v1/text/chat_stream':
+            self._stream_chat()
+        else:
+            self._send_json(404, {'error': f'Unknown path {path}'})
+
+    def _stream_chat(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        text = StubState.response_text
+        chunks = [text[i:i + StubState.chunk_size] for i in range(0, len(text), StubState.chunk_size)]
+        for event_id, chunk in enumerate(chunks, start=1):
+            self._send_event(event_id, {
+                'choices': [{'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}]
+            })
+            if StubState.chunk_delay:
+                time.sleep(StubState.chunk_delay)
+
+        self._send_event(len(chunks) + 1, {
+            'choices': [{'index': 0, 'delta': {'content': ''}, 'finish_reason': 'stop'}],
+            'usage': usage_for(text)
+        })
+
+    def _send_event(self, event_id: int, payload: dict):
+        message = f'id: {event_id}\nevent: message\ndata: {json.dumps(payload)}\n\n'
+        self.wfile.write(message.encode('utf-8'))
+        self.wfile.flush()
+
+def usage_for(text: str) -> dict:
+    """Rough token usage, 4 characters per token"""
+    return {'prompt_tokens': 0, 'completion_tokens': len(text) // 4, 'total_tokens': len(text) // 4}
+
+def start_stub_server(port: int = 0, response_text: Optional[str] = None,
+                      chunk_delay: Optional[float] = None, latency: Optional[float] = None,
+                      iam_latency: Optional[float] = None) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread and return the server (port 0 = any free port)"""
+    if response_text is not None:
+        StubState.response_text = response_text
+    if chunk_delay is not None:
+        StubState.chunk_delay = chunk_delay
+    if latency is not None:
+        StubState.latency = latency
+    if iam_latency is not None:
+        StubState.iam_latency = iam_latency
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), GraniteStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local IBM IAM + watsonx chat stand-in')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--chunk-delay', type=float, default=StubState.chunk_delay)
+    parser.add_argument('--latency', type=float, default=StubState.latency,
+                        help='Seconds before a chat response starts')
+    parser.add_argument('--iam-latency', type=float, default=StubState.iam_latency,
+                        help='Seconds before a token response')
+    parser.add_argument('--response-file', help='Markdown file returned as the completion')
+    args = parser.parse_args()
+
+    response_text = None
+    if args.response_file:
+        with open(args.response_file, 'r', encoding='utf-8') as f:
+            response_text = f.read()
+
+    server = start_stub_server(args.port, response_text, args.chunk_delay, args.latency, args.iam_latency)
+    print(f'Granite stub listening on http://localhost:{server.server_port}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
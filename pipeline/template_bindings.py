@@ -0,0 +1,389 @@
+"""
+Template Binding Analysis for the TypeScript Auto-Fix
+
+Builds a symbol table of everything an Angular template reads, writes or
+calls on its component, in one pass over the template:
+- {{ interpolations }}, [property] / [attr.x] / [class.x] / [style.x] bindings
+- (event) handlers, [(ngModel)] two-way bindings
+- *ngIf / *ngFor / *ngSwitch microsyntax and @if / @for / @switch / @let blocks
+- pipes, loop variables and #template references (which are local)
+
+Together with an index of the members a TypeScript class already declares,
+inject_missing_members() adds typed stubs for only the members that are
+really missing.
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from template_classes import scan_template
+
+# Names that never refer to component members
+TEMPLATE_BUILTINS = {
+    'true', 'false', 'null', 'undefined', 'this', 'typeof', 'let', 'of', 'as', 'in',
+    'else', 'then', 'track',
+    '$event', '$any', '$index', '$count', '$first', '$last', '$even', '$odd', '$implicit',
+    'Math', 'JSON', 'Number', 'String', 'Boolean', 'Array', 'Object', 'Date', 'console'
+}
+
+TOKEN = re.compile(r'''
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`(?:[^`\\]|\\.)*`)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<ident>[A-Za-z_$][\w$]*)
+  | (?P<op>\?\.|\?\?|===|!==|==|!=|<=|>=|&&|\|\||=>|[-+*/%!<>=?:.,;|()\[\]{}])
+''', re.VERBOSE)
+
+INTERPOLATION = re.compile(r'\{\{(.*?)\}\}', re.DOTALL)
+CONTROL_BLOCK = re.compile(r'@(if|else\s+if|for|switch|case|defer)\s*\(([^()]*(?:\([^()]*\)[^()]*)*)\)')
+LET_BLOCK = re.compile(r'@let\s+([A-Za-z_$][\w$]*)\s*=\s*([^;]*);')
+
+TYPE_STUBS = {
+    'boolean': ('boolean', 'false'),
+    'array': ('any[]', '[]'),
+    'number': ('number', '0'),
+    'string': ('string', "''"),
+}
+HINT_PRIORITY = {'any': 0, 'string': 1, 'number': 2, 'boolean': 3, 'array': 4}
+
+class TemplateSymbols:
+    """Symbol table of one template"""
+
+    def __init__(self):
+        self.properties: Dict[str, str] = {}  # name -> type hint
+        self.methods: Dict[str, str] = {}  # name -> 'event' or 'value'
+        self.locals: Set[str] = set()  # loop variables, aliases, @let
+        self.template_refs: Set[str] = set()
+        self.pipes: Set[str] = set()
+
+    def add_property(self, name: str, hint: str):
+        current = self.properties.get(name)
+        if current is None or HINT_PRIORITY[hint] > HINT_PRIORITY[current]:
+            self.properties[name] = hint
+
+    def add_method(self, name: str, context: str):
+        if self.methods.get(name) != 'value':
+            self.methods[name] = context
+
+    def component_members(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Properties and methods that must exist on the component class"""
+        hidden = self.locals | self.template_refs | TEMPLATE_BUILTINS
+        properties = {name: hint for name, hint in self.properties.items()
+                      if name not in hidden and name not in self.methods}
+        methods = {name: context for name, context in self.methods.items() if name not in hidden}
+        return properties, methods
+
+# ============================================================================
+# Template Analyzer
+# ============================================================================
+def analyze_template(html: str) -> TemplateSymbols:
+    """Collect every component member the template references"""
+    symbols = TemplateSymbols()
+    pending: List[Tuple[str, str, str]] = []  # (expression, hint, context) analyzed after locals are known
+
+    for event in scan_template(html):
+        if event[0] == 'text':
+            _scan_text(event[1], symbols, pending)
+        else:
+            _scan_attribute(event[1], event[3], symbols, pending)
+
+    for expression, hint, context in pending:
+        _analyze_expression(expression, hint, context, symbols)
+    return symbols
+
+def _scan_text(text: str, symbols: TemplateSymbols, pending: List):
+    for match in INTERPOLATION.finditer(text):
+        pending.append((match.group(1), 'string', 'value'))
+
+    for match in CONTROL_BLOCK.finditer(text):
+        keyword, expression = match.group(1), match.group(2)
+        if keyword == 'for':
+            _scan_for_block(expression, symbols, pending)
+        elif keyword.endswith('if'):
+            condition, _, alias = expression.partition(';')
+            alias_match = re.search(r'as\s+([A-Za-z_$][\w$]*)', alias)
+            if alias_match:
+                symbols.locals.add(alias_match.group(1))
+            pending.append((condition, 'any' if alias_match else 'boolean', 'value'))
+        else:
+            pending.append((expression, 'any', 'value'))
+
+    for match in LET_BLOCK.finditer(text):
+        symbols.locals.add(match.group(1))
+        pending.append((match.group(2), 'any', 'value'))
+
+def _scan_for_block(expression: str, symbols: TemplateSymbols, pending: List):
+    """@for (item of items; track item.id; let i = $index)"""
+    parts = [part.strip() for part in expression.split(';')]
+    head = re.match(r'([A-Za-z_$][\w$]*)\s+of\s+(.*)', parts[0], re.DOTALL)
+    if head:
+        symbols.locals.add(head.group(1))
+        pending.append((head.group(2), 'array', 'value'))
+    for part in parts[1:]:
+        for alias in re.findall(r'(?:let\s+)?([A-Za-z_$][\w$]*)\s*=\s*\$\w+', part):
+            symbols.locals.add(alias)
+        if part.startswith('track '):
+            pending.append((part[len('track '):], 'any', 'value'))
+
+def _scan_attribute(name: str, value: Optional[str], symbols: TemplateSymbols, pending: List):
+    if name.startswith('#') or name.startswith('ref-'):
+        symbols.template_refs.add(name.lstrip('#')[4 if name.startswith('ref-') else 0:])
+        return
+    if name.startswith('let-'):
+        # <ng-template let-row let-i="index">: context variables, not component members
+        symbols.locals.add(name[len('let-'):])
+        return
+    if value is None:
+        return
+
+    if name == '*ngFor':
+        _scan_ng_for(value, symbols, pending)
+    elif name == '*ngIf':
+        _scan_ng_if(value, symbols, pending)
+    elif name.startswith('*'):
+        pending.append((value, 'any', 'value'))
+    elif name.startswith('[(') and name.endswith(')]'):
+        # Two-way binding writes to a plain property
+        hint = 'string' if name == '[(ngModel)]' else 'any'
+        pending.append((value, hint, 'value'))
+    elif name.startswith('(') and name.endswith(')'):
+        pending.append((value, 'any', 'event'))
+    elif name.startswith('['):
+        hint = 'boolean' if name.startswith('[class.') or name in ('[disabled]', '[hidden]', '[checked]') else 'any'
+        pending.append((value, hint, 'value'))
+    elif '{{' in value:
+        for match in INTERPOLATION.finditer(value):
+            pending.append((match.group(1), 'string', 'value'))
+
+def _scan_ng_for(value: str, symbols: TemplateSymbols, pending: List):
+    """*ngFor="let item of items; let i = index; trackBy: trackById" """
+    for clause in value.split(';'):
+        clause = clause.strip()
+        of_match = re.match(r'let\s+([A-Za-z_$][\w$]*)\s+of\s+(.*)', clause, re.DOTALL)
+        if of_match:
+            symbols.locals.add(of_match.group(1))
+            pending.append((of_match.group(2), 'array', 'value'))
+            continue
+        for alias in re.findall(r'let\s+([A-Za-z_$][\w$]*)\s*=', clause):
+            symbols.locals.add(alias)
+        for alias in re.findall(r'\bas\s+([A-Za-z_$][\w$]*)', clause):
+            symbols.locals.add(alias)
+        track_match = re.match(r'trackBy\s*:\s*([A-Za-z_$][\w$]*)', clause)
+        if track_match:
+            symbols.add_method(track_match.group(1), 'value')
+
+def _scan_ng_if(value: str, symbols: TemplateSymbols, pending: List):
+    """*ngIf="cond as alias; else elseTemplate" """
+    condition, *clauses = value.split(';')
+    alias_match = re.search(r'\bas\s+([A-Za-z_$][\w$]*)\s*$', condition)
+    hint = 'boolean'
+    if alias_match:
+        # "obj as alias" unwraps a value, so it is not a plain flag
+        symbols.locals.add(alias_match.group(1))
+        condition = condition[:alias_match.start()]
+        hint = 'any'
+    for clause in clauses:
+        for ref in re.findall(r'(?:else|then)\s*:?\s*([A-Za-z_$][\w$]*)', clause):
+            symbols.template_refs.add(ref)
+    pending.append((condition, hint, 'value'))
+
+# ============================================================================
+# Expression Analyzer
+# ============================================================================
+def _analyze_expression(expression: str, hint: str, context: str, symbols: TemplateSymbols):
+    """Record the root identifiers of an expression or event statement
+
+    hint is the type implied by where the expression appears; it only
+    applies to a bare identifier (e.g. *ngIf="open").
+    """
+    tokens = [(match.lastgroup, match.group()) for match in TOKEN.finditer(expression)]
+    bare = len(tokens) == 1 and tokens[0][0] == 'ident'
+    brace_keys = []  # per open brace: True while expecting an object key
+
+    for index, (kind, text) in enumerate(tokens):
+        previous = tokens[index - 1][1] if index else ''
+        following = tokens[index + 1][1] if index + 1 < len(tokens) else ''
+
+        if kind == 'op':
+            if text == '{':
+                brace_keys.append(True)
+            elif text == '}' and brace_keys:
+                brace_keys.pop()
+            elif text == ',' and brace_keys:
+                brace_keys[-1] = True
+            elif brace_keys:
+                brace_keys[-1] = False
+            continue
+        if kind != 'ident':
+            if brace_keys:
+                brace_keys[-1] = False
+            continue
+
+        if brace_keys and brace_keys[-1] and following == ':':
+            brace_keys[-1] = False
+            continue  # object literal key
+        if brace_keys:
+            brace_keys[-1] = False
+
+        if previous in ('.', '?.'):
+            # Member access; this.x still refers to the component
+            if index < 2 or tokens[index - 2][1] != 'this':
+                continue
+        if previous == '|':
+            symbols.pipes.add(text)
+            continue
+        if text in TEMPLATE_BUILTINS:
+            continue
+
+        if following == '(':
+            symbols.add_method(text, context)
+        elif following == '=':
+            symbols.add_property(text, _assigned_type(tokens[index + 2:]))
+        elif previous == '!':
+            symbols.add_property(text, 'boolean')
+        elif following in ('.', '?.', '['):
+            symbols.add_property(text, 'any')
+        elif bare:
+            symbols.add_property(text, hint)
+        else:
+            symbols.add_property(text, 'any')
+
+def _assigned_type(rest: List[Tuple[str, str]]) -> str:
+    """Type hint for the value assigned in 'x = ...'"""
+    if not rest:
+        return 'any'
+    kind, text = rest[0]
+    if text == '!' or text in ('true', 'false'):
+        return 'boolean'
+    if kind == 'number':
+        return 'number'
+    if kind == 'string':
+        return 'string'
+    if text == '[':
+        return 'array'
+    return 'any'
+
+# ============================================================================
+# TypeScript Class Member Index
+# ============================================================================
+MEMBER_MODIFIERS = {'public', 'private', 'protected', 'readonly', 'static', 'override',
+                    'async', 'get', 'set', 'declare', 'abstract', 'accessor'}
+CLASS_DECLARATION = re.compile(r'export\s+class\s+\w+[^{]*\{')
+MEMBER_NAME = re.compile(r'(?:@\w+(?:\([^)]*\))?\s*)*((?:\w+\s+)*)\*?\s*([A-Za-z_$#][\w$]*)\s*[?!]?\s*([:=(<;])')
+
+class ClassIndex(NamedTuple):
+    body_start: int  # offset just after the class '{'
+    body_end: int  # offset of the closing '}'
+    members: Set[str]
+
+def index_class_members(typescript: str) -> Optional[ClassIndex]:
+    """Members declared by the first exported class, including constructor parameter properties"""
+    declaration = CLASS_DECLARATION.search(typescript)
+    if not declaration:
+        return None
+
+    members = set()
+    depth = 1
+    statement_start = declaration.end()
+    i = declaration.end()
+    length = len(typescript)
+
+    while i < length and depth:
+        char = typescript[i]
+        if typescript.startswith('//', i):
+            end = typescript.find('\n', i)
+            i = length if end == -1 else end
+            continue
+        if typescript.startswith('/*', i):
+            end = typescript.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if char in '\'"`':
+            end = i + 1
+            while end < length and typescript[end] != char:
+                end += 2 if typescript[end] == '\\' else 1
+            i = end + 1
+            continue
+
+        if depth == 1 and statement_start is not None and not char.isspace():
+            _index_member(typescript, i, members)
+            statement_start = None
+
+        if char in '{([':
+            depth += 1
+        elif char in '})]':
+            depth -= 1
+            if depth == 1 and char == '}':
+                statement_start = i + 1
+        elif char == ';' and depth == 1:
+            statement_start = i + 1
+        i += 1
+
+    return ClassIndex(declaration.end(), i - 1, members)
+
+def _index_member(typescript: str, start: int, members: Set[str]):
+    match = MEMBER_NAME.match(typescript, start)
+    if not match:
+        return
+    modifiers = set(match.group(1).split())
+    name = match.group(2)
+    if name in MEMBER_MODIFIERS and match.group(3) != '(':
+        return
+    if modifiers - MEMBER_MODIFIERS:
+        return
+    members.add(name)
+
+    if name == 'constructor':
+        params_end = _matching_paren(typescript, match.end() - 1)
+        params = typescript[match.end():params_end]
+        for param in re.finditer(r'(?:public|private|protected|readonly)\s+(?:readonly\s+)?([A-Za-z_$][\w$]*)', params):
+            members.add(param.group(1))
+
+def _matching_paren(text: str, open_index: int) -> int:
+    depth = 0
+    for index in range(open_index, len(text)):
+        if text[index] == '(':
+            depth += 1
+        elif text[index] == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(text)
+
+# ============================================================================
+# Stub Injection
+# ============================================================================
+def inject_missing_members(typescript: str, html: str) -> Tuple[str, List[str]]:
+    """Add typed stubs for template members the class does not declare
+
+    Returns the (possibly unchanged) TypeScript and the names that were added.
+    """
+    class_index = index_class_members(typescript)
+    if class_index is None:
+        return typescript, []
+
+    properties, methods = analyze_template(html).component_members()
+    declared = class_index.members | {'constructor'}
+
+    stubs = []
+    added = []
+    for name in sorted(properties):
+        if name in declared:
+            continue
+        type_name, default = TYPE_STUBS.get(properties[name], ('any', None))
+        stubs.append(f'  {name}: {type_name} = {default};' if default else f'  {name}: any;')
+        added.append(name)
+    for name in sorted(methods):
+        if name in declared:
+            continue
+        if methods[name] == 'event':
+            stubs.append(f'  {name}(...args: any[]): void {{}}')
+        else:
+            stubs.append(f'  {name}(...args: any[]): any {{\n    return null;\n  }}')
+        added.append(name)
+
+    if not stubs:
+        return typescript, []
+
+    insertion_point = class_index.body_start
+    fixed = typescript[:insertion_point] + '\n' + '\n'.join(stubs) + '\n' + typescript[insertion_point:]
+    return fixed, added
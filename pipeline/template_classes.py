@@ -0,0 +1,350 @@
+"""
+Angular Template Class Extraction and Audit
+
+A single-pass tokenizer finds every CSS class an Angular template uses,
+with its line and column:
+- class="a b", class='a b' and unquoted class=a
+- [class.name]="condition"
+- [class]="'a b'", [className], [attr.class] and [ngClass] expressions
+  (string literals, array items and object-literal keys)
+
+The audit walks a components directory, checks every template (including
+inline `template:` strings in .ts files) against the approved classes and
+skips files whose content hash has not changed since the last audit.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from brand_catalog import BrandCatalog
+from publisher import atomic_write
+
+class ClassUsage(NamedTuple):
+    name: str
+    line: int  # 1-based
+    column: int  # 1-based
+    source: str  # attribute the class came from
+
+EXPRESSION_ATTRIBUTES = {'[class]', '[classname]', '[attr.class]', '[ngclass]'}
+ATTRIBUTE_NAME = re.compile(r'[^\s=>/"\']+')
+INTERPOLATION = re.compile(r'\{\{.*?\}\}', re.DOTALL)
+INLINE_TEMPLATE = re.compile(r'template\s*:\s*`')
+INLINE_STYLES = re.compile(r'styles\s*:\s*\[?\s*`')
+COMPARISON_TAIL = re.compile(r'(?:===?|!==?|[<>]=?|\()\s*$')
+AUDIT_VERSION = 2  # bump when extraction rules change so cached results are rechecked
+
+# ============================================================================
+# Template Tokenizer
+# ============================================================================
+class _Positions:
+    """Offset -> (line, column) in O(log n)"""
+
+    def __init__(self, text: str, line_offset: int = 0, first_column: int = 0):
+        self.line_starts = [0] + [match.end() for match in re.finditer('\n', text)]
+        self.line_offset = line_offset
+        self.first_column = first_column
+
+    def __call__(self, offset: int) -> Tuple[int, int]:
+        line = bisect.bisect_right(self.line_starts, offset) - 1
+        column = offset - self.line_starts[line] + 1
+        if line == 0:
+            column += self.first_column
+        return line + 1 + self.line_offset, column
+
+def scan_template(html: str) -> Iterator[Tuple]:
+    """Single pass over a template
+    
+    Yields ('attr', name, name_start, value, value_start) for every attribute
+    (value is None for bare attributes) and ('text', text, start) for the
+    text between tags. Comments are skipped.
+    """
+    length = len(html)
+    i = 0
+    text_start = 0
+
+    while i < length:
+        tag_start = html.find('<', i)
+        if tag_start == -1:
+            break
+
+        # {{ a<b }} is an expression, not a tag
+        interpolation = html.find('{{', i, tag_start)
+        if interpolation != -1:
+            close = html.find('}}', interpolation + 2)
+            i = length if close == -1 else close + 2
+            continue
+
+        if html.startswith('<!--', tag_start):
+            if tag_start > text_start:
+                yield ('text', html[text_start:tag_start], text_start)
+            comment_end = html.find('-->', tag_start + 4)
+            i = text_start = length if comment_end == -1 else comment_end + 3
+            continue
+
+        i = tag_start + 1
+        if i >= length or not (html[i].isalpha() or html[i] == '/'):
+            continue  # doctype or a stray '<' inside text
+        if tag_start > text_start:
+            yield ('text', html[text_start:tag_start], text_start)
+
+        # Tag name
+        while i < length and not html[i].isspace() and html[i] not in '/>':
+            i += 1
+        if html[tag_start + 1] == '/':
+            close = html.find('>', i)
+            i = text_start = length if close == -1 else close + 1
+            continue
+
+        # Attributes
+        while i < length:
+            while i < length and (html[i].isspace() or html[i] == '/'):
+                i += 1
+            if i >= length or html[i] == '>':
+                i += 1
+                break
+
+            name_match = ATTRIBUTE_NAME.match(html, i)
+            if not name_match:
+                i += 1
+                continue
+            name = name_match.group(0)
+            i = name_match.end()
+
+            while i < length and html[i].isspace():
+                i += 1
+            value, value_start = None, i
+            if i < length and html[i] == '=':
+                i += 1
+                while i < length and html[i].isspace():
+                    i += 1
+                if i < length and html[i] in '"\'':
+                    quote = html[i]
+                    value_end = html.find(quote, i + 1)
+                    value_end = length if value_end == -1 else value_end
+                    value, value_start = html[i + 1:value_end], i + 1
+                    i = value_end + 1
+                else:
+                    value_end = i
+                    while value_end < length and not html[value_end].isspace() and html[value_end] != '>':
+                        value_end += 1
+                    value, value_start = html[i:value_end], i
+                    i = value_end
+
+            yield ('attr', name, name_match.start(), value, value_start)
+        text_start = i
+
+    if text_start < length:
+        yield ('text', html[text_start:], text_start)
+
+def extract_class_usages(html: str, line_offset: int = 0, first_column: int = 0) -> List[ClassUsage]:
+    """Every class used in a template, in document order"""
+    position = _Positions(html, line_offset, first_column)
+    usages: List[ClassUsage] = []
+    for event in scan_template(html):
+        if event[0] == 'attr':
+            _collect(*event[1:], position, usages)
+    return usages
+
+def _collect(name: str, name_start: int, value: Optional[str], value_start: int,
+             position, usages: List[ClassUsage]):
+    lowered = name.lower()
+
+    if lowered == 'class' and value:
+        # Static classes; {{ }} interpolations are dynamic and skipped
+        static = INTERPOLATION.sub(lambda match: ' ' * len(match.group(0)), value)
+        for match in re.finditer(r'\S+', static):
+            usages.append(ClassUsage(match.group(0), *position(value_start + match.start()), 'class'))
+
+    elif lowered.startswith('[class.') and lowered.endswith(']'):
+        class_name = name[len('[class.'):-1]
+        usages.append(ClassUsage(class_name, *position(name_start + len('[class.')), name))
+
+    elif lowered in EXPRESSION_ATTRIBUTES and value:
+        for class_name, offset in _expression_classes(value):
+            usages.append(ClassUsage(class_name, *position(value_start + offset), name))
+
+def _expression_classes(expression: str) -> Iterable[Tuple[str, int]]:
+    """Class names in a binding expression: string literals and object keys
+
+    Strings used as object values or compared against (x === 'a') are
+    conditions, not classes, and are skipped.
+    """
+    length = len(expression)
+    i = 0
+    brace_depth = 0
+    expect_key = False  # directly after '{' or ',' inside an object literal
+
+    while i < length:
+        char = expression[i]
+        if char in '\'"`':
+            end = i + 1
+            while end < length and expression[end] != char:
+                end += 2 if expression[end] == '\\' else 1
+            literal = expression[i + 1:end]
+            is_value = brace_depth > 0 and not expect_key
+            if not is_value and not COMPARISON_TAIL.search(expression[:i]):
+                tokens = list(re.finditer(r'\S+', literal))
+                # 'text-line-' + i builds a class at runtime; skip the partial token
+                if tokens and not literal[-1].isspace() and expression[end + 1:].lstrip().startswith('+'):
+                    tokens.pop()
+                if tokens and not literal[0].isspace() and expression[:i].rstrip().endswith('+'):
+                    tokens.pop(0)
+                for match in tokens:
+                    yield match.group(0), i + 1 + match.start()
+            expect_key = False
+            i = end + 1
+            continue
+
+        if char == '{':
+            brace_depth += 1
+            expect_key = True
+        elif char == '}':
+            brace_depth = max(0, brace_depth - 1)
+            expect_key = False
+        elif char == ',' and brace_depth:
+            expect_key = True
+        elif char == ':' and brace_depth:
+            expect_key = False
+        elif expect_key and (char.isalpha() or char in '_$-'):
+            match = re.match(r'[\w$-]+', expression[i:])
+            key = match.group(0)
+            if expression[i + len(key):].lstrip().startswith(':'):
+                yield key, i
+            expect_key = False
+            i += len(key)
+            continue
+        elif not char.isspace():
+            expect_key = False
+        i += 1
+
+# ============================================================================
+# Component Audit
+# ============================================================================
+def template_sources(path: Path, content: str) -> List[Tuple[str, int, int]]:
+    """(template, line_offset, first_column) pairs for a .html or .ts file"""
+    if path.suffix == '.html':
+        return [(content, 0, 0)]
+
+    sources = []
+    for match in INLINE_TEMPLATE.finditer(content):
+        end = content.find('`', match.end())
+        if end == -1:
+            continue
+        before = content[:match.end()]
+        line_offset = before.count('\n')
+        first_column = match.end() - (before.rfind('\n') + 1)
+        sources.append((content[match.end():end], line_offset, first_column))
+    return sources
+
+def local_stylesheet_classes(path: Path, content: str) -> Tuple[frozenset, str]:
+    """Classes the component defines itself, plus a hash of those stylesheets"""
+    styles = []
+    stem = path.name.split('.')[0]
+    for extension in ('css', 'scss'):
+        stylesheet = path.parent / f'{stem}.component.{extension}'
+        if stylesheet.is_file():
+            styles.append(stylesheet.read_text(encoding='utf-8'))
+    if path.suffix == '.ts':
+        for match in INLINE_STYLES.finditer(content):
+            end = content.find('`', match.end())
+            if end != -1:
+                styles.append(content[match.end():end])
+
+    joined = '\n'.join(styles)
+    digest = hashlib.sha256(joined.encode('utf-8')).hexdigest()
+    return (BrandCatalog.from_scss(joined).classes if joined else frozenset()), digest
+
+_worker_approved: frozenset = frozenset()
+
+def _init_worker(approved: frozenset):
+    global _worker_approved
+    _worker_approved = approved
+
+def audit_template_file(path: str, content: str, local_classes: frozenset,
+                        approved: Optional[frozenset] = None) -> List[Dict]:
+    """Violations in one file as dicts (picklable for the process pool)"""
+    approved = _worker_approved if approved is None else approved
+    violations = []
+    for template, line_offset, first_column in template_sources(Path(path), content):
+        for usage in extract_class_usages(template, line_offset, first_column):
+            if usage.name not in approved and usage.name not in local_classes:
+                violations.append(usage._asdict())
+    return violations
+
+def _audit_task(args: Tuple[str, str, frozenset]) -> List[Dict]:
+    return audit_template_file(*args)
+
+def audit_components(component_dir: Path, catalog: BrandCatalog, cache_path: Optional[Path] = None,
+                     workers: Optional[int] = None, pool_threshold: int = 8) -> List[Dict]:
+    """Audit every template under component_dir
+
+    Returns one {'path', 'violations', 'cached'} dict per template file.
+    Unchanged files (same template, stylesheet and brand catalog hash) reuse
+    the previous result; changed files are spread over a process pool when
+    there are at least pool_threshold of them.
+    """
+    component_dir = Path(component_dir)
+    cache = _read_audit_cache(cache_path)
+    results: Dict[str, Dict] = {}
+    tasks = []
+    task_hashes = {}
+
+    for path in sorted(component_dir.rglob('*')):
+        if path.suffix not in ('.html', '.ts') or not path.is_file():
+            continue
+        content = path.read_text(encoding='utf-8')
+        if path.suffix == '.ts' and not INLINE_TEMPLATE.search(content):
+            continue
+
+        local_classes, styles_hash = local_stylesheet_classes(path, content)
+        digest = hashlib.sha256(
+            f'{AUDIT_VERSION}\0{catalog.source_hash}\0{styles_hash}\0{content}'.encode('utf-8')
+        ).hexdigest()
+        relative = path.relative_to(component_dir).as_posix()
+
+        previous = cache.get(relative)
+        if previous and previous.get('hash') == digest:
+            results[relative] = {'path': relative, 'violations': previous['violations'], 'cached': True}
+            continue
+
+        tasks.append((str(path), content, local_classes))
+        task_hashes[str(path)] = (relative, digest)
+
+    if len(tasks) >= pool_threshold:
+        workers = workers or min(len(tasks), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(catalog.classes,)) as executor:
+            outcomes = list(executor.map(_audit_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        outcomes = [audit_template_file(*task, approved=catalog.classes) for task in tasks]
+
+    for task, violations in zip(tasks, outcomes):
+        relative, digest = task_hashes[task[0]]
+        results[relative] = {'path': relative, 'violations': violations, 'cached': False}
+        cache[relative] = {'hash': digest, 'violations': violations}
+
+    # Drop cache entries for deleted files
+    pruned = [relative for relative in cache if relative not in results]
+    for relative in pruned:
+        del cache[relative]
+    if cache_path and (tasks or pruned):
+        _write_audit_cache(cache_path, cache)
+
+    return [results[relative] for relative in sorted(results)]
+
+def _read_audit_cache(cache_path: Optional[Path]) -> Dict[str, Dict]:
+    if not cache_path:
+        return {}
+    try:
+        return json.loads(Path(cache_path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+def _write_audit_cache(cache_path: Path, cache: Dict[str, Dict]):
+    atomic_write(cache_path, json.dumps(cache))
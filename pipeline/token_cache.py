@@ -0,0 +1,96 @@
+"""
+IBM Cloud IAM Token Cache
+
+IAM access tokens are valid for an hour, but the pipeline used to exchange
+the API key for a new one on every run (and every regeneration). TokenCache
+keeps the current token in memory for all threads and tasks, persists it
+(owner-readable only) so the next run can reuse it, and refreshes it a few
+minutes before it expires. Concurrent callers share a single refresh.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from publisher import atomic_write
+
+class TokenCache:
+    """Expiry-aware cache for one bearer token
+
+    fetch() must return the IAM response ({'access_token', 'expiration' or
+    'expires_in'}). owner identifies the credential (e.g. the API key); it is
+    stored only as a hash so a changed key never reuses an old token.
+    """
+
+    def __init__(self, fetch: Callable[[], Dict], owner: str = '', path: Optional[Path] = None,
+                 refresh_margin: float = 300):
+        self.fetch = fetch
+        self.owner_hash = hashlib.sha256(owner.encode('utf-8')).hexdigest()[:16]
+        self.path = Path(path) if path else None
+        self.refresh_margin = refresh_margin
+        self.lock = threading.Lock()
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.fetches = 0
+        self.reuses = 0
+        self._load()
+
+    def valid(self) -> bool:
+        return bool(self.token) and time.time() < self.expires_at - self.refresh_margin
+
+    def seconds_left(self) -> float:
+        return max(0.0, self.expires_at - time.time())
+
+    def get(self) -> str:
+        """Current token, fetching a new one only when missing or about to expire"""
+        with self.lock:
+            if self.valid():
+                self.reuses += 1
+                return self.token
+
+            data = self.fetch()
+            self.fetches += 1
+            self.token = data['access_token']
+            if data.get('expiration'):
+                self.expires_at = float(data['expiration'])
+            else:
+                self.expires_at = time.time() + float(data.get('expires_in', 3600))
+            self._save()
+            return self.token
+
+    def invalidate(self, token: Optional[str] = None):
+        """Forget the token, e.g. after the API answered 401
+
+        With token given, only that token is forgotten: callers that were
+        rejected with an already replaced token do not drop the new one.
+        """
+        with self.lock:
+            if token is not None and token != self.token:
+                return
+            self.token = None
+            self.expires_at = 0.0
+            if self.path:
+                try:
+                    self.path.unlink()
+                except OSError:
+                    pass
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            cached = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if cached.get('owner') == self.owner_hash:
+            self.token = cached.get('access_token')
+            self.expires_at = float(cached.get('expires_at', 0))
+
+    def _save(self):
+        if not self.path:
+            return
+        atomic_write(self.path, json.dumps({'owner': self.owner_hash, 'access_token': self.token,
+                                            'expires_at': self.expires_at}), mode=0o600)
@@ -0,0 +1,204 @@
+"""
+Pipeline Tracing
+
+Every pipeline step runs inside a span that records its wall time plus
+counters: bytes in/out, prompt/completion tokens, cache hits and retries.
+Spans nest per thread and asyncio task (context variables), so a batch
+run shows which component each Figma fetch or Granite call belonged to.
+
+Tracing is off unless enabled (--profile); a disabled tracer hands out a
+shared no-op span, so instrumented code costs nothing in normal runs.
+
+Output:
+  - JSON lines, one span per line
+  - Chrome trace (open in chrome://tracing or https://ui.perfetto.dev)
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+COUNTERS = ('bytes_in', 'bytes_out', 'prompt_tokens', 'completion_tokens', 'cache_hits', 'retries')
+
+class Span:
+    """One timed step; attrs holds counters and free-form details"""
+
+    def __init__(self, span_id: int, name: str, category: str, parent_id: Optional[int], attrs: Dict):
+        self.span_id = span_id
+        self.name = name
+        self.category = category
+        self.parent_id = parent_id
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attrs = dict(attrs)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, counter: str, amount: float = 1):
+        self.attrs[counter] = self.attrs.get(counter, 0) + amount
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_json(self, origin: float) -> Dict:
+        return {
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'cat': self.category,
+            'thread': self.thread_name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3),
+            **self.attrs
+        }
+
+class _NullSpan:
+    """Stand-in while tracing is disabled"""
+    attrs: Dict = {}
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, counter: str, amount: float = 1):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.spans: List[Span] = []
+        self.origin = time.perf_counter()
+        self.origin_wall = time.time()
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._current: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+    def enable(self):
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.origin_wall = time.time()
+
+    def clear(self) -> List['Span']:
+        """Drop and return the finished spans (e.g. between benchmark scenarios)"""
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+    @contextmanager
+    def span(self, name: str, category: str = 'stage', **attrs) -> Iterator:
+        if not self.enabled:
+            yield NULL_SPAN
+            return
+
+        parent = self._current.get()
+        with self._lock:
+            span = Span(self._next_id, name, category, parent.span_id if parent else None, attrs)
+            self._next_id += 1
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            self._current.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def current(self):
+        """Innermost open span of this thread/task (a no-op span when there is none)"""
+        return self._current.get() or NULL_SPAN
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def finished_spans(self) -> List[Span]:
+        with self._lock:
+            return sorted(self.spans, key=lambda span: span.start)
+
+    def write_jsonl(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in self.finished_spans():
+                f.write(json.dumps(span.to_json(self.origin)) + '\n')
+
+    def write_chrome_trace(self, path: Path):
+        """Trace Event Format: complete ('X') events in microseconds"""
+        pid = os.getpid()
+        events = []
+        thread_names = {}
+        for span in self.finished_spans():
+            thread_names[span.thread_id] = span.thread_name
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6, 1),
+                'dur': round(span.duration * 1e6, 1),
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': span.attrs
+            })
+        for thread_id, thread_name in thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                           'args': {'name': thread_name}})
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'started_at': self.origin_wall}
+        }), encoding='utf-8')
+
+    def summary(self) -> List[Dict]:
+        """Per span name: count, total/max seconds and summed counters, slowest first"""
+        rows: Dict[str, Dict] = {}
+        for span in self.finished_spans():
+            row = rows.setdefault(span.name, {'name': span.name, 'category': span.category,
+                                              'count': 0, 'total': 0.0, 'max': 0.0})
+            row['count'] += 1
+            row['total'] += span.duration
+            row['max'] = max(row['max'], span.duration)
+            for counter in COUNTERS:
+                if isinstance(span.attrs.get(counter), (int, float)):
+                    row[counter] = row.get(counter, 0) + span.attrs[counter]
+        return sorted(rows.values(), key=lambda row: row['total'], reverse=True)
+
+TRACER = Tracer()
+
+def span(name: str, category: str = 'stage', **attrs):
+    """Context manager for a span on the shared tracer"""
+    return TRACER.span(name, category, **attrs)
+
+def current_span():
+    return TRACER.current()
+
+def submit_in_context(executor, func: Callable, *args):
+    """executor.submit that keeps the caller's current span as the parent"""
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+def traced(name: str, category: str = 'stage') -> Callable:
+    """Decorator: run the function inside a span"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with TRACER.span(name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
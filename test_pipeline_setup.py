@@ -77,9 +77,14 @@ for folder in required_folders:
 print("\n✓ Test 6: UPS Brand CSS")
 css_path = base_dir / "pipeline" / "brand-css" / "ups-brand.scss"
 if css_path.exists():
-    content = css_path.read_text(encoding='utf-8')
-    class_count = len(set(re.findall(r'\.([a-zA-Z0-9_-]+)', content)))
-    print(f"  ✅ Found: {class_count} CSS classes")
+    sys.path.insert(0, str(base_dir / "pipeline"))
+    from brand_catalog import BrandCatalog
+    catalog = BrandCatalog.from_scss(css_path.read_text(encoding='utf-8'))
+    print(f"  ✅ Found: {len(catalog.classes)} CSS classes, {len(catalog.variables)} CSS variables")
+    # Decimals such as rgba(0, 0, 0, 0.1) must not be mistaken for classes
+    if any(cls[0].isdigit() for cls in catalog.classes):
+        print("  ❌ Numeric fragments parsed as classes")
+        sys.exit(1)
 else:
     print(f"  ⚠️  ups-brand.scss not found")
 
@@ -110,6 +115,179 @@ except Exception as e:
     print(f"  ❌ Pipeline module error: {e}")
     sys.exit(1)
 
+# Test 9: Template class extraction
+print("\n✓ Test 9: Template Class Extraction")
+sys.path.insert(0, str(base_dir / "pipeline"))
+from template_classes import extract_class_usages
+sample = """<div class='flex gap-4' [class.active]="tab === 'a'"
+     [ngClass]="{'rounded': on, shadow: x === 'no'}"></div>"""
+found = [(usage.name, usage.line) for usage in extract_class_usages(sample)]
+expected = [('flex', 1), ('gap-4', 1), ('active', 1), ('rounded', 2), ('shadow', 2)]
+if found == expected:
+    print(f"  ✅ {len(found)} classes found with line numbers")
+else:
+    print(f"  ❌ Expected {expected}, got {found}")
+    sys.exit(1)
+
+# Test 10: Template binding analysis
+print("\n✓ Test 10: Template Binding Analysis")
+from template_bindings import inject_missing_members
+sample = """<li *ngFor="let pkg of packages; let i = index">{{ i }} {{ pkg.name | uppercase }}</li>
+<button (click)="open = !open; select(pkg)">{{ title }}</button> <span>{{ count }}</span>"""
+component = "export class SampleComponent {\n  title = 'x';\n}\n"
+_, added = inject_missing_members(component, sample)
+if added == ['count', 'open', 'packages', 'select']:
+    print(f"  ✅ Missing members detected: {', '.join(added)}")
+else:
+    print(f"  ❌ Expected ['count', 'open', 'packages', 'select'], got {added}")
+    sys.exit(1)
+
+# Test 11: Streaming export extraction
+print("\n✓ Test 11: Streaming Export Extraction")
+from figma_stream import extract_subtrees
+fixture = base_dir / "pipeline" / "servers" / "fixtures" / "figma-tracking-page.json"
+subtrees = extract_subtrees(fixture, ["255-2800", "255:2720;1"])
+names = sorted(node["name"] for node in subtrees.values())
+if names == ["Label", "Tracking Form"]:
+    print(f"  ✅ Subtrees extracted: {', '.join(names)}")
+else:
+    print(f"  ❌ Expected ['Label', 'Tracking Form'], got {names}")
+    sys.exit(1)
+import io
+from figma_stream import ExportScanner
+aliased = {"nodes": {"1:1": {"document": {"id": "1:1", "name": "Frame", "children": [{
+    "id": "1:2", "name": "Card", "children": [],
+    "boundVariables": {"fills": [{"type": "VARIABLE_ALIAS", "id": "VariableID:9:9"}]}
+}]}}}}
+ids = [node.id for node in ExportScanner(io.BytesIO(json.dumps(aliased).encode())).nodes()]
+if ids == ["1:2", "1:1"]:
+    print("  ✅ Variable aliases in boundVariables are not nodes")
+else:
+    print(f"  ❌ Expected ['1:2', '1:1'], got {ids}")
+    sys.exit(1)
+
+# Test 12: Node index lookup by name pattern
+print("\n✓ Test 12: Node Index Lookup")
+from figma_index import FigmaIndex
+index = FigmaIndex.build(fixture)
+frames = [entry.id for entry in index.find("Tracking Page/*")]
+if frames == ["255:2700", "255:2800", "255:2890", "255:3000"] and index.subtree("255-2801")["characters"] == "Track a Package":
+    print(f"  ✅ 'Tracking Page/*' resolved to {len(frames)} frames")
+else:
+    print(f"  ❌ Unexpected frames {frames}")
+    sys.exit(1)
+index.close()
+
+# Test 13: Chunk planning of an oversized frame
+print("\n✓ Test 13: Chunk Planner")
+from chunk_planner import compose_component, plan_chunks
+page = index.subtree("255:2652")
+plan = plan_chunks(page, "tracking-page", 400)
+parts = [chunk.name for chunk in plan.children]
+html = compose_component(plan, frozenset({"flex", "flex-col", "items-center"}), {})["html"]
+if parts == ["tracking-page-header", "tracking-page-tracking-form", "tracking-page-results", "tracking-page-footer"] \
+        and "<app-tracking-page-results></app-tracking-page-results>" in html:
+    print(f"  ✅ {len(plan.leaves())} parts to generate, composed through {len(parts)} selectors")
+else:
+    print(f"  ❌ Unexpected plan {parts}")
+    sys.exit(1)
+
+# Test 14: Local compiler
+print("\n✓ Test 14: Local Compiler")
+from brand_styles import color_classes
+from fast_compiler import compile_component
+catalog = BrandCatalog.from_scss(css_path.read_text(encoding='utf-8'))
+page["children"].append({"id": "9:1", "name": "Card/Promo", "type": "INSTANCE", "children": []})
+compiled = compile_component(page, "tracking-page", catalog.classes, color_classes(catalog.classes, catalog.variables))
+holes = [hole.name for hole in compiled.holes]
+unapproved = [usage.name for usage in extract_class_usages(compiled.files["html"]) if usage.name not in catalog.classes]
+if holes == ["tracking-page-card-promo"] and not unapproved and '<button type="button"' in compiled.files["html"]:
+    print(f"  ✅ {compiled.nodes_compiled} nodes compiled, 1 subtree left for Granite")
+else:
+    print(f"  ❌ Unexpected holes {holes}")
+    sys.exit(1)
+
+# Test 15: Shared components for repeated subtrees
+print("\n✓ Test 15: Shared Components")
+import tempfile
+from component_dedupe import SharedRegistry, extract_shared
+with tempfile.TemporaryDirectory() as registry_dir:
+    deduped, shared = extract_shared(page, SharedRegistry(Path(registry_dir)))
+copies = {component.name: component.copies for component in shared}
+rows = [child for child in deduped["children"][2]["children"]]
+if copies == {"button-primary": 2, "result-row": 3} and rows[2]["sharedInputs"] == {
+        "trackingNumber": "1Z999AA10123456786", "status": "Label Created"}:
+    print(f"  ✅ 5 repeated subtrees share 2 components: {', '.join(sorted(copies))}")
+else:
+    print(f"  ❌ Unexpected shared components {copies}")
+    sys.exit(1)
+
+# Test 16: Design diffs for watch mode
+print("\n✓ Test 16: Design Diffs")
+import copy
+from design_diff import design_hash, diff_designs
+edited = copy.deepcopy(page)
+edited["children"][3]["children"][0]["characters"] = "© 2026 UPS"
+def shift(node):
+    if node.get("absoluteBoundingBox"):
+        node["absoluteBoundingBox"] = dict(node["absoluteBoundingBox"], x=node["absoluteBoundingBox"]["x"] + 10)
+    for child in node.get("children", []):
+        shift(child)
+shift(edited["children"][0])
+diff = diff_designs(page, edited)
+if ([name for _, name in diff.changed] == ["Header", "Copyright"]
+        and design_hash(page["children"][0]) == design_hash(edited["children"][0])):
+    print(f"  ✅ {diff.summary()}; moved frame keeps its design hash")
+else:
+    print(f"  ❌ Unexpected diff: {diff.summary()}")
+    sys.exit(1)
+index.close()
+
+# Test 17: HTTP transport
+print("\n✓ Test 17: HTTP Transport")
+from http_transport import CircuitBreaker, retry_after_seconds
+breaker = CircuitBreaker(threshold=2, reset_after=0)
+breaker.record_failure()
+closed_after_one = breaker.state == "closed"
+breaker.record_failure()
+if (retry_after_seconds("120") == 120 and retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470) == 10
+        and closed_after_one and breaker.state == "half-open" and breaker.allow() and not breaker.allow()):
+    print("  ✅ Retry-After parsed; breaker opens after 2 failures and allows one trial call")
+else:
+    print(f"  ❌ Unexpected breaker state: {breaker.state}")
+    sys.exit(1)
+
+# Test 18: Non-idempotent requests are not resent
+print("\n✓ Test 18: Dropped Generation Requests")
+sys.path.insert(0, str(base_dir / "pipeline" / "servers"))
+import granite_stub_server
+from http_transport import HttpTransport
+stub = granite_stub_server.start_stub_server(0, latency=0, iam_latency=0)
+chat_url = f"http://127.0.0.1:{stub.server_port}/ml/v1/text/chat"
+transport = HttpTransport(retries=2, backoff=0)
+granite_stub_server.StubState.drop_chats = 1
+try:
+    transport.request("POST", chat_url, "granite", (2, 5), json={}, idempotent=False)
+    generation_failed = False
+except Exception:
+    generation_failed = True
+sent_once = granite_stub_server.StubState.requests == 1
+granite_stub_server.StubState.drop_chats = 1
+retried = transport.request("POST", chat_url, "granite", (2, 5), json={}).ok
+try:
+    transport.request("POST", "http://127.0.0.1:1/", "granite", (2, 5), json={}, idempotent=False)
+    refused = ""
+except Exception as e:
+    refused = str(e)
+stub.shutdown()
+transport.close()
+if generation_failed and sent_once and retried and "after 3 attempts" in refused:
+    print("  ✅ Dropped generation sent once; idempotent call and refused connect retried")
+else:
+    print(f"  ❌ Unexpected retries: failed={generation_failed} once={sent_once} "
+          f"retried={retried} refused={refused}")
+    sys.exit(1)
+
 # Summary
 print("\n" + "=" * 60)
 print("  ✅ ALL TESTS PASSED - PIPELINE READY")